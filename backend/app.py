@@ -4,29 +4,62 @@ Production-ready FastAPI application for traffic incident monitoring
 Uses cloud storage (Firebase/Supabase) instead of local databases
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import QueryParams
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime, timedelta, timezone
 import httpx
 import os
+import asyncio
 from dotenv import load_dotenv
 import redis.asyncio as redis
 import json
 import math
+import csv
+import io
+import time
+import uuid
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
+from collections import OrderedDict
+
+from capture import CaptureWriter
+from clustering import ClusterIndex
+from compact import JSON, COLUMNAR_JSON, encode_columnar, negotiate, pack_msgpack
+from forecasting import IncidentForecaster
+from geo import parse_bbox
+from incident_query import IncidentIndex, fingerprint
+from lifecycle import LifecycleStore
+from util import parse_time
 
 load_dotenv()
 
+# Error monitoring (optional); sentry_sdk is only imported when it is configured
+SENTRY_DSN = os.getenv("SENTRY_DSN")
+if SENTRY_DSN:
+    import sentry_sdk
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        traces_sample_rate=float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0")),
+    )
+
 # Redis for caching (optional, falls back to in-memory)
 redis_client = None
 
+# Raw HERE response capture (optional, see capture.py / replay.py)
+HERE_CAPTURE_DIR = os.getenv("HERE_CAPTURE_DIR")
+capture_writer = CaptureWriter(HERE_CAPTURE_DIR) if HERE_CAPTURE_DIR else None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Manage application lifecycle: startup and shutdown."""
-    # Startup
+
+async def connect_redis() -> None:
+    """Connect the shared Redis client when REDIS_URL is set"""
     global redis_client
     redis_url = os.getenv("REDIS_URL")
     if redis_url:
@@ -41,10 +74,63 @@ async def lifespan(app: FastAPI):
                 print(f"⚠ Redis not reachable, disabling cache: {e}")
         except Exception as e:
             print(f"⚠ Redis not available: {e}")
+
+
+async def acquire_lock(key: str, ttl_ms: int) -> Optional[str]:
+    """
+    Take a lock shared by every worker (Redis SET NX PX) and return its token,
+    or None while another worker holds it. Without Redis every caller gets it.
+    """
+    global redis_client
+    token = uuid.uuid4().hex
+    if not redis_client:
+        return token
+    try:
+        return token if await redis_client.set(key, token, nx=True, px=ttl_ms) else None
+    except Exception as e:
+        redis_client = None
+        print(f"⚠ Redis error while locking, disabling cache: {e}")
+        return token
+
+
+# Compare-and-delete in one step, so a lock that expired and was taken by
+# another worker between the GET and the DEL is never released by mistake
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def release_lock(key: str, token: str) -> None:
+    """Release a lock taken with acquire_lock unless it already expired and changed hands"""
+    if not redis_client:
+        return
+    try:
+        await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+    except Exception as e:
+        print(f"⚠ Redis error while unlocking: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage application lifecycle: startup and shutdown."""
+    # Startup
+    await connect_redis()
+    expiry_task = asyncio.create_task(expire_incidents_loop())
+    compaction_task = asyncio.create_task(compact_storage_loop()) if STORAGE_TYPE == "sqlite" else None
+    forecast_task = asyncio.create_task(forecast_refresh_loop())
     
     yield
     
     # Shutdown
+    expiry_task.cancel()
+    forecast_task.cancel()
+    if compaction_task:
+        compaction_task.cancel()
+    if cpu_pool:
+        cpu_pool.shutdown(wait=False, cancel_futures=True)
     if redis_client:
         await redis_client.close()
 
@@ -63,14 +149,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Criticality-Counts", "Server-Timing"],
 )
 
+class ExportAwareGZipMiddleware(GZipMiddleware):
+    """GZip responses, except Parquet exports, which are already zstd-compressed"""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["path"] == "/api/incidents/export"
+            and QueryParams(scope["query_string"]).get("format") == "parquet"
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress responses above GZIP_MIN_SIZE bytes (incident lists compress ~10x)
+app.add_middleware(ExportAwareGZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1024")))
+
 # HERE API Configuration
 HERE_API_KEY = os.getenv("HERE_API_KEY")
-HERE_API_BASE = "https://data.traffic.hereapi.com/v7"
+HERE_API_BASE = os.getenv("HERE_API_BASE", "https://data.traffic.hereapi.com/v7")
 
 # Supabase/Firebase configuration (choose one)
-STORAGE_TYPE = os.getenv("STORAGE_TYPE", "supabase")  # or "firebase"
+STORAGE_TYPE = os.getenv("STORAGE_TYPE", "supabase")  # or "firebase", "sqlite"
 STORAGE_URL = os.getenv("STORAGE_URL")
 STORAGE_KEY = os.getenv("STORAGE_KEY")
 
@@ -85,6 +189,7 @@ class RiskAnalysisRequest(BaseModel):
     latitude: float
     longitude: float
     radius: int = 5000  # meters
+    history_days: Optional[int] = Field(None, ge=1, le=366)  # also summarize stored incidents in the radius over N days
 
 
 class Incident(BaseModel):
@@ -102,12 +207,37 @@ class Incident(BaseModel):
     length: Optional[float]
 
 
+INCIDENT_LIST = TypeAdapter(List[Incident])
+INCIDENT_COLUMNS = ",".join(Incident.model_fields)
+
+
+# Tiered retention (see database-schema.sql); analytics windows longer than
+# ROLLUP_AFTER_HOURS read the hourly/daily rollups instead of raw incidents
+ROLLUP_AFTER_HOURS = int(os.getenv("ROLLUP_AFTER_HOURS", "48"))
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", "30"))
+HOURLY_RETENTION_DAYS = int(os.getenv("HOURLY_RETENTION_DAYS", "90"))
+COMPACTION_INTERVAL = int(os.getenv("COMPACTION_INTERVAL", "3600"))
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", "86400"))  # purge expired rows daily
+
+
 # Storage abstraction layer
 class StorageAdapter:
     """Abstract storage layer for cloud providers"""
 
+    def __init__(self):
+        self._local_store = None
+
     def _is_configured(self) -> bool:
+        if STORAGE_TYPE == "sqlite":
+            return True
         return bool(STORAGE_URL and STORAGE_KEY and STORAGE_TYPE in {"supabase", "firebase"})
+
+    def _sqlite(self):
+        """Open the embedded store on first use"""
+        if self._local_store is None:
+            from local_store import SQLiteIncidentStore
+            self._local_store = SQLiteIncidentStore(STORAGE_URL or "crashlens.db")
+        return self._local_store
     
     async def save_incident(self, incident: Dict[str, Any]) -> bool:
         """Save incident to cloud storage"""
@@ -117,8 +247,21 @@ class StorageAdapter:
             return await self._save_to_supabase(incident)
         if STORAGE_TYPE == "firebase":
             return await self._save_to_firebase(incident)
+        if STORAGE_TYPE == "sqlite":
+            return await self._save_many_to_sqlite([incident])
         # In-memory fallback (not production-ready)
         return True
+
+    async def save_incidents(self, incidents: List[Dict[str, Any]]) -> bool:
+        """Save a batch of incidents in one round trip where the backend allows it"""
+        if not incidents or not self._is_configured():
+            return True
+        if STORAGE_TYPE == "supabase":
+            return await self._save_many_to_supabase(incidents)
+        if STORAGE_TYPE == "sqlite":
+            return await self._save_many_to_sqlite(incidents)
+        results = [await self.save_incident(incident) for incident in incidents]
+        return all(results)
     
     async def get_incidents(self, filters: Dict[str, Any]) -> List[Dict]:
         """Retrieve incidents from cloud storage"""
@@ -128,7 +271,242 @@ class StorageAdapter:
             return await self._get_from_supabase(filters)
         if STORAGE_TYPE == "firebase":
             return await self._get_from_firebase(filters)
+        if STORAGE_TYPE == "sqlite":
+            return await asyncio.to_thread(self._sqlite().select, filters)
+        return []
+
+    async def iter_incidents(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        bbox: Optional[str] = None,
+        criticality: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream stored incidents oldest-first in chunks of ``chunk_size``.
+
+        Pages are keyed on (start_time, id) rather than offsets, so memory stays
+        flat and a caller can resume from the last row it received via ``after``.
+        """
+        if not self._is_configured():
+            return
+        if STORAGE_TYPE == "sqlite":
+            store = self._sqlite()
+            while True:
+                chunk = await asyncio.to_thread(
+                    store.scan_after, since, until, bbox, criticality, after, chunk_size
+                )
+                if not chunk:
+                    return
+                yield chunk
+                if len(chunk) < chunk_size:
+                    return
+                after = (chunk[-1]["start_time"], chunk[-1]["id"])
+        elif STORAGE_TYPE == "supabase":
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                while True:
+                    chunk = await self._page_from_supabase(
+                        client, since, until, bbox, criticality, after, chunk_size
+                    )
+                    if not chunk:
+                        return
+                    yield chunk
+                    if len(chunk) < chunk_size:
+                        return
+                    after = (chunk[-1]["start_time"], chunk[-1]["id"])
+
+    async def summarize(self, since: datetime, rollups: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Counts by criticality and type since a point in time.
+
+        The embedded store aggregates in SQL; Supabase only ships the two
+        grouped columns. With ``rollups`` the counts come from the hourly and
+        daily rollup tables instead (hour resolution, cost independent of the
+        window). Returns None when storage is not configured.
+        """
+        if not self._is_configured():
+            return None
+        if STORAGE_TYPE == "sqlite":
+            store = self._sqlite()
+            return await asyncio.to_thread(store.rollup_summary if rollups else store.summarize, since)
+        if rollups:
+            return await self._rollup_summary_from_supabase(since)
+        rows = await self.get_incidents({
+            "select": "criticality,type",
+            "start_time": f"gte.{since.isoformat()}",
+        })
+        if not rows:
+            return None
+        by_severity: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        for row in rows:
+            severity = row.get("criticality", "unknown")
+            by_severity[severity] = by_severity.get(severity, 0) + 1
+            inc_type = row.get("type", "unknown")
+            by_type[inc_type] = by_type.get(inc_type, 0) + 1
+        return {"total_incidents": len(rows), "by_severity": by_severity, "by_type": by_type}
+
+    async def compact(self) -> None:
+        """
+        Refresh recent and late-written rollups in the embedded store.
+
+        Supabase runs the same job in the database (compact_recent_incidents in
+        database-schema.sql, scheduled with pg_cron).
+        """
+        if STORAGE_TYPE != "sqlite":
+            return
+        await asyncio.to_thread(self._sqlite().compact_recent)
+
+    async def cleanup(self) -> None:
+        """Apply tiered retention in the embedded store (Supabase: cleanup_old_incidents)"""
+        if STORAGE_TYPE != "sqlite":
+            return
+        await asyncio.to_thread(self._sqlite().cleanup, RAW_RETENTION_DAYS, HOURLY_RETENTION_DAYS)
+    
+    async def get_incidents_in_bbox(
+        self,
+        bbox: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        criticality: Optional[str] = None,
+        limit: int = 5000,
+    ) -> List[Dict]:
+        """Stored incidents inside a bbox, newest first, selected by the storage-side spatial index"""
+        if not self._is_configured():
+            return []
+        min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+        if STORAGE_TYPE == "sqlite":
+            return await asyncio.to_thread(
+                self._sqlite().in_bbox, (min_lon, min_lat, max_lon, max_lat), since, until, criticality, limit
+            )
+        if STORAGE_TYPE == "supabase":
+            return await self._rpc_supabase("incidents_in_bbox", {
+                "min_lon": min_lon, "min_lat": min_lat, "max_lon": max_lon, "max_lat": max_lat,
+                **self._rpc_filters(since, until, criticality, limit),
+            }, select=INCIDENT_COLUMNS)
         return []
+
+    async def get_incidents_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        criticality: Optional[str] = None,
+        limit: int = 5000,
+    ) -> List[Dict]:
+        """Stored incidents within radius_m meters of a point, newest first"""
+        if not self._is_configured():
+            return []
+        if STORAGE_TYPE == "sqlite":
+            return await asyncio.to_thread(
+                self._sqlite().within_radius, latitude, longitude, radius_m, since, until, criticality, limit
+            )
+        if STORAGE_TYPE == "supabase":
+            return await self._rpc_supabase("incidents_within_radius", {
+                "lat": latitude, "lon": longitude, "radius_m": radius_m,
+                **self._rpc_filters(since, until, criticality, limit),
+            }, select=INCIDENT_COLUMNS)
+        return []
+
+    async def count_incidents_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """Stored incident counts by criticality within radius_m meters of a point, grouped by the store"""
+        if not self._is_configured():
+            return {}
+        if STORAGE_TYPE == "sqlite":
+            return await asyncio.to_thread(
+                self._sqlite().count_within_radius, latitude, longitude, radius_m, since
+            )
+        if STORAGE_TYPE == "supabase":
+            rows = await self._rpc_supabase("incident_counts_within_radius", {
+                "lat": latitude, "lon": longitude, "radius_m": radius_m,
+                "since": since.isoformat() if since else None,
+            })
+            return {row.get("criticality") or "unknown": int(row.get("incident_count") or 0) for row in rows}
+        return {}
+
+    @staticmethod
+    def _rpc_filters(
+        since: Optional[datetime],
+        until: Optional[datetime],
+        criticality: Optional[str],
+        limit: int,
+    ) -> Dict[str, Any]:
+        return {
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+            "criticalities": criticality.split(",") if criticality else None,
+            "max_rows": limit,
+        }
+
+    async def hourly_tile_counts(self, since: datetime) -> List[Tuple[float, str, int]]:
+        """(hour start epoch, zoom-10 tile, incident count) since a point in time, for seeding forecasts"""
+        if not self._is_configured():
+            return []
+        if STORAGE_TYPE == "sqlite":
+            return await asyncio.to_thread(self._sqlite().hourly_tile_counts, since)
+        if STORAGE_TYPE != "supabase":
+            return []
+        counts: List[Tuple[float, str, int]] = []
+        while True:
+            rows = await self._rpc_supabase(
+                "incident_hourly_tile_counts",
+                {"since": since.isoformat()},
+                params={"limit": FORECAST_SEED_PAGE_SIZE, "offset": len(counts)},
+            )
+            counts.extend(
+                (parse_time(row["bucket"]).timestamp(), row["tile"], int(row["incident_count"]))
+                for row in rows
+            )
+            if len(rows) < FORECAST_SEED_PAGE_SIZE:
+                return counts
+
+    async def _rpc_supabase(
+        self,
+        function: str,
+        args: Dict[str, Any],
+        select: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
+        """Call a database function from database-schema.sql through PostgREST"""
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            headers = {
+                "apikey": STORAGE_KEY,
+                "Authorization": f"Bearer {STORAGE_KEY}",
+                "Content-Type": "application/json"
+            }
+            response = await client.post(
+                f"{STORAGE_URL}/rest/v1/rpc/{function}",
+                params={**(params or {}), **({"select": select} if select else {})} or None,
+                json=args,
+                headers=headers
+            )
+            response.raise_for_status()
+            return response.json()
+
+    async def _rollup_summary_from_supabase(self, since: datetime) -> Optional[Dict[str, Any]]:
+        """Aggregate inside Postgres via the incident_rollup_summary RPC"""
+        rows = await self._rpc_supabase("incident_rollup_summary", {"since": since.isoformat()})
+        if not rows:
+            return None
+        by_severity: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        for row in rows:
+            count = int(row.get("incident_count") or 0)
+            severity = row.get("criticality") or "unknown"
+            by_severity[severity] = by_severity.get(severity, 0) + count
+            inc_type = row.get("type") or "unknown"
+            by_type[inc_type] = by_type.get(inc_type, 0) + count
+        return {"total_incidents": sum(by_severity.values()), "by_severity": by_severity, "by_type": by_type}
     
     async def _save_to_supabase(self, incident: Dict[str, Any]) -> bool:
         """Save to Supabase"""
@@ -144,6 +522,22 @@ class StorageAdapter:
                 headers=headers
             )
             return response.status_code == 201
+
+    async def _save_many_to_supabase(self, incidents: List[Dict[str, Any]]) -> bool:
+        """Bulk upsert to Supabase (PostgREST accepts a JSON array)"""
+        async with httpx.AsyncClient() as client:
+            headers = {
+                "apikey": STORAGE_KEY,
+                "Authorization": f"Bearer {STORAGE_KEY}",
+                "Content-Type": "application/json",
+                "Prefer": "resolution=merge-duplicates,return=minimal"
+            }
+            response = await client.post(
+                f"{STORAGE_URL}/rest/v1/incidents",
+                json=incidents,
+                headers=headers
+            )
+            return response.status_code in (200, 201, 204)
     
     async def _get_from_supabase(self, filters: Dict[str, Any]) -> List[Dict]:
         """Retrieve from Supabase"""
@@ -160,6 +554,53 @@ class StorageAdapter:
             if response.status_code == 200:
                 return response.json()
             return []
+
+    async def _page_from_supabase(
+        self,
+        client: httpx.AsyncClient,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        bbox: Optional[str],
+        criticality: Optional[str],
+        after: Optional[Tuple[str, str]],
+        limit: int,
+    ) -> List[Dict]:
+        """Fetch one keyset page from Supabase (filters on the same column are ANDed)"""
+        headers = {
+            "apikey": STORAGE_KEY,
+            "Authorization": f"Bearer {STORAGE_KEY}"
+        }
+        params: List[Tuple[str, Any]] = [("order", "start_time.asc,id.asc"), ("limit", limit)]
+        if since:
+            params.append(("start_time", f"gte.{since.isoformat()}"))
+        if until:
+            params.append(("start_time", f"lt.{until.isoformat()}"))
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = bbox.split(",")
+            params += [
+                ("latitude", f"gte.{min_lat}"), ("latitude", f"lte.{max_lat}"),
+                ("longitude", f"gte.{min_lon}"), ("longitude", f"lte.{max_lon}"),
+            ]
+        if criticality:
+            params.append(("criticality", f"in.({criticality})"))
+        if after:
+            after_time, after_id = after
+            params.append((
+                "or",
+                f'(start_time.gt."{after_time}",and(start_time.eq."{after_time}",id.gt."{after_id}"))'
+            ))
+        response = await client.get(f"{STORAGE_URL}/rest/v1/incidents", params=params, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _save_many_to_sqlite(self, incidents: List[Dict[str, Any]]) -> bool:
+        """Batched upsert into the embedded store"""
+        try:
+            await asyncio.to_thread(self._sqlite().save_many, incidents)
+            return True
+        except Exception as e:
+            print(f"⚠ SQLite write failed: {e}")
+            return False
     
     async def _save_to_firebase(self, incident: Dict[str, Any]) -> bool:
         """Save to Firebase Firestore"""
@@ -174,6 +615,137 @@ class StorageAdapter:
 
 storage = StorageAdapter()
 
+# Zoom-dependent incident clusters for map views (see clustering.py)
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "14"))
+CLUSTER_TTL = int(os.getenv("CLUSTER_TTL", "3600"))  # drop incidents unseen for an hour
+cluster_index = ClusterIndex(max_zoom=CLUSTER_MAX_ZOOM)
+_cluster_pruned_at = 0.0
+
+# Active/ended state of every recently seen incident (see lifecycle.py)
+LIFECYCLE_RETENTION = int(os.getenv("LIFECYCLE_RETENTION", "86400"))  # keep ended incidents a day
+LIFECYCLE_STALE_TTL = int(os.getenv("LIFECYCLE_STALE_TTL", "3600"))  # incidents unseen for an hour end
+lifecycle = LifecycleStore(
+    retention=LIFECYCLE_RETENTION,
+    stale_ttl=LIFECYCLE_STALE_TTL,
+    on_expire=lambda record: cluster_index.remove(str(record.get("id", ""))),
+)
+
+# Per-tile incident-rate forecasts (see forecasting.py), seeded from the hourly
+# rollups at startup and refreshed for every tile in one batch
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "28"))
+FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "48"))  # hours
+FORECAST_REFRESH_INTERVAL = int(os.getenv("FORECAST_REFRESH_INTERVAL", "300"))
+FORECAST_SEED_PAGE_SIZE = 10000
+forecaster = IncidentForecaster(history_hours=FORECAST_HISTORY_DAYS * 24, horizon=FORECAST_HORIZON)
+
+
+async def compact_storage_loop() -> None:
+    """
+    Roll up recent incidents every COMPACTION_INTERVAL seconds and purge expired
+    ones every RETENTION_INTERVAL seconds (one worker per interval)
+    """
+    next_cleanup = time.monotonic()
+    while True:
+        try:
+            if await acquire_lock("lock:compaction", COMPACTION_INTERVAL * 1000):
+                await storage.compact()
+        except Exception as e:
+            print(f"⚠ Storage compaction failed: {e}")
+        if time.monotonic() >= next_cleanup:
+            next_cleanup = time.monotonic() + RETENTION_INTERVAL
+            try:
+                if await acquire_lock("lock:retention", RETENTION_INTERVAL * 1000):
+                    await storage.cleanup()
+            except Exception as e:
+                print(f"⚠ Storage cleanup failed: {e}")
+        await asyncio.sleep(COMPACTION_INTERVAL)
+
+
+async def expire_incidents_loop() -> None:
+    """Turn the lifecycle timing wheel once a second so ended incidents leave the map promptly"""
+    while True:
+        await asyncio.sleep(1)
+        try:
+            lifecycle.advance()
+        except Exception as e:
+            print(f"⚠ Incident expiry failed: {e}")
+
+
+async def forecast_refresh_loop() -> None:
+    """Seed the forecaster from stored history once, then refresh every tile's forecast periodically"""
+    try:
+        since = datetime.now(timezone.utc) - timedelta(days=FORECAST_HISTORY_DAYS)
+        counts = await storage.hourly_tile_counts(since)
+        await asyncio.to_thread(forecaster.seed, counts)
+        if counts:
+            print(f"✓ Seeded incident forecasts for {len(forecaster)} tiles")
+    except Exception as e:
+        print(f"⚠ Forecast seeding failed, starting from live data only: {e}")
+    while True:
+        try:
+            await asyncio.to_thread(forecaster.refresh)
+        except Exception as e:
+            print(f"⚠ Forecast refresh failed: {e}")
+        await asyncio.sleep(FORECAST_REFRESH_INTERVAL)
+
+
+def ingest_incidents(incidents: List[Any]) -> List[Any]:
+    """
+    Feed a fresh incident list (models or cached dicts) into the in-memory
+    indexes, returning only the incidents that have not ended yet
+    """
+    now = time.time()
+    records = [i.model_dump(mode="json") if isinstance(i, Incident) else i for i in incidents]
+    lifecycle.upsert_many(records, now)
+    forecaster.ingest(records, now)
+    current = [
+        (incident, record) for incident, record in zip(incidents, records)
+        if not lifecycle.has_ended(str(record.get("id", "")), now)
+    ]
+    cluster_index.upsert_many(record for _, record in current)
+    return [incident for incident, _ in current]
+
+
+# Cached lists already fed into this worker's indexes, by cache key: a cache
+# hit on an unchanged list only drops incidents that ended since, instead of
+# decoding and ingesting the whole list again
+INGESTED_LIST_CACHE_SIZE = int(os.getenv("INGESTED_LIST_CACHE_SIZE", "256"))
+# cache key -> (payload digest, ingested at, incidents, ids)
+_ingested_lists: "OrderedDict[str, Tuple[bytes, float, List[Any], List[str]]]" = OrderedDict()
+
+
+def _payload_digest(payload: bytes) -> bytes:
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def remember_ingested(cache_key: str, payload: bytes, incidents: List[Any]) -> None:
+    ids = [str(i.id if isinstance(i, Incident) else i.get("id", "")) for i in incidents]
+    _ingested_lists[cache_key] = (_payload_digest(payload), time.time(), incidents, ids)
+    _ingested_lists.move_to_end(cache_key)
+    while len(_ingested_lists) > INGESTED_LIST_CACHE_SIZE:
+        _ingested_lists.popitem(last=False)
+
+
+def ingest_cached(cache_key: str, payload: bytes) -> List[Any]:
+    """
+    Incidents from a cached payload that have not ended. The list is decoded
+    and ingested only when it changed (e.g. another worker refetched it) or
+    was last ingested more than INCIDENT_CACHE_TTL ago, which keeps
+    last-seen times fresh for open-ended incidents.
+    """
+    now = time.time()
+    entry = _ingested_lists.get(cache_key)
+    if entry is None or entry[0] != _payload_digest(payload) or now - entry[1] > INCIDENT_CACHE_TTL:
+        incidents = json.loads(payload)
+        remember_ingested(cache_key, payload, incidents)
+        return ingest_incidents(incidents)
+    _ingested_lists.move_to_end(cache_key)
+    _, _, incidents, ids = entry
+    ended = {position for position, incident_id in enumerate(ids) if lifecycle.has_ended(incident_id, now)}
+    if not ended:
+        return incidents
+    return [incident for position, incident in enumerate(incidents) if position not in ended]
+
 
 @app.get("/")
 async def root():
@@ -194,26 +766,303 @@ async def health_check():
         "checks": {
             "api": "ok",
             "here_api": "ok" if HERE_API_KEY else "missing_key",
-            "storage": "ok" if STORAGE_URL and STORAGE_KEY else "not_configured",
+            "storage": "ok" if storage._is_configured() else "not_configured",
             "cache": "ok" if redis_client else "disabled"
         }
     }
     return health
 
 
+def _extract_text(value: Any) -> Optional[str]:
+    """Extract human-readable text from HERE API fields with multiple shapes."""
+    if isinstance(value, dict):
+        return value.get("value") or value.get("label") or value.get("name")
+    if isinstance(value, list):
+        for candidate in value:
+            text = _extract_text(candidate)
+            if text:
+                return text
+    if isinstance(value, str):
+        return value
+    return None
+
+
+SEVERITY_MAP = {"critical": 3, "major": 2, "minor": 1, "low": 0}
+INCIDENT_CACHE_TTL = 300  # 5 minutes
+
+
+def incident_cache_key(bbox: str, criticality: Optional[str]) -> str:
+    """Cache key shared by the live endpoint and the replay tool"""
+    return f"incidents:{bbox}:{criticality}"
+
+
+def normalize_here_incidents(data: Dict[str, Any]) -> List[Incident]:
+    """Transform a raw HERE v7 /incidents response into our Incident model"""
+    incidents = []
+    for item in data.get("results", []):
+        location = item.get("location", {}) or {}
+        details = item.get("incidentDetails", {}) or {}
+
+        # Extract coordinates with fallbacks (shape -> displayPoint -> origin)
+        lat, lng = None, None
+        try:
+            shape = location.get("shape", {})
+            links = shape.get("links", [])
+            if links:
+                points = links[0].get("points", [])
+                if points:
+                    lat = points[0].get("lat")
+                    lng = points[0].get("lng")
+        except (IndexError, TypeError, KeyError):
+            pass
+
+        if lat is None or lng is None:
+            display_point = location.get("displayPoint", {})
+            lat = lat if lat is not None else display_point.get("lat")
+            lng = lng if lng is not None else display_point.get("lng")
+
+        if lat is None or lng is None:
+            origin = location.get("origin", {})
+            lat = lat if lat is not None else origin.get("lat")
+            lng = lng if lng is not None else origin.get("lng")
+
+        lat = lat if lat is not None else 0
+        lng = lng if lng is not None else 0
+
+        # Extract descriptive fields
+        criticality_raw = details.get("criticality", "minor")
+        criticality_label = criticality_raw.lower() if isinstance(criticality_raw, str) else "minor"
+
+        incident_type = details.get("type", item.get("type", "unknown"))
+        description = _extract_text(details.get("description")) or _extract_text(item.get("description")) or ""
+
+        start_time = details.get("startTime", datetime.now(timezone.utc).isoformat())
+        end_time = details.get("endTime") or None
+
+        length = location.get("length", 0)
+
+        # Location naming: prefer explicit road or description, fallback to coordinates string
+        location_name = (
+            _extract_text(location.get("description"))
+            or _extract_text(location.get("displayPoint", {}).get("description"))
+            or _extract_text(details.get("description"))
+        )
+
+        road_name = (
+            _extract_text(location.get("roadName"))
+            or _extract_text(location.get("primaryLocation", {}).get("roadName"))
+            or _extract_text(location.get("primaryLocation", {}).get("address"))
+            or location_name
+        )
+
+        severity = SEVERITY_MAP.get(criticality_label, 0)
+
+        incident_data = {
+            "id": details.get("id", item.get("incidentId", "")),
+            "type": incident_type,
+            "description": description,
+            "latitude": lat,
+            "longitude": lng,
+            "severity": severity,
+            "criticality": criticality_label,
+            "start_time": start_time,
+            "end_time": end_time,
+            "road_name": road_name,
+            "location_name": location_name,
+            "length": length
+        }
+        try:
+            incidents.append(Incident(**incident_data))
+        except Exception as e:
+            print(f"⚠ Failed to parse incident {item.get('incidentId')}: {e}")
+            print(f"  Raw data: {item}")
+    return incidents
+
+
+# Large HERE payloads are parsed and normalized in a process pool so the event
+# loop keeps serving other requests meanwhile (0 workers = always inline)
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "1"))
+CPU_POOL_MIN_BYTES = int(os.getenv("CPU_POOL_MIN_BYTES", str(512 * 1024)))
+cpu_pool: Optional[ProcessPoolExecutor] = None
+CPU_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _parse_here_incidents(body: bytes) -> List[Incident]:
+    """Decode and normalize a raw HERE /incidents body (runs in the CPU pool)"""
+    return normalize_here_incidents(json.loads(body))
+
+
+async def parse_here_incidents(body: bytes) -> List[Incident]:
+    """Normalize a raw HERE /incidents body, in the CPU pool when it is large"""
+    global cpu_pool
+    if CPU_POOL_WORKERS <= 0 or len(body) < CPU_POOL_MIN_BYTES:
+        return _parse_here_incidents(body)
+    if cpu_pool is None:
+        # Created on first use, after gunicorn has forked this worker. Pool
+        # processes come from a forkserver rather than fork(), so they never
+        # inherit this worker's event loop, sockets or thread-held locks.
+        cpu_pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=CPU_POOL_CONTEXT)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(cpu_pool, _parse_here_incidents, body)
+    except BrokenProcessPool as e:
+        print(f"⚠ CPU pool failed, parsing inline: {e}")
+        cpu_pool = None
+        return _parse_here_incidents(body)
+
+
+async def cache_incidents(cache_key: str, incidents: List[Incident], ttl: int = INCIDENT_CACHE_TTL) -> Optional[bytes]:
+    """Store a normalized incident list in Redis and return the cached payload (None when the cache is disabled)"""
+    global redis_client
+    if not redis_client:
+        return None
+    payload = INCIDENT_LIST.dump_json(incidents)
+    try:
+        await redis_client.setex(cache_key, ttl, payload)
+    except Exception as e:
+        print(f"⚠ Redis error while caching, disabling cache: {e}")
+        redis_client = None
+        return None
+    return payload
+
+
+async def persist_incidents(incidents: List[Incident]) -> None:
+    """Save normalized incidents to cloud storage in one batch"""
+    await storage.save_incidents([incident.model_dump(mode="json") for incident in incidents])
+
+
+# Per-list search indexes for /api/incidents query parameters (see incident_query.py)
+QUERY_INDEX_CACHE_SIZE = int(os.getenv("QUERY_INDEX_CACHE_SIZE", "256"))
+_query_indexes: "OrderedDict[str, Tuple[int, IncidentIndex]]" = OrderedDict()
+
+
+def get_query_index(cache_key: str, incidents: List[Any]) -> IncidentIndex:
+    """Reuse the index built for this cache entry unless the list changed"""
+    cached = _query_indexes.get(cache_key)
+    # Unchanged cache hits hand back the very same list (see ingest_cached)
+    if cached and cached[1].incidents is incidents:
+        _query_indexes.move_to_end(cache_key)
+        return cached[1]
+    current = fingerprint(incidents)
+    if cached and cached[0] == current:
+        _query_indexes.move_to_end(cache_key)
+        return cached[1]
+    index = IncidentIndex(incidents)
+    _query_indexes[cache_key] = (current, index)
+    _query_indexes.move_to_end(cache_key)
+    while len(_query_indexes) > QUERY_INDEX_CACHE_SIZE:
+        _query_indexes.popitem(last=False)
+    return index
+
+
 @app.get("/api/incidents", response_model=List[Incident])
 async def get_incidents(
     bbox: str,
     criticality: Optional[str] = None,
-    background_tasks: BackgroundTasks = None
+    background_tasks: BackgroundTasks = None,
+    q: Optional[str] = None,
+    min_length: Optional[float] = None,
+    max_length: Optional[float] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    response: Response = None,
+    request: Request = None
 ):
     """
     Get real-time traffic incidents from HERE API
     
+    Without query parameters the full list for the bbox is returned. With any
+    of them, the list is answered from a prebuilt index and the response is a
+    single page; X-Total-Count, X-Next-Cursor and X-Criticality-Counts
+    headers describe the full result.
+    
     Args:
         bbox: Bounding box as "minLon,minLat,maxLon,maxLat"
         criticality: Filter by criticality (major, minor, critical)
+        q: Text search over type, description, road and location (token prefix)
+        min_length: Minimum incident length in meters (inclusive)
+        max_length: Maximum incident length in meters (exclusive)
+        sort: severity (default), time (newest first) or length (longest first)
+        cursor: X-Next-Cursor value from the previous page
+        limit: Page size (1-1000)
+    
+    The response encoding follows the Accept header (see compact.py):
+    application/json (default), application/vnd.crashlens.columnar+json or
+    application/x-msgpack.
     """
+    incidents = await _load_incidents(bbox, criticality, background_tasks)
+
+    if q is None and min_length is None and max_length is None and sort is None and cursor is None and limit is None:
+        return render_incidents(incidents, request) if request else incidents
+
+    if limit is not None and not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="Invalid limit. Expected 1-1000")
+    index = get_query_index(incident_cache_key(bbox, criticality), incidents)
+    try:
+        page, next_cursor, total = index.query(
+            text=q,
+            min_length=min_length,
+            max_length=max_length,
+            sort=sort or "severity",
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        "X-Total-Count": str(total),
+        "X-Criticality-Counts": json.dumps(index.criticality_counts, separators=(",", ":")),
+    }
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if request:
+        return render_incidents(page, request, headers)
+    if response is not None:
+        response.headers.update(headers)
+    return page
+
+
+def render_incidents(
+    incidents: List[Any],
+    request: Request,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serialize an incident list in the encoding the client accepts, timing the work"""
+    media_type = negotiate(request.headers.get("accept"))
+    started = time.perf_counter()
+    if media_type == JSON:
+        if incidents and isinstance(incidents[0], BaseModel):
+            body = INCIDENT_LIST.dump_json(incidents)
+        else:
+            body = json.dumps(incidents, separators=(",", ":")).encode()
+    elif media_type == COLUMNAR_JSON:
+        body = json.dumps(encode_columnar(incidents), separators=(",", ":")).encode()
+    else:
+        body = pack_msgpack(encode_columnar(incidents))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    headers = dict(headers or {})
+    headers["Server-Timing"] = f"serialize;dur={elapsed_ms:.3f}"
+    headers["Vary"] = "Accept"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# Shared HERE fetches (see _load_incidents): in-process futures per cache key,
+# plus a Redis lock per key so only one worker fetches it at a time
+FETCH_LOCK_TTL_MS = int(os.getenv("FETCH_LOCK_TTL_MS", "15000"))
+FETCH_WAIT_INTERVAL = 0.05
+_inflight_fetches: Dict[str, "asyncio.Future[List[Any]]"] = {}
+
+
+async def _load_incidents(
+    bbox: str,
+    criticality: Optional[str] = None,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> List[Any]:
+    """Incidents for a bbox from cache, or from HERE (then cached and persisted)"""
     # Basic validation
     if not HERE_API_KEY:
         raise HTTPException(status_code=500, detail="HERE_API_KEY is not configured")
@@ -223,21 +1072,91 @@ async def get_incidents(
         raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
 
     criticality_filter = criticality
-    cache_key = f"incidents:{bbox}:{criticality_filter}"
+    cache_key = incident_cache_key(bbox, criticality_filter)
     
     # Check cache first
     global redis_client
+    cached = None
     if redis_client:
         try:
             cached = await redis_client.get(cache_key)
-            if cached:
-                return json.loads(cached)
         except Exception as e:
             # Disable cache on connection errors during runtime
             redis_client = None
             print(f"⚠ Redis error, disabling cache: {e}")
-    
-    # Fetch from HERE API
+    if cached:
+        # Cached lists can outlive incidents that ended since; drop those
+        return ingest_cached(cache_key, cached)
+
+    # One HERE fetch per cache key at a time: concurrent requests in this
+    # worker share the in-flight fetch, other workers wait for its cache entry
+    inflight = _inflight_fetches.get(cache_key)
+    if inflight is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                raise
+    future = asyncio.get_running_loop().create_future()
+    _inflight_fetches[cache_key] = future
+    try:
+        active = await _fetch_incidents_once(bbox, criticality_filter, cache_key, background_tasks)
+        future.set_result(active)
+        return active
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # retrieved, even when nobody else was waiting
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        _inflight_fetches.pop(cache_key, None)
+
+
+async def _fetch_incidents_once(
+    bbox: str,
+    criticality_filter: Optional[str],
+    cache_key: str,
+    background_tasks: Optional[BackgroundTasks]
+) -> List[Any]:
+    """Fetch from HERE under a cross-worker lock, or wait for the worker already fetching"""
+    lock_key = f"lock:{cache_key}"
+    token = await acquire_lock(lock_key, FETCH_LOCK_TTL_MS)
+    if token is None:
+        cached = await _wait_for_cache(cache_key, lock_key)
+        if cached:
+            return ingest_cached(cache_key, cached)
+        # The other worker failed or timed out: fetch here instead
+        token = await acquire_lock(lock_key, FETCH_LOCK_TTL_MS)
+    try:
+        return await _fetch_here_incidents(bbox, criticality_filter, cache_key, background_tasks)
+    finally:
+        if token:
+            await release_lock(lock_key, token)
+
+
+async def _wait_for_cache(cache_key: str, lock_key: str) -> Optional[bytes]:
+    """Poll Redis until another worker caches ``cache_key`` or drops its fetch lock"""
+    deadline = time.monotonic() + FETCH_LOCK_TTL_MS / 1000
+    while redis_client and time.monotonic() < deadline:
+        await asyncio.sleep(FETCH_WAIT_INTERVAL)
+        try:
+            cached = await redis_client.get(cache_key)
+            if cached or not await redis_client.exists(lock_key):
+                return cached
+        except Exception as e:
+            print(f"⚠ Redis error while waiting for a shared fetch: {e}")
+            return None
+    return None
+
+
+async def _fetch_here_incidents(
+    bbox: str,
+    criticality_filter: Optional[str],
+    cache_key: str,
+    background_tasks: Optional[BackgroundTasks]
+) -> List[Any]:
+    """Fetch, normalize, cache and persist one HERE incident list"""
     try:
         async with httpx.AsyncClient() as client:
             params = {
@@ -254,119 +1173,27 @@ async def get_incidents(
                 timeout=10.0
             )
             response.raise_for_status()
-            data = response.json()
-        
-        # Transform HERE data to our format
-        def _extract_text(value: Any) -> Optional[str]:
-            """Extract human-readable text from HERE API fields with multiple shapes."""
-            if isinstance(value, dict):
-                return value.get("value") or value.get("label") or value.get("name")
-            if isinstance(value, list):
-                for candidate in value:
-                    text = _extract_text(candidate)
-                    if text:
-                        return text
-            if isinstance(value, str):
-                return value
-            return None
 
-        incidents = []
-        for item in data.get("results", []):
-            location = item.get("location", {}) or {}
-            details = item.get("incidentDetails", {}) or {}
-
-            # Extract coordinates with fallbacks (shape -> displayPoint -> origin)
-            lat, lng = None, None
-            try:
-                shape = location.get("shape", {})
-                links = shape.get("links", [])
-                if links:
-                    points = links[0].get("points", [])
-                    if points:
-                        lat = points[0].get("lat")
-                        lng = points[0].get("lng")
-            except (IndexError, TypeError, KeyError):
-                pass
-
-            if lat is None or lng is None:
-                display_point = location.get("displayPoint", {})
-                lat = lat if lat is not None else display_point.get("lat")
-                lng = lng if lng is not None else display_point.get("lng")
-
-            if lat is None or lng is None:
-                origin = location.get("origin", {})
-                lat = lat if lat is not None else origin.get("lat")
-                lng = lng if lng is not None else origin.get("lng")
-
-            lat = lat if lat is not None else 0
-            lng = lng if lng is not None else 0
-
-            # Extract descriptive fields
-            criticality_raw = details.get("criticality", "minor")
-            criticality_label = criticality_raw.lower() if isinstance(criticality_raw, str) else "minor"
-
-            incident_type = details.get("type", item.get("type", "unknown"))
-            description = _extract_text(details.get("description")) or _extract_text(item.get("description")) or ""
-
-            start_time = details.get("startTime", datetime.now(timezone.utc).isoformat())
-            end_time = details.get("endTime", "")
-
-            length = location.get("length", 0)
-
-            # Location naming: prefer explicit road or description, fallback to coordinates string
-            location_name = (
-                _extract_text(location.get("description"))
-                or _extract_text(location.get("displayPoint", {}).get("description"))
-                or _extract_text(details.get("description"))
-            )
-
-            road_name = (
-                _extract_text(location.get("roadName"))
-                or _extract_text(location.get("primaryLocation", {}).get("roadName"))
-                or _extract_text(location.get("primaryLocation", {}).get("address"))
-                or location_name
-            )
-
-            severity_map = {"critical": 3, "major": 2, "minor": 1, "low": 0}
-            severity = severity_map.get(criticality_label, 0)
-
-            incident_data = {
-                "id": details.get("id", item.get("incidentId", "")),
-                "type": incident_type,
-                "description": description,
-                "latitude": lat,
-                "longitude": lng,
-                "severity": severity,
-                "criticality": criticality_label,
-                "start_time": start_time,
-                "end_time": end_time,
-                "road_name": road_name,
-                "location_name": location_name,
-                "length": length
-            }
-            try:
-                incidents.append(Incident(**incident_data))
-            except Exception as e:
-                print(f"⚠ Failed to parse incident {item.get('incidentId')}: {e}")
-                print(f"  Raw data: {item}")
-            
-            # Save to cloud storage in background
+        if capture_writer:
+            data = response.json()
             if background_tasks:
-                background_tasks.add_task(storage.save_incident, incident_data)
-        
-        # Cache results
-        if redis_client:
-            try:
-                await redis_client.setex(
-                    cache_key,
-                    300,  # 5 minutes
-                    json.dumps([i.dict() for i in incidents], default=str)
+                background_tasks.add_task(
+                    capture_writer.record, "incidents", bbox, data, {"criticality": criticality_filter}
                 )
-            except Exception as e:
-                print(f"⚠ Redis error while caching, disabling cache: {e}")
-                redis_client = None
+            incidents = normalize_here_incidents(data)
+        else:
+            incidents = await parse_here_incidents(response.content)
+        active = ingest_incidents(incidents)
+
+        # Save to cloud storage in background
+        if background_tasks:
+            background_tasks.add_task(persist_incidents, incidents)
+
+        payload = await cache_incidents(cache_key, incidents)
+        if payload:
+            remember_ingested(cache_key, payload, incidents)
         
-        return incidents
+        return active
     
     except httpx.HTTPError as e:
         # Surface more helpful error details when possible
@@ -380,10 +1207,355 @@ async def get_incidents(
         raise HTTPException(status_code=502, detail=f"HERE API error: {message}")
 
 
+@app.get("/api/incidents/clusters")
+async def get_incident_clusters(
+    bbox: str,
+    zoom: int = Query(ge=0, le=22),
+    criticality: Optional[str] = None,
+    background_tasks: BackgroundTasks = None
+):
+    """
+    Get zoom-dependent incident clusters for a map viewport
+    
+    Clusters come from grids precomputed for every zoom level up to
+    CLUSTER_MAX_ZOOM; past that, full incident records are returned instead.
+    
+    Args:
+        bbox: Bounding box as "minLon,minLat,maxLon,maxLat"
+        zoom: Map zoom level (Leaflet/slippy map)
+        criticality: Comma-separated criticality filter (e.g. "critical,major")
+    """
+    global _cluster_pruned_at
+    try:
+        box = parse_bbox(bbox)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
+
+    # Refresh the index for this viewport (served from cache when warm)
+    await _load_incidents(bbox, criticality, background_tasks)
+
+    now = datetime.now(timezone.utc).timestamp()
+    if now - _cluster_pruned_at > 60:
+        cluster_index.prune(now - CLUSTER_TTL)
+        _cluster_pruned_at = now
+
+    criticalities = criticality.split(",") if criticality else None
+    if zoom > CLUSTER_MAX_ZOOM:
+        records = cluster_index.incidents(box, criticalities)
+        return {"zoom": zoom, "mode": "incidents", "count": len(records), "incidents": records}
+
+    clusters = cluster_index.clusters(box, zoom, criticalities)
+    return {
+        "zoom": zoom,
+        "mode": "clusters",
+        "count": sum(c["count"] for c in clusters),
+        "clusters": clusters,
+    }
+
+
+@app.get("/api/incidents/active", response_model=List[Incident])
+async def get_active_incidents(
+    bbox: Optional[str] = None,
+    criticality: Optional[str] = None,
+    at: Optional[datetime] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    request: Request = None
+):
+    """
+    Get incidents active now, at a given time, or during a time window
+    
+    Answered from the in-memory lifecycle store, which holds every incident
+    this instance has seen within the last LIFECYCLE_RETENTION seconds.
+    
+    Args:
+        bbox: Optional bounding box as "minLon,minLat,maxLon,maxLat"
+        criticality: Comma-separated criticality filter (e.g. "critical,major")
+        at: Incidents active at this time (ISO 8601)
+        start: Incidents active at any point from this time (ISO 8601)
+        end: ... up to this time (defaults to now)
+    """
+    if at and (start or end):
+        raise HTTPException(status_code=400, detail="Use either at or start/end, not both")
+    box = None
+    if bbox:
+        try:
+            box = parse_bbox(bbox)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
+
+    now = time.time()
+    if at:
+        records = lifecycle.active_at(parse_time(at).timestamp())
+    elif start or end:
+        high = parse_time(end).timestamp() if end else now
+        low = parse_time(start).timestamp() if start else high - LIFECYCLE_RETENTION
+        if low > high:
+            raise HTTPException(status_code=400, detail="start must be before end")
+        records = lifecycle.overlapping(low, high)
+    else:
+        records = lifecycle.active(now)
+
+    wanted = set(criticality.split(",")) if criticality else None
+    if box or wanted:
+        min_lon, min_lat, max_lon, max_lat = box or (-180.0, -90.0, 180.0, 90.0)
+        records = [
+            r for r in records
+            if min_lat <= (r.get("latitude") or 0) <= max_lat
+            and min_lon <= (r.get("longitude") or 0) <= max_lon
+            and (wanted is None or r.get("criticality") in wanted)
+        ]
+    return render_incidents(records, request) if request else records
+
+
+@app.get("/api/incidents/history", response_model=List[Incident])
+async def get_incident_history(
+    bbox: Optional[str] = None,
+    latitude: Optional[float] = Query(default=None, ge=-90, le=90),
+    longitude: Optional[float] = Query(default=None, ge=-180, le=180),
+    radius: Optional[float] = Query(default=None, gt=0, le=200000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    criticality: Optional[str] = None,
+    limit: int = Query(default=5000, ge=1, le=50000),
+    request: Request = None
+):
+    """
+    Get stored incidents for a map area or a radius, newest first
+    
+    The spatial filter runs inside storage (PostGIS GiST index on Supabase,
+    R*Tree in the embedded SQLite store), so only matching rows are read.
+    
+    Args:
+        bbox: Bounding box as "minLon,minLat,maxLon,maxLat"
+        latitude, longitude, radius: Circle in meters (instead of bbox)
+        start: Include incidents starting at or after this time (ISO 8601)
+        end: Include incidents starting before this time (ISO 8601)
+        criticality: Comma-separated criticality filter (e.g. "critical,major")
+        limit: Maximum rows to return (default 5000)
+    """
+    if not storage._is_configured():
+        raise HTTPException(status_code=503, detail="Storage is not configured")
+    since, until = parse_time(start), parse_time(end)
+
+    if bbox:
+        try:
+            parse_bbox(bbox)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
+        rows = await storage.get_incidents_in_bbox(bbox, since, until, criticality, limit)
+    elif latitude is not None and longitude is not None and radius:
+        rows = await storage.get_incidents_within_radius(latitude, longitude, radius, since, until, criticality, limit)
+    else:
+        raise HTTPException(status_code=400, detail="Provide bbox, or latitude, longitude and radius")
+
+    return render_incidents(rows, request) if request else rows
+
+
+@app.get("/api/forecast")
+async def get_incident_forecast(
+    bbox: str,
+    hours: int = Query(24, ge=1, le=FORECAST_HORIZON),
+):
+    """
+    Expected new incidents per hour for the next ``hours`` hours
+    
+    Per zoom-10 tile seasonal (hour-of-week) exponential smoothing over the
+    hourly incident counts; forecasts are precomputed for every tile every
+    FORECAST_REFRESH_INTERVAL seconds, so this only slices them.
+    
+    Args:
+        bbox: Bounding box as "minLon,minLat,maxLon,maxLat"
+        hours: Forecast horizon in hours (1 to FORECAST_HORIZON)
+    """
+    try:
+        box = parse_bbox(bbox)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
+    if forecaster.generated_at is None:
+        raise HTTPException(status_code=503, detail="Forecasts are not ready yet")
+
+    result = forecaster.forecast(box, hours)
+    result["generated_at"] = datetime.fromtimestamp(forecaster.generated_at, tz=timezone.utc).isoformat()
+    return result
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_COLUMNS = list(Incident.model_fields)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+
+async def _limit_chunks(chunks: AsyncIterator[List[Dict[str, Any]]], limit: Optional[int]):
+    """Stop a chunk stream after ``limit`` rows"""
+    remaining = limit
+    async for chunk in chunks:
+        if remaining is not None:
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+        if chunk:
+            yield chunk
+        if remaining == 0:
+            return
+
+
+async def _export_ndjson(chunks: AsyncIterator[List[Dict[str, Any]]]):
+    async for chunk in chunks:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk).encode()
+
+
+async def _export_csv(chunks: AsyncIterator[List[Dict[str, Any]]]):
+    yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+    async for chunk in chunks:
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore").writerows(chunk)
+        yield buffer.getvalue().encode()
+
+
+class _ParquetSink:
+    """Write-only file object that hands each Parquet row group back to the response"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def _export_parquet(chunks: AsyncIterator[List[Dict[str, Any]]], pa, pq):
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("type", pa.string()),
+        ("description", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("severity", pa.int64()),
+        ("criticality", pa.string()),
+        ("start_time", pa.timestamp("us", tz="UTC")),
+        ("end_time", pa.timestamp("us", tz="UTC")),
+        ("road_name", pa.string()),
+        ("location_name", pa.string()),
+        ("length", pa.float64()),
+    ])
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    async for chunk in chunks:
+        rows = [
+            {
+                **{column: row.get(column) for column in EXPORT_COLUMNS},
+                "start_time": parse_time(row.get("start_time")),
+                "end_time": parse_time(row.get("end_time")),
+            }
+            for row in chunk
+        ]
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+@app.get("/api/incidents/export")
+async def export_incidents(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bbox: Optional[str] = None,
+    criticality: Optional[str] = None,
+    format: str = "ndjson",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+):
+    """
+    Stream stored incidents for bulk/historical export
+    
+    Rows are read from storage in fixed-size chunks and written straight to
+    the response, oldest first, so memory use does not grow with the export.
+    
+    Args:
+        start: Include incidents starting at or after this time (ISO 8601)
+        end: Include incidents starting before this time (ISO 8601)
+        bbox: Bounding box as "minLon,minLat,maxLon,maxLat"
+        criticality: Comma-separated criticality filter (e.g. "critical,major")
+        format: ndjson (default), csv or parquet
+        cursor: Resume after a row: "<start_time>,<id>" of the last row received
+        limit: Maximum rows to return; continue with the last row as cursor
+    """
+    media_type = EXPORT_MEDIA_TYPES.get(format)
+    if not media_type:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Expected one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if not storage._is_configured():
+        raise HTTPException(status_code=503, detail="Storage is not configured")
+    if bbox:
+        try:
+            parse_bbox(bbox)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid bbox. Expected 'minLon,minLat,maxLon,maxLat'")
+
+    after = None
+    if cursor:
+        # An unencoded "+00:00" in the query string arrives as " 00:00"
+        after_time, _, after_id = cursor.replace(" ", "+").partition(",")
+        try:
+            after_start = parse_time(after_time)
+        except ValueError:
+            after_start = None
+        if after_start is None or not after_id:
+            raise HTTPException(status_code=400, detail="Invalid cursor. Expected '<start_time>,<id>'")
+        after = (after_start.isoformat(), after_id)
+
+    chunks = _limit_chunks(
+        storage.iter_incidents(
+            since=start, until=end, bbox=bbox, criticality=criticality,
+            after=after, chunk_size=EXPORT_CHUNK_SIZE,
+        ),
+        limit,
+    )
+
+    if format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        body = _export_parquet(chunks, pa, pq)
+    elif format == "csv":
+        body = _export_csv(chunks)
+    else:
+        body = _export_ndjson(chunks)
+
+    filename = f"incidents-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.get("/api/traffic-flow")
 async def get_traffic_flow(
     bbox: str,
-    max_points: int = 100
+    max_points: int = 100,
+    background_tasks: BackgroundTasks = None
 ):
     """
     Get real-time traffic flow data
@@ -405,6 +1577,9 @@ async def get_traffic_flow(
             )
             response.raise_for_status()
             data = response.json()
+
+            if capture_writer and background_tasks:
+                background_tasks.add_task(capture_writer.record, "flow", bbox, data)
             
             # Limit response size
             results = data.get("results", [])[:max_points]
@@ -435,7 +1610,7 @@ async def analyze_risk(request: RiskAnalysisRequest):
     bbox = f"{request.longitude - lon_offset},{request.latitude - lat_offset},{request.longitude + lon_offset},{request.latitude + lat_offset}"
     
     # Get incidents in area
-    incidents = await get_incidents(bbox)
+    incidents = await _load_incidents(bbox)
     
     # Calculate risk score (0-100)
     risk_score = min(len(incidents) * 10, 100)
@@ -448,7 +1623,7 @@ async def analyze_risk(request: RiskAnalysisRequest):
     else:
         risk_level = "high"
     
-    return {
+    result = {
         "location": {
             "latitude": request.latitude,
             "longitude": request.longitude,
@@ -460,61 +1635,101 @@ async def analyze_risk(request: RiskAnalysisRequest):
         "incidents": incidents,
         "analysis_time": datetime.utcnow().isoformat()
     }
+    
+    if request.history_days:
+        # Past incidents in the same circle, counted by the storage spatial index
+        since = datetime.now(timezone.utc) - timedelta(days=request.history_days)
+        try:
+            by_severity = await storage.count_incidents_within_radius(
+                request.latitude, request.longitude, request.radius, since=since
+            )
+        except Exception as exc:
+            print(f"⚠ Risk history lookup failed: {exc}")
+            by_severity = {}
+        total = sum(by_severity.values())
+        result["history"] = {
+            "days": request.history_days,
+            "incident_count": total,
+            "daily_average": round(total / request.history_days, 2),
+            "by_severity": by_severity,
+        }
+    
+    return result
 
 
 @app.get("/api/analytics/summary")
-async def get_analytics_summary(bbox: Optional[str] = None):
+async def get_analytics_summary(
+    bbox: Optional[str] = None,
+    hours: int = Query(default=24, ge=1, le=24 * 366)
+):
     """
-    Get summary analytics.
+    Get summary analytics for the last ``hours`` hours (default 24).
 
     Priority:
-    1) Use configured storage if available.
+    1) Use configured storage if available; windows longer than
+       ROLLUP_AFTER_HOURS read the hourly/daily rollups.
     2) Fallback to live HERE incidents for provided bbox (or ANALYTICS_BBOX env).
     3) Return empty aggregates instead of 500s.
     """
 
-    incidents: List[Dict[str, Any]] = []
+    summary: Optional[Dict[str, Any]] = None
+    source = "rollups" if hours > ROLLUP_AFTER_HOURS else "storage"
 
-    # Try storage first (if configured)
+    # Try storage first (if configured); aggregation happens as close to the data as possible
     try:
-        filters = {
-            "start_time": f"gte.{(datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()}"
-        }
-        incidents = await storage.get_incidents(filters)
+        summary = await storage.summarize(
+            datetime.now(timezone.utc) - timedelta(hours=hours),
+            rollups=hours > ROLLUP_AFTER_HOURS,
+        )
     except Exception as exc:
         print(f"⚠ Analytics storage fetch failed: {exc}")
-        incidents = []
+        summary = None
 
     # Fallback to live HERE API when storage is empty/missing
-    if not incidents:
+    if not summary or not summary["total_incidents"]:
+        source = "live"
+        incidents: List[Dict[str, Any]] = []
         fallback_bbox = bbox or os.getenv("ANALYTICS_BBOX")
         if fallback_bbox:
             try:
-                live_incidents = await get_incidents(fallback_bbox)  # reuse existing handler
+                live_incidents = await _load_incidents(fallback_bbox)  # reuse existing handler
                 incidents = [i.dict() if hasattr(i, "dict") else i for i in live_incidents]
             except Exception as exc:
                 print(f"⚠ Analytics live fallback failed: {exc}")
                 incidents = []
 
-    # Calculate statistics
-    total_incidents = len(incidents)
-    by_severity: Dict[str, int] = {}
-    by_type: Dict[str, int] = {}
-    
-    for incident in incidents:
-        severity = incident.get("criticality", "unknown")
-        by_severity[severity] = by_severity.get(severity, 0) + 1
+        # Calculate statistics
+        by_severity: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
         
-        inc_type = incident.get("type", "unknown")
-        by_type[inc_type] = by_type.get(inc_type, 0) + 1
+        for incident in incidents:
+            severity = incident.get("criticality", "unknown")
+            by_severity[severity] = by_severity.get(severity, 0) + 1
+            
+            inc_type = incident.get("type", "unknown")
+            by_type[inc_type] = by_type.get(inc_type, 0) + 1
+
+        summary = {"total_incidents": len(incidents), "by_severity": by_severity, "by_type": by_type}
     
+    active = lifecycle.active()
+    if bbox:
+        try:
+            min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+            active = [
+                r for r in active
+                if min_lat <= (r.get("latitude") or 0) <= max_lat and min_lon <= (r.get("longitude") or 0) <= max_lon
+            ]
+        except ValueError:
+            pass
+
     return {
-        "period": "24h",
-        "total_incidents": total_incidents,
-        "by_severity": by_severity,
-        "by_type": by_type,
+        "period": f"{hours}h",
+        "total_incidents": summary["total_incidents"],
+        "active_incidents": len(active),
+        "by_severity": summary["by_severity"],
+        "by_type": summary["by_type"],
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "source": "storage" if incidents and len(incidents) > 0 else "live",
+        "source": source,
     }
 
 
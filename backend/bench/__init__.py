@@ -0,0 +1,4 @@
+"""
+CrashLens benchmark harness
+Runs app.py against local HERE/PostgREST/Redis stand-ins and records load-test results
+"""
@@ -0,0 +1,86 @@
+"""
+Compare two benchmark result files and flag regressions
+
+Usage (from backend/):
+    python -m bench.compare bench/results/old.json bench/results/new.json --threshold 10
+
+Exits with status 1 when any scenario's throughput drops, or p95/p99 latency or
+peak RSS grows, by more than ``--threshold`` percent.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# (label, getter, higher_is_better)
+METRICS = [
+    ("rps", lambda r: r["throughput_rps"], True),
+    ("p50", lambda r: r["latency_ms"]["p50"], False),
+    ("p95", lambda r: r["latency_ms"]["p95"], False),
+    ("p99", lambda r: r["latency_ms"]["p99"], False),
+    ("rss", lambda r: r["rss_mb"]["peak"], False),
+    ("bytes", lambda r: r["bytes_per_response"], False),
+    ("serialize", lambda r: r.get("serialize_ms"), False),
+]
+GATED = {"rps", "p95", "p99", "rss"}
+
+
+def _index(report: Dict[str, Any]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    return {(r["scenario"], r["concurrency"]): r for r in report["results"]}
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[str], List[str]]:
+    """Return (table lines, regression descriptions)"""
+    old_index, new_index = _index(old), _index(new)
+    lines = [f"{'scenario':<22}{'conc':>5}  " + "  ".join(f"{label:>18}" for label, _, _ in METRICS)]
+    regressions = []
+    for key in sorted(old_index.keys() & new_index.keys()):
+        cells = []
+        for label, get, higher_is_better in METRICS:
+            before, after = get(old_index[key]), get(new_index[key])
+            change = _change(before, after)
+            if change is None:
+                cells.append(f"{'n/a':>18}")
+                continue
+            cells.append(f"{after:>9.1f} ({change:+6.1f}%)")
+            worse = -change if higher_is_better else change
+            if label in GATED and worse > threshold:
+                regressions.append(f"{key[0]} @ {key[1]}: {label} {before} → {after} ({change:+.1f}%)")
+        lines.append(f"{key[0]:<22}{key[1]:>5}  " + "  ".join(cells))
+    return lines, regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two CrashLens benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"old: {old['meta']['commit']['sha'][:8]}  new: {new['meta']['commit']['sha'][:8]}")
+    lines, regressions = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n⚠ {len(regressions)} regression(s) beyond {args.threshold}%:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
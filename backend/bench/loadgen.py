@@ -0,0 +1,210 @@
+"""
+Closed-loop load generator for the CrashLens API
+
+Each scenario is a function that builds one request; ``run_scenario`` keeps
+``concurrency`` requests in flight for ``duration`` seconds and reports
+throughput, latency percentiles, response bytes and the server's RSS.
+"""
+
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+
+# Nashville, matching the frontend's DEFAULT_MAP_CENTER
+CENTER_LAT = 36.1627
+CENTER_LON = -86.7816
+WARM_BBOX = "-86.9,36.05,-86.65,36.25"
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def _random_bbox(rng: random.Random, span: float = 0.05) -> str:
+    lon = CENTER_LON + rng.uniform(-0.5, 0.5)
+    lat = CENTER_LAT + rng.uniform(-0.5, 0.5)
+    return f"{lon:.4f},{lat:.4f},{lon + span:.4f},{lat + span:.4f}"
+
+
+def _incidents_warm(rng: random.Random) -> RequestSpec:
+    return "GET", "/api/incidents", {"params": {"bbox": WARM_BBOX}}
+
+
+def _incidents_cold(rng: random.Random) -> RequestSpec:
+    return "GET", "/api/incidents", {"params": {"bbox": _random_bbox(rng)}}
+
+
+def _traffic_flow(rng: random.Random) -> RequestSpec:
+    return "GET", "/api/traffic-flow", {"params": {"bbox": WARM_BBOX, "max_points": 100}}
+
+
+def _risk_analysis(rng: random.Random) -> RequestSpec:
+    body = {
+        "latitude": CENTER_LAT + rng.uniform(-0.05, 0.05),
+        "longitude": CENTER_LON + rng.uniform(-0.05, 0.05),
+        "radius": rng.choice([1000, 2500, 5000]),
+    }
+    return "POST", "/api/risk-analysis", {"json": body}
+
+
+def _analytics_summary(rng: random.Random) -> RequestSpec:
+    return "GET", "/api/analytics/summary", {"params": {"bbox": WARM_BBOX}}
+
+
+def _health(rng: random.Random) -> RequestSpec:
+    return "GET", "/health", {}
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], RequestSpec]] = {
+    "health": _health,
+    "incidents_warm": _incidents_warm,
+    "incidents_cold": _incidents_cold,
+    "traffic_flow": _traffic_flow,
+    "risk_analysis": _risk_analysis,
+    "analytics_summary": _analytics_summary,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def read_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident set size of ``pid`` (and its children) in MiB, Linux only"""
+    if pid is None:
+        return None
+    total_kb = 0
+    pids = [pid]
+    children = Path(f"/proc/{pid}/task/{pid}/children")
+    if children.exists():
+        pids += [int(p) for p in children.read_text().split()]
+    for current in pids:
+        try:
+            for line in Path(f"/proc/{current}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+                    break
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return round(total_kb / 1024, 2) if total_kb else None
+
+
+def _server_timing(header: Optional[str], metric: str) -> Optional[float]:
+    """Duration of one metric from a Server-Timing header, in milliseconds"""
+    if not header:
+        return None
+    for entry in header.split(","):
+        name, *params = (p.strip() for p in entry.split(";"))
+        if name != metric:
+            continue
+        for param in params:
+            if param.startswith("dur="):
+                try:
+                    return float(param[4:])
+                except ValueError:
+                    return None
+    return None
+
+
+async def _sample_rss(pid: Optional[int], samples: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_scenario(
+    base_url: str,
+    name: str,
+    concurrency: int,
+    duration: float,
+    warmup: float = 1.0,
+    seed: int = 1,
+    server_pid: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Drive ``concurrency`` closed-loop workers at one scenario and summarize the run"""
+    build = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    body_bytes = 0
+    serialize_ms: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0, headers=headers) as client:
+
+        async def worker(index: int, deadline: float, record: bool) -> None:
+            nonlocal errors, body_bytes
+            rng = random.Random(seed * 1000 + index)
+            while time.perf_counter() < deadline:
+                method, url, kwargs = build(rng)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    elapsed = time.perf_counter() - started
+                    if not record:
+                        continue
+                    latencies.append(elapsed * 1000)
+                    key = str(response.status_code)
+                    statuses[key] = statuses.get(key, 0) + 1
+                    body_bytes += int(response.headers.get("content-length", len(response.content)))
+                    timing = _server_timing(response.headers.get("server-timing"), "serialize")
+                    if timing is not None:
+                        serialize_ms.append(timing)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    if record:
+                        errors += 1
+
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(worker(i, deadline, False) for i in range(concurrency)))
+
+        rss_samples: List[float] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_rss(server_pid, rss_samples, stop))
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(i, deadline, True) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": completed,
+        "errors": errors,
+        "status_codes": statuses,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / completed, 3) if completed else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "bytes_per_response": round(body_bytes / completed, 1) if completed else 0.0,
+        "serialize_ms": round(sum(serialize_ms) / len(serialize_ms), 3) if serialize_ms else None,
+        "rss_mb": {
+            "start": rss_samples[0] if rss_samples else None,
+            "peak": max(rss_samples) if rss_samples else None,
+            "end": rss_samples[-1] if rss_samples else None,
+        },
+    }
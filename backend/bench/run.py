@@ -0,0 +1,220 @@
+"""
+Benchmark runner: starts the stubs and app.py, drives load, saves results as JSON
+
+Usage (from backend/):
+    python -m bench.run
+    python -m bench.run --scenarios incidents_warm,incidents_cold --concurrency 1,16,64 --duration 15
+    python -m bench.run --here-latency-ms 120 --storage-latency-ms 30 --output results/baseline.json
+    python -m bench.run --workers 4   # gunicorn with 4 uvicorn workers (gunicorn.conf.py)
+
+Results land in bench/results/<timestamp>-<commit>.json; compare two runs with
+``python -m bench.compare old.json new.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from bench.loadgen import SCENARIOS, run_scenario
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {"sha": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain"))}
+
+
+def _wait_for(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _start_stubs(args: argparse.Namespace, port: int, redis_port: Optional[int]) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "bench.stubs",
+        "--port", str(port),
+        "--redis-port", str(redis_port or 0),
+        "--here-latency-ms", str(args.here_latency_ms),
+        "--storage-latency-ms", str(args.storage_latency_ms),
+        "--redis-latency-ms", str(args.redis_latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--incidents-per-request", str(args.incidents_per_request),
+        "--flow-per-request", str(args.flow_per_request),
+        "--seed", str(args.seed),
+    ]
+    if args.payload_dir:
+        cmd += ["--payload-dir", args.payload_dir]
+    if args.captures:
+        cmd += ["--captures", *args.captures]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR)
+
+
+def _start_app(args: argparse.Namespace, port: int, stub_port: int, redis_port: Optional[int]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "HERE_API_KEY": "bench",
+        "HERE_API_BASE": f"http://127.0.0.1:{stub_port}/v7",
+        "STORAGE_TYPE": "supabase",
+        "STORAGE_URL": f"http://127.0.0.1:{stub_port}",
+        "STORAGE_KEY": "bench",
+        "ANALYTICS_BBOX": "-86.9,36.05,-86.65,36.25",
+    }
+    if redis_port:
+        env["REDIS_URL"] = f"redis://127.0.0.1:{redis_port}"
+    else:
+        env.pop("REDIS_URL", None)
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+        cmd = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "app:app",
+        ]
+        return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+def _stop(process: Optional[subprocess.Popen]) -> None:
+    if process and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _run_matrix(args: argparse.Namespace, base_url: str, server_pid: int) -> List[Dict[str, Any]]:
+    results = []
+    headers = {"Accept": args.accept} if args.accept else None
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            print(f"→ {name} @ concurrency {concurrency} for {args.duration}s")
+            result = await run_scenario(
+                base_url, name, concurrency, args.duration,
+                warmup=args.warmup, seed=args.seed, server_pid=server_pid, headers=headers,
+            )
+            latency = result["latency_ms"]
+            print(
+                f"  {result['throughput_rps']:>9.1f} req/s  "
+                f"p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms  "
+                f"errors {result['errors']}  rss {result['rss_mb']['peak']} MiB  "
+                f"{result['bytes_per_response']:.0f} B/resp"
+                + (f"  serialize {result['serialize_ms']:.2f}ms" if result["serialize_ms"] is not None else "")
+            )
+            results.append(result)
+    return results
+
+
+def _csv(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options for the stub services, shared with bench.scaling"""
+    parser.add_argument("--no-redis", action="store_true", help="Run without the Redis stub")
+    parser.add_argument("--here-latency-ms", type=float, default=50.0)
+    parser.add_argument("--storage-latency-ms", type=float, default=10.0)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--incidents-per-request", type=int, default=50)
+    parser.add_argument("--flow-per-request", type=int, default=200)
+    parser.add_argument("--payload-dir", help="Serve recorded HERE payloads instead of synthetic ones")
+    parser.add_argument("--captures", nargs="*", help="Serve HERE responses captured with HERE_CAPTURE_DIR")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the CrashLens API against local stubs")
+    parser.add_argument("--scenarios", type=_csv(str), default=list(SCENARIOS),
+                        help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario/concurrency")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--accept", help="Accept header to send with every request")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run the app under gunicorn with this many workers (0: one uvicorn process)")
+    add_stub_arguments(parser)
+    parser.add_argument("--output", help="Result file (default: bench/results/<timestamp>-<commit>.json)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    stub_port, app_port = _free_port(), _free_port()
+    redis_port = None if args.no_redis else _free_port()
+    stubs = app_process = None
+    try:
+        stubs = _start_stubs(args, stub_port, redis_port)
+        _wait_for(f"http://127.0.0.1:{stub_port}/_stats")
+        app_process = _start_app(args, app_port, stub_port, redis_port)
+        _wait_for(f"http://127.0.0.1:{app_port}/health")
+        results = asyncio.run(_run_matrix(args, f"http://127.0.0.1:{app_port}", app_process.pid))
+    finally:
+        _stop(app_process)
+        _stop(stubs)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "results": results,
+    }
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"{stamp}-{commit['sha'][:8]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"✓ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
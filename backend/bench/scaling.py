@@ -0,0 +1,138 @@
+"""
+Worker scaling benchmark: one scenario against 1, 2, 4, ... gunicorn workers
+
+Usage (from backend/):
+    python -m bench.scaling
+    python -m bench.scaling --workers 1,2,4,8 --scenario incidents_warm --concurrency 128 --clients 4
+
+Every worker count gets fresh stubs and a fresh app. Load comes from
+``--clients`` load generator processes so the client is not the bottleneck;
+on a single machine, leave cores free for the stubs and clients (e.g. pin the
+app with ``taskset``) or the curve flattens early. Prints throughput, speedup
+over one worker and scaling efficiency (speedup / workers), and saves JSON
+next to the bench.run results.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bench.loadgen import SCENARIOS, read_rss_mb, run_scenario
+from bench.run import (
+    RESULTS_DIR, _csv, _free_port, _git_commit, _start_app, _start_stubs, _stop, _wait_for, add_stub_arguments,
+)
+
+
+def _default_workers() -> List[int]:
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def _client(base_url: str, scenario: str, concurrency: int, duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    return asyncio.run(run_scenario(base_url, scenario, concurrency, duration, warmup=warmup, seed=seed))
+
+
+def _measure(args: argparse.Namespace, base_url: str, server_pid: int) -> Dict[str, Any]:
+    """Run the scenario from ``args.clients`` processes at once and merge their results"""
+    clients = max(1, min(args.clients, args.concurrency))
+    shares = [args.concurrency // clients + (i < args.concurrency % clients) for i in range(clients)]
+    with ProcessPoolExecutor(max_workers=clients) as pool:
+        futures = [
+            pool.submit(_client, base_url, args.scenario, share, args.duration, args.warmup, args.seed + i)
+            for i, share in enumerate(shares)
+        ]
+        results = [future.result() for future in futures]
+    rss = read_rss_mb(server_pid)
+    return {
+        "throughput_rps": round(sum(r["throughput_rps"] for r in results), 2),
+        "requests": sum(r["requests"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        # Percentiles are per client; report the worst one
+        "p50_ms": max(r["latency_ms"]["p50"] for r in results),
+        "p95_ms": max(r["latency_ms"]["p95"] for r in results),
+        "rss_mb": rss,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure CrashLens throughput as gunicorn workers are added")
+    parser.add_argument("--workers", type=_csv(int), default=_default_workers(),
+                        help="Comma-separated worker counts (default: powers of two up to the core count)")
+    parser.add_argument("--scenario", default="incidents_warm", help=f"One of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight, across all clients")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Load generator processes")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    add_stub_arguments(parser)
+    parser.add_argument("--output", help="Result file (default: bench/results/<timestamp>-<commit>-scaling.json)")
+    args = parser.parse_args(argv)
+    if args.scenario not in SCENARIOS:
+        print(f"Unknown scenario: {args.scenario}", file=sys.stderr)
+        return 2
+
+    rows = []
+    for workers in args.workers:
+        run_args = argparse.Namespace(**{**vars(args), "workers": workers})
+        stub_port, app_port = _free_port(), _free_port()
+        redis_port = None if args.no_redis else _free_port()
+        stubs = app_process = None
+        try:
+            stubs = _start_stubs(run_args, stub_port, redis_port)
+            _wait_for(f"http://127.0.0.1:{stub_port}/_stats")
+            app_process = _start_app(run_args, app_port, stub_port, redis_port)
+            _wait_for(f"http://127.0.0.1:{app_port}/health")
+            print(f"→ {args.scenario} @ concurrency {args.concurrency} with {workers} worker(s)")
+            result = _measure(args, f"http://127.0.0.1:{app_port}", app_process.pid)
+        finally:
+            _stop(app_process)
+            _stop(stubs)
+        result["workers"] = workers
+        rows.append(result)
+
+    base = rows[0]["throughput_rps"] / rows[0]["workers"] if rows and rows[0]["throughput_rps"] else None
+    print(f"\n{'workers':>7}  {'req/s':>9}  {'speedup':>7}  {'efficiency':>10}  {'p95 ms':>8}  errors")
+    for row in rows:
+        row["speedup"] = round(row["throughput_rps"] / base, 2) if base else None
+        row["efficiency"] = round(row["speedup"] / row["workers"], 2) if base else None
+        print(
+            f"{row['workers']:>7}  {row['throughput_rps']:>9.1f}  {row['speedup'] or 0:>7.2f}  "
+            f"{row['efficiency'] or 0:>10.0%}  {row['p95_ms']:>8.1f}  {row['errors']}"
+        )
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "scaling": rows,
+    }
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"{stamp}-{commit['sha'][:8]}-scaling.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"✓ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,567 @@
+"""
+Local stand-ins for the services app.py talks to:
+
+- HERE Traffic v7 ``/incidents`` and ``/flow`` (synthetic, recorded or captured payloads)
+- PostgREST-style ``/rest/v1/incidents`` (in-memory table) and the
+  ``/rest/v1/rpc/*`` functions from database-schema.sql
+- Redis (minimal RESP server: PING/GET/SET/SETEX/DEL/EXPIRE/TTL/EXISTS, plus EVAL for the lock release script)
+
+Every service has a tunable latency so benchmarks can model slow upstreams.
+
+Usage:
+    python -m bench.stubs --port 9100 --redis-port 9101 --here-latency-ms 80
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+import uvicorn
+
+from geo import distance_m, tile_id
+
+
+INCIDENT_TYPES = ["accident", "construction", "congestion", "disabledVehicle", "roadClosure", "laneRestriction"]
+CRITICALITIES = ["critical", "major", "minor", "low"]
+ROADS = ["I-40", "I-24", "I-65", "I-440", "Broadway", "West End Ave", "Charlotte Pike", "Nolensville Pike"]
+
+
+class StubConfig:
+    """Runtime knobs shared by the stub services"""
+
+    def __init__(
+        self,
+        here_latency_ms: float = 0.0,
+        storage_latency_ms: float = 0.0,
+        redis_latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        incidents_per_request: int = 50,
+        flow_per_request: int = 200,
+        seed: int = 1,
+        payload_dir: Optional[str] = None,
+        capture_paths: Optional[List[str]] = None,
+    ):
+        self.here_latency_ms = here_latency_ms
+        self.storage_latency_ms = storage_latency_ms
+        self.redis_latency_ms = redis_latency_ms
+        self.jitter_ms = jitter_ms
+        self.incidents_per_request = incidents_per_request
+        self.flow_per_request = flow_per_request
+        self.seed = seed
+        self.recorded: Dict[str, Any] = {}
+        if payload_dir:
+            for endpoint in ("incidents", "flow"):
+                path = Path(payload_dir) / f"{endpoint}.json"
+                if path.exists():
+                    self.recorded[endpoint] = json.loads(path.read_text())
+        # Real HERE responses written by app.py's capture mode, served round-robin by bbox
+        self.captured: Dict[str, List[Any]] = {"incidents": [], "flow": []}
+        if capture_paths:
+            from capture import iter_captures
+
+            for record in iter_captures(capture_paths):
+                self.captured.setdefault(record["endpoint"], []).append(record["response"])
+
+    async def delay(self, base_ms: float) -> None:
+        """Sleep for the configured latency plus uniform jitter"""
+        if base_ms <= 0 and self.jitter_ms <= 0:
+            return
+        await asyncio.sleep(max(0.0, base_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic HERE payloads
+# ---------------------------------------------------------------------------
+
+def _parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse HERE's ``bbox:minLon,minLat,maxLon,maxLat`` query value"""
+    raw = value.split(":", 1)[-1]
+    min_lon, min_lat, max_lon, max_lat = (float(p) for p in raw.split(","))
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _rng_for(bbox: str, seed: int) -> random.Random:
+    """Deterministic RNG so the same bbox always yields the same payload"""
+    return random.Random(zlib.crc32(f"{seed}:{bbox}".encode()))
+
+
+def _shape(rng: random.Random, bbox: Tuple[float, float, float, float], points: int) -> Dict[str, Any]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat = rng.uniform(min_lat, max_lat)
+    lng = rng.uniform(min_lon, max_lon)
+    pts = []
+    for _ in range(points):
+        pts.append({"lat": round(lat, 6), "lng": round(lng, 6)})
+        lat += rng.uniform(-0.001, 0.001)
+        lng += rng.uniform(-0.001, 0.001)
+    return {"links": [{"points": pts, "length": rng.uniform(50, 800)}]}
+
+
+def synthetic_incidents(bbox: str, count: int, seed: int, criticality: Optional[str] = None) -> Dict[str, Any]:
+    """Build a HERE v7 ``/incidents`` response with ``count`` results inside ``bbox``"""
+    rng = _rng_for(bbox, seed)
+    box = _parse_bbox(bbox)
+    allowed = criticality.split(",") if criticality else CRITICALITIES
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    results = []
+    for i in range(count):
+        road = rng.choice(ROADS)
+        start = now - timedelta(minutes=rng.randint(1, 600))
+        end = now + timedelta(minutes=rng.randint(5, 600))
+        kind = rng.choice(INCIDENT_TYPES)
+        results.append({
+            "location": {
+                "length": round(rng.uniform(50, 12000), 1),
+                "shape": _shape(rng, box, rng.randint(2, 12)),
+                "description": {"value": f"{road} near exit {rng.randint(1, 220)}"},
+            },
+            "incidentDetails": {
+                "id": f"stub-{zlib.crc32(bbox.encode()):08x}-{i}",
+                "type": kind,
+                "criticality": rng.choice(allowed),
+                "description": {"value": f"{kind} on {road}", "language": "en"},
+                "startTime": start.isoformat(),
+                "endTime": end.isoformat(),
+                "roadClosed": rng.random() < 0.1,
+            },
+        })
+    return {"sourceUpdated": now.isoformat(), "results": results}
+
+
+def synthetic_flow(bbox: str, count: int, seed: int) -> Dict[str, Any]:
+    """Build a HERE v7 ``/flow`` response with ``count`` results inside ``bbox``"""
+    rng = _rng_for(bbox, seed + 1)
+    box = _parse_bbox(bbox)
+    results = []
+    for _ in range(count):
+        free_flow = rng.uniform(10, 30)
+        speed = free_flow * rng.uniform(0.2, 1.0)
+        results.append({
+            "location": {
+                "description": rng.choice(ROADS),
+                "length": round(rng.uniform(100, 3000), 1),
+                "shape": _shape(rng, box, rng.randint(2, 20)),
+            },
+            "currentFlow": {
+                "speed": round(speed, 2),
+                "speedUncapped": round(speed, 2),
+                "freeFlow": round(free_flow, 2),
+                "jamFactor": round(10 * (1 - speed / free_flow), 1),
+                "confidence": round(rng.uniform(0.7, 1.0), 2),
+                "traversability": "open",
+            },
+        })
+    return {"sourceUpdated": datetime.now(timezone.utc).isoformat(), "results": results}
+
+
+# ---------------------------------------------------------------------------
+# PostgREST-like incidents table
+# ---------------------------------------------------------------------------
+
+def _coerce(value: Any) -> Any:
+    """Make values comparable: numbers stay numbers, everything else becomes str"""
+    if isinstance(value, (int, float)):
+        return value
+    return "" if value is None else str(value)
+
+
+def _matches(row: Dict[str, Any], column: str, expr: str) -> bool:
+    """Evaluate a single PostgREST ``column=op.value`` filter"""
+    op, _, raw = expr.partition(".")
+    current = row.get(column)
+    if op == "is":
+        return (current is None) == (raw == "null")
+    if op == "in":
+        return str(current) in raw.strip("()").split(",")
+    target: Any = raw
+    if isinstance(current, (int, float)):
+        try:
+            target = float(raw)
+        except ValueError:
+            return False
+    current = _coerce(current)
+    if op == "eq":
+        return current == target
+    if op == "neq":
+        return current != target
+    if op == "gt":
+        return current > target
+    if op == "gte":
+        return current >= target
+    if op == "lt":
+        return current < target
+    if op == "lte":
+        return current <= target
+    return True
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """Split a PostgREST logic list on commas outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    return parts + [current] if current else parts
+
+
+def _matches_logic(row: Dict[str, Any], conjunction: str, expr: str) -> bool:
+    """Evaluate ``or=(...)`` / ``and=(...)`` trees used by keyset pagination"""
+    results = []
+    for part in _split_top_level(expr.strip()[1:-1]):
+        if part.startswith(("and(", "or(")):
+            nested, _, inner = part.partition("(")
+            results.append(_matches_logic(row, nested, "(" + inner))
+        else:
+            column, _, condition = part.partition(".")
+            op, _, value = condition.partition(".")
+            results.append(_matches(row, column, f"{op}.{value.strip(chr(34))}"))
+    return any(results) if conjunction == "or" else all(results)
+
+
+class IncidentTable:
+    """In-memory stand-in for the Supabase ``incidents`` table"""
+
+    RESERVED = {"select", "order", "limit", "offset", "apikey"}
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def insert(self, records: List[Dict[str, Any]], upsert: bool) -> bool:
+        if not upsert and any(r.get("id") in self.rows for r in records):
+            return False
+        for record in records:
+            self.rows[str(record.get("id"))] = record
+        return True
+
+    def select(self, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        rows = list(self.rows.values())
+        for column, expr in params:
+            if column in ("or", "and"):
+                rows = [r for r in rows if _matches_logic(r, column, expr)]
+            elif column not in self.RESERVED:
+                rows = [r for r in rows if _matches(r, column, expr)]
+        query = dict(params)
+        if "order" in query:
+            for clause in reversed(query["order"].split(",")):
+                column, _, direction = clause.partition(".")
+                rows.sort(key=lambda r: _coerce(r.get(column)), reverse=direction.startswith("desc"))
+        offset = int(query.get("offset", 0))
+        if "limit" in query:
+            return rows[offset:offset + int(query["limit"])]
+        return rows[offset:]
+
+
+# ---------------------------------------------------------------------------
+# Minimal Redis (RESP2)
+# ---------------------------------------------------------------------------
+
+class RedisStub:
+    """Just enough of Redis for redis-py's asyncio client and app.py's cache"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command in (b"CLIENT", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            return _bulk(self._get(args[1]))
+        if command == b"SET":
+            ttl = None
+            options = [a.upper() for a in args[3:]]
+            if b"NX" in options and self._get(args[1]) is not None:
+                return b"$-1\r\n"
+            for flag, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+                if flag in options:
+                    ttl = float(args[3 + options.index(flag) + 1]) * scale
+            self.data[args[1]] = (args[2], time.monotonic() + ttl if ttl else None)
+            return b"+OK\r\n"
+        if command == b"SETEX":
+            self.data[args[1]] = (args[3], time.monotonic() + float(args[2]))
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if command == b"EXISTS":
+            return b":%d\r\n" % sum(1 for key in args[1:] if self._get(key) is not None)
+        if command == b"EXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return b":0\r\n"
+            self.data[args[1]] = (value, time.monotonic() + float(args[2]))
+            return b":1\r\n"
+        if command == b"TTL":
+            entry = self.data.get(args[1])
+            if entry is None or self._get(args[1]) is None:
+                return b":-2\r\n"
+            return b":%d\r\n" % (-1 if entry[1] is None else int(entry[1] - time.monotonic()))
+        if command == b"EVAL":
+            # Only app.py's compare-and-delete lock release script is understood
+            script, keys = args[1], args[3:3 + int(args[2])]
+            if b'redis.call("del"' not in script or len(keys) != 1:
+                return b"-ERR unsupported script\r\n"
+            if self._get(keys[0]) != args[3 + len(keys)]:
+                return b":0\r\n"
+            del self.data[keys[0]]
+            return b":1\r\n"
+        if command == b"FLUSHALL":
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await _read_command(reader)
+                if args is None:
+                    break
+                await self.config.delay(self.config.redis_latency_ms)
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    """Read one RESP array of bulk strings (inline commands are not supported)"""
+    header = await reader.readline()
+    if not header:
+        return None
+    if not header.startswith(b"*"):
+        return header.strip().split()
+    args = []
+    for _ in range(int(header[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+# ---------------------------------------------------------------------------
+# HTTP app
+# ---------------------------------------------------------------------------
+
+def create_app(config: StubConfig, redis_port: Optional[int] = None) -> FastAPI:
+    """Build the combined HERE + PostgREST stub app (and start the Redis stub with it)"""
+    table = IncidentTable()
+    redis_stub = RedisStub(config)
+
+    # Payloads are memoized as encoded bytes so the stub itself is never the bottleneck
+    def captured_body(endpoint: str, bbox: str) -> Optional[bytes]:
+        responses = config.captured.get(endpoint)
+        if not responses:
+            return None
+        return json.dumps(responses[zlib.crc32(bbox.encode()) % len(responses)]).encode()
+
+    @lru_cache(maxsize=4096)
+    def incidents_body(bbox: str, criticality: Optional[str]) -> bytes:
+        captured = captured_body("incidents", bbox)
+        if captured:
+            return captured
+        if "incidents" in config.recorded:
+            return json.dumps(config.recorded["incidents"]).encode()
+        return json.dumps(synthetic_incidents(bbox, config.incidents_per_request, config.seed, criticality)).encode()
+
+    @lru_cache(maxsize=4096)
+    def flow_body(bbox: str) -> bytes:
+        captured = captured_body("flow", bbox)
+        if captured:
+            return captured
+        if "flow" in config.recorded:
+            return json.dumps(config.recorded["flow"]).encode()
+        return json.dumps(synthetic_flow(bbox, config.flow_per_request, config.seed)).encode()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        server = None
+        if redis_port:
+            server = await asyncio.start_server(redis_stub.handle, "127.0.0.1", redis_port)
+        yield
+        if server:
+            server.close()
+            await server.wait_closed()
+
+    app = FastAPI(title="CrashLens bench stubs", lifespan=lifespan)
+    here_requests = {"incidents": 0, "flow": 0}
+
+    @app.get("/v7/incidents")
+    async def here_incidents(request: Request):
+        here_requests["incidents"] += 1
+        await config.delay(config.here_latency_ms)
+        params = request.query_params
+        return Response(incidents_body(params["in"], params.get("criticality")), media_type="application/json")
+
+    @app.get("/v7/flow")
+    async def here_flow(request: Request):
+        here_requests["flow"] += 1
+        await config.delay(config.here_latency_ms)
+        return Response(flow_body(request.query_params["in"]), media_type="application/json")
+
+    @app.post("/rest/v1/incidents")
+    async def postgrest_insert(request: Request):
+        await config.delay(config.storage_latency_ms)
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # app.py shutting down mid background task
+            return Response(status_code=499)
+        records = body if isinstance(body, list) else [body]
+        upsert = "merge-duplicates" in request.headers.get("prefer", "")
+        if not table.insert(records, upsert):
+            return JSONResponse({"code": "23505", "message": "duplicate key"}, status_code=409)
+        return Response(status_code=201)
+
+    @app.get("/rest/v1/incidents")
+    async def postgrest_select(request: Request):
+        await config.delay(config.storage_latency_ms)
+        return table.select(list(request.query_params.multi_items()))
+
+    def rpc_rows(rows: List[Dict[str, Any]], body: Dict[str, Any], select: Optional[str]) -> List[Dict[str, Any]]:
+        # Shared tail of the incidents_in_bbox / incidents_within_radius SQL functions
+        wanted = set(body["criticalities"]) if body.get("criticalities") else None
+        rows = [
+            r for r in rows
+            if (not body.get("since") or str(r.get("start_time")) >= body["since"])
+            and (not body.get("until") or str(r.get("start_time")) < body["until"])
+            and (wanted is None or r.get("criticality") in wanted)
+        ]
+        rows.sort(key=lambda r: str(r.get("start_time")), reverse=True)
+        rows = rows[:int(body.get("max_rows") or 5000)]
+        if select:
+            columns = select.split(",")
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+    @app.post("/rest/v1/rpc/incidents_in_bbox")
+    async def rpc_incidents_in_bbox(request: Request):
+        await config.delay(config.storage_latency_ms)
+        body = await request.json()
+        rows = [
+            r for r in table.rows.values()
+            if body["min_lat"] <= r.get("latitude", 0) <= body["max_lat"]
+            and body["min_lon"] <= r.get("longitude", 0) <= body["max_lon"]
+        ]
+        return rpc_rows(rows, body, request.query_params.get("select"))
+
+    @app.post("/rest/v1/rpc/incidents_within_radius")
+    async def rpc_incidents_within_radius(request: Request):
+        await config.delay(config.storage_latency_ms)
+        body = await request.json()
+        rows = [
+            r for r in table.rows.values()
+            if distance_m(body["lat"], body["lon"], r.get("latitude", 0), r.get("longitude", 0)) <= body["radius_m"]
+        ]
+        return rpc_rows(rows, body, request.query_params.get("select"))
+
+    @app.post("/rest/v1/rpc/incident_rollup_summary")
+    async def rpc_rollup_summary(request: Request):
+        # Same groups the SQL function returns, computed from the raw rows
+        await config.delay(config.storage_latency_ms)
+        body = await request.json()
+        groups: Dict[Tuple[str, str], int] = {}
+        for row in table.select([("start_time", f"gte.{body['since']}")]):
+            key = (row.get("criticality") or "unknown", row.get("type") or "unknown")
+            groups[key] = groups.get(key, 0) + 1
+        return [
+            {"criticality": criticality, "type": incident_type, "incident_count": count}
+            for (criticality, incident_type), count in groups.items()
+        ]
+
+    @app.post("/rest/v1/rpc/incident_hourly_tile_counts")
+    async def rpc_hourly_tile_counts(request: Request):
+        await config.delay(config.storage_latency_ms)
+        body = await request.json()
+        groups: Dict[Tuple[str, str], int] = {}
+        for row in table.select([("start_time", f"gte.{body['since']}")]):
+            bucket = str(row.get("start_time"))[:13] + ":00:00"
+            key = (bucket, tile_id(row.get("longitude", 0), row.get("latitude", 0), 10))
+            groups[key] = groups.get(key, 0) + 1
+        rows = [{"bucket": bucket, "tile": tile, "incident_count": count} for (bucket, tile), count in sorted(groups.items())]
+        offset = int(request.query_params.get("offset", 0))
+        limit = int(request.query_params.get("limit", len(rows)))
+        return rows[offset:offset + limit]
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "stored_incidents": len(table.rows),
+            "redis_keys": len(redis_stub.data),
+            "here_requests": here_requests,
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run local HERE/PostgREST/Redis stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100, help="HTTP port for HERE + PostgREST stubs")
+    parser.add_argument("--redis-port", type=int, default=0, help="Redis stub port (0 disables)")
+    parser.add_argument("--here-latency-ms", type=float, default=0.0)
+    parser.add_argument("--storage-latency-ms", type=float, default=0.0)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--incidents-per-request", type=int, default=50)
+    parser.add_argument("--flow-per-request", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--payload-dir", help="Directory with recorded incidents.json / flow.json to serve verbatim")
+    parser.add_argument("--captures", nargs="*", help="HERE capture files/directories (see capture.py) to serve")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        here_latency_ms=args.here_latency_ms,
+        storage_latency_ms=args.storage_latency_ms,
+        redis_latency_ms=args.redis_latency_ms,
+        jitter_ms=args.jitter_ms,
+        incidents_per_request=args.incidents_per_request,
+        flow_per_request=args.flow_per_request,
+        seed=args.seed,
+        payload_dir=args.payload_dir,
+        capture_paths=args.captures,
+    )
+    uvicorn.run(create_app(config, args.redis_port or None), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
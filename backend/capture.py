@@ -0,0 +1,106 @@
+"""
+Record raw HERE responses to compressed, append-only capture files
+
+Each capture is one JSON line wrapped in its own gzip member, so files can be
+appended to safely across restarts and read back with a plain ``gzip.open``.
+A crash mid-write only loses the last, truncated record.
+
+Record shape:
+    {"captured_at": "<ISO 8601>", "endpoint": "incidents" | "flow",
+     "bbox": "minLon,minLat,maxLon,maxLat", "params": {...}, "response": {...}}
+"""
+
+import gzip
+import heapq
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from util import parse_time
+
+
+class CaptureWriter:
+    """Append HERE responses to one ``here-<YYYYMMDD>-<pid>.jsonl.gz`` file per day and process"""
+
+    def __init__(self, directory: Union[str, Path], compresslevel: int = 6):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+
+    def _path_for(self, captured_at: datetime) -> Path:
+        return self.directory / f"here-{captured_at:%Y%m%d}-{os.getpid()}.jsonl.gz"
+
+    def record(
+        self,
+        endpoint: str,
+        bbox: str,
+        response: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        captured_at: Optional[datetime] = None,
+    ) -> None:
+        """Append one raw HERE response (blocking; run it as a background task)"""
+        captured_at = captured_at or datetime.now(timezone.utc)
+        line = json.dumps({
+            "captured_at": captured_at.isoformat(),
+            "endpoint": endpoint,
+            "bbox": bbox,
+            "params": {k: v for k, v in (params or {}).items() if v is not None},
+            "response": response,
+        }, separators=(",", ":")).encode() + b"\n"
+        member = gzip.compress(line, compresslevel=self.compresslevel)
+        try:
+            with self._lock, open(self._path_for(captured_at), "ab") as f:
+                f.write(member)
+        except OSError as e:
+            print(f"⚠ Failed to write HERE capture: {e}")
+
+
+def capture_files(paths: Iterable[Union[str, Path]]) -> List[Path]:
+    """Expand files and directories into a sorted list of capture files"""
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.jsonl.gz")))
+        else:
+            files.append(path)
+    return files
+
+
+def iter_captures(
+    paths: Iterable[Union[str, Path]],
+    endpoint: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield capture records in ``captured_at`` order
+
+    Files are streamed one record at a time and merged by timestamp, so memory
+    stays bounded by the number of open files rather than the capture size.
+    """
+    def read(path: Path) -> Iterator[Dict[str, Any]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if endpoint and record.get("endpoint") != endpoint:
+                        continue
+                    captured_at = parse_time(record["captured_at"])
+                    if since and captured_at < since:
+                        continue
+                    if until and captured_at >= until:
+                        continue
+                    record["captured_at"] = captured_at
+                    yield record
+        except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError) as e:
+            print(f"⚠ Stopped reading truncated capture {path}: {e}")
+
+    streams = [read(path) for path in capture_files(paths)]
+    yield from heapq.merge(*streams, key=lambda record: record["captured_at"])
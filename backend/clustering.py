@@ -0,0 +1,181 @@
+"""
+Grid clustering of incidents for zoomed-out map views
+
+Every zoom level from 0 to ``max_zoom`` keeps a grid of cells roughly
+``CELL_PX`` screen pixels wide. Cells hold running per-criticality counts and
+coordinate sums, so upserts/removals touch one cell per zoom and a cluster
+query only walks the cells inside the viewport.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from geo import lonlat_to_world, world_to_lonlat
+
+CELL_PX = 64
+TILE_PX = 256
+CELL_SHIFT = (TILE_PX // CELL_PX).bit_length() - 1  # cells per tile axis = 2**CELL_SHIFT
+
+
+class _Cell:
+    __slots__ = ("by_criticality",)
+
+    def __init__(self):
+        # criticality -> [count, sum_x, sum_y]
+        self.by_criticality: Dict[str, List[float]] = {}
+
+    def add(self, criticality: str, x: float, y: float, sign: int) -> None:
+        stats = self.by_criticality.get(criticality)
+        if stats is None:
+            stats = self.by_criticality[criticality] = [0, 0.0, 0.0]
+        stats[0] += sign
+        stats[1] += sign * x
+        stats[2] += sign * y
+        if stats[0] <= 0:
+            del self.by_criticality[criticality]
+
+
+class ClusterIndex:
+    """Incident clusters precomputed for every zoom level, updated incrementally"""
+
+    def __init__(self, max_zoom: int = 14):
+        self.max_zoom = max_zoom
+        self._levels: List[Dict[Tuple[int, int], _Cell]] = [{} for _ in range(max_zoom + 1)]
+        # id -> (record, x, y, criticality, last_seen)
+        self._incidents: Dict[str, Tuple[Dict[str, Any], float, float, str, float]] = {}
+        # finest-level cell -> ids, for returning full records when zoomed in
+        self._members: Dict[Tuple[int, int], set] = {}
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    @staticmethod
+    def _cell(x: float, y: float, zoom: int) -> Tuple[int, int]:
+        scale = 1 << (zoom + CELL_SHIFT)
+        return int(x * scale), int(y * scale)
+
+    def _apply(self, incident_id: str, x: float, y: float, criticality: str, sign: int) -> None:
+        for zoom, cells in enumerate(self._levels):
+            key = self._cell(x, y, zoom)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = _Cell()
+            cell.add(criticality, x, y, sign)
+            if not cell.by_criticality:
+                del cells[key]
+        finest = self._cell(x, y, self.max_zoom)
+        if sign > 0:
+            self._members.setdefault(finest, set()).add(incident_id)
+        else:
+            members = self._members.get(finest)
+            if members is not None:
+                members.discard(incident_id)
+                if not members:
+                    del self._members[finest]
+
+    def upsert(self, incident: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Add or move an incident; unchanged incidents only refresh last_seen"""
+        incident_id = str(incident.get("id", ""))
+        if not incident_id:
+            return
+        now = now or time.time()
+        x, y = lonlat_to_world(float(incident.get("longitude") or 0), float(incident.get("latitude") or 0))
+        criticality = incident.get("criticality") or "unknown"
+        existing = self._incidents.get(incident_id)
+        if existing is not None:
+            _, old_x, old_y, old_criticality, _ = existing
+            if (old_x, old_y, old_criticality) == (x, y, criticality):
+                self._incidents[incident_id] = (incident, x, y, criticality, now)
+                return
+            self._apply(incident_id, old_x, old_y, old_criticality, -1)
+        self._apply(incident_id, x, y, criticality, +1)
+        self._incidents[incident_id] = (incident, x, y, criticality, now)
+
+    def upsert_many(self, incidents: Iterable[Dict[str, Any]]) -> None:
+        now = time.time()
+        for incident in incidents:
+            self.upsert(incident, now)
+
+    def remove(self, incident_id: str) -> None:
+        existing = self._incidents.pop(incident_id, None)
+        if existing is not None:
+            _, x, y, criticality, _ = existing
+            self._apply(incident_id, x, y, criticality, -1)
+
+    def prune(self, older_than: float) -> int:
+        """Drop incidents not seen since ``older_than`` (epoch seconds)"""
+        stale = [i for i, entry in self._incidents.items() if entry[4] < older_than]
+        for incident_id in stale:
+            self.remove(incident_id)
+        return len(stale)
+
+    def _cell_range(self, bbox: Tuple[float, float, float, float], zoom: int):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        x0, y1 = lonlat_to_world(min_lon, min_lat)
+        x1, y0 = lonlat_to_world(max_lon, max_lat)
+        (cx0, cy0), (cx1, cy1) = self._cell(x0, y0, zoom), self._cell(x1, y1, zoom)
+        return cx0, cy0, cx1, cy1
+
+    def _cells_in(self, cells: Dict[Tuple[int, int], Any], bbox, zoom: int):
+        cx0, cy0, cx1, cy1 = self._cell_range(bbox, zoom)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(cells):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = cells.get((cx, cy))
+                    if cell is not None:
+                        yield (cx, cy), cell
+        else:
+            for key, cell in cells.items():
+                if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1:
+                    yield key, cell
+
+    def clusters(
+        self,
+        bbox: Tuple[float, float, float, float],
+        zoom: int,
+        criticalities: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Clusters intersecting ``bbox`` at ``zoom`` with a severity breakdown"""
+        zoom = max(0, min(zoom, self.max_zoom))
+        wanted = set(criticalities) if criticalities else None
+        results = []
+        for (cx, cy), cell in self._cells_in(self._levels[zoom], bbox, zoom):
+            count, sum_x, sum_y = 0, 0.0, 0.0
+            breakdown: Dict[str, int] = {}
+            for criticality, (n, sx, sy) in cell.by_criticality.items():
+                if wanted is not None and criticality not in wanted:
+                    continue
+                count += n
+                sum_x += sx
+                sum_y += sy
+                breakdown[criticality] = int(n)
+            if not count:
+                continue
+            lon, lat = world_to_lonlat(sum_x / count, sum_y / count)
+            results.append({
+                "id": f"{zoom}/{cx}/{cy}",
+                "latitude": round(lat, 6),
+                "longitude": round(lon, 6),
+                "count": int(count),
+                "by_criticality": breakdown,
+            })
+        return results
+
+    def incidents(
+        self,
+        bbox: Tuple[float, float, float, float],
+        criticalities: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Full records inside ``bbox``"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        wanted = set(criticalities) if criticalities else None
+        results = []
+        for _, members in self._cells_in(self._members, bbox, self.max_zoom):
+            for incident_id in members:
+                record, _, _, criticality, _ = self._incidents[incident_id]
+                if wanted is not None and criticality not in wanted:
+                    continue
+                lat, lon = record.get("latitude") or 0, record.get("longitude") or 0
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    results.append(record)
+        return results
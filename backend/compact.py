@@ -0,0 +1,109 @@
+"""
+Incident list encodings negotiated through the Accept header
+
+- ``application/json`` (default): the usual list of incident objects
+- ``application/vnd.crashlens.columnar+json``: columnar JSON
+- ``application/x-msgpack`` / ``application/msgpack``: columnar MessagePack
+  (falls back to columnar JSON when msgpack is not installed)
+
+Columnar payloads hold parallel arrays instead of one object per incident,
+with epoch-second timestamps and dictionary-encoded repeated strings:
+
+    {"v": 1, "n": 2,
+     "id": ["a", "b"], "lat": [36.1, 36.2], "lon": [-86.7, -86.8],
+     "severity": [3, 1], "start": [1718000000, 1718000300], "end": [null, 1718003600],
+     "length": [120.0, 3400.0], "description": ["...", "..."],
+     "type": {"values": ["accident"], "codes": [0, 0]},
+     "criticality": {"values": ["critical", "minor"], "codes": [0, 1]},
+     "road_name": {...}, "location_name": {...}}
+
+A null dictionary code means the value was null.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from util import get_field, to_epoch
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.crashlens.columnar+json"
+MSGPACK = "application/x-msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/msgpack", "application/vnd.msgpack")
+
+DICTIONARY_FIELDS = ("type", "criticality", "road_name", "location_name")
+
+
+def _epoch(value: Any) -> Optional[int]:
+    seconds = to_epoch(value, strict=False)
+    return None if seconds is None else int(seconds)
+
+
+def _dictionary(values: List[Any]) -> Dict[str, List[Any]]:
+    lookup: Dict[Any, int] = {}
+    codes: List[Optional[int]] = []
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(lookup)
+        codes.append(code)
+    return {"values": list(lookup), "codes": codes}
+
+
+def encode_columnar(incidents: List[Any]) -> Dict[str, Any]:
+    """Transpose incident objects (models or dicts) into the columnar layout"""
+    payload: Dict[str, Any] = {
+        "v": 1,
+        "n": len(incidents),
+        "id": [str(get_field(i, "id")) for i in incidents],
+        "lat": [get_field(i, "latitude") for i in incidents],
+        "lon": [get_field(i, "longitude") for i in incidents],
+        "severity": [get_field(i, "severity") for i in incidents],
+        "start": [_epoch(get_field(i, "start_time")) for i in incidents],
+        "end": [_epoch(get_field(i, "end_time")) for i in incidents],
+        "length": [get_field(i, "length") for i in incidents],
+        "description": [get_field(i, "description") for i in incidents],
+    }
+    for field in DICTIONARY_FIELDS:
+        payload[field] = _dictionary([get_field(i, field) for i in incidents])
+    return payload
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the best supported media type from an Accept header (JSON unless asked otherwise)"""
+    if not accept:
+        return JSON
+    ranked = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = (p.strip() for p in part.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        ranked.append((-quality, position, media_type.lower()))
+    for quality, _, media_type in sorted(ranked):
+        if quality == 0:
+            continue
+        if media_type in MSGPACK_TYPES:
+            return MSGPACK if _msgpack() else COLUMNAR_JSON
+        if media_type == COLUMNAR_JSON:
+            return COLUMNAR_JSON
+        if media_type in (JSON, "application/*", "*/*"):
+            return JSON
+    return JSON
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+def pack_msgpack(payload: Dict[str, Any]) -> bytes:
+    return _msgpack().packb(payload, use_bin_type=True)
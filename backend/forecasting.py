@@ -0,0 +1,268 @@
+"""
+Per-tile incident-rate forecasting
+
+Every zoom-10 map tile (the same tiles the storage rollups use) keeps an
+hourly series of new-incident counts in a NumPy ring buffer. One additive
+seasonal exponential smoothing model per tile (level + hour-of-week
+seasonality, no trend) is advanced for all tiles at once whenever an hour
+closes, and the next ``horizon`` hours are precomputed for every tile in the
+same batch, so requests only slice an array. A full refit over the whole
+buffer every ``refit_hours`` picks up incidents reported after their start
+hour had already been folded in.
+
+    level_t  = alpha * (y_t - season_{t-168}) + (1 - alpha) * level_{t-1}
+    season_t = gamma * (y_t - level_t) + (1 - gamma) * season_{t-168}
+    y_{t+h}  = max(0, level_t + season_{t+h-168})
+
+Incidents are counted once per id, in the hour they started. Hours before
+the forecaster was created (``live_since``) come only from ``seed`` (the
+stored history) and later hours only from ``ingest``, so incidents still
+active across a restart, or ingested before the seed finishes, are never
+counted twice.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from geo import tile_xy, world_to_lonlat
+from util import to_epoch
+
+TILE_ZOOM = 10  # matches the rollup tiles in database-schema.sql / local_store.py
+HOUR = 3600
+SEASON = 168  # hours per week
+
+
+class IncidentForecaster:
+    """Hourly incident counts and forecasts for every tile, updated in vectorized batches"""
+
+    def __init__(
+        self,
+        history_hours: int = 4 * SEASON,
+        horizon: int = 48,
+        alpha: float = 0.2,
+        gamma: float = 0.1,
+        refit_hours: int = 24,
+        now: Optional[float] = None,
+    ):
+        if history_hours < SEASON:
+            raise ValueError("history_hours must cover at least one week")
+        self.history_hours = history_hours
+        self.horizon = horizon
+        self.alpha = alpha
+        self.gamma = gamma
+        self.refit_hours = refit_hours
+        self._lock = threading.Lock()
+
+        capacity = 256
+        self._tiles: Dict[str, int] = {}
+        self._tile_x = np.zeros(capacity, dtype=np.int32)
+        self._tile_y = np.zeros(capacity, dtype=np.int32)
+        self._counts = np.zeros((capacity, history_hours), dtype=np.float32)
+        self._level = np.zeros(capacity, dtype=np.float64)
+        self._season = np.zeros((capacity, SEASON), dtype=np.float64)
+
+        # Newest hour held in the ring buffer, and last hour folded into the models
+        self._head = int((time.time() if now is None else now) // HOUR)
+        self._fitted_through = self._head - 1
+        self._refit_at = self._head
+        self.live_since = self._head * HOUR
+        self._counted: Dict[str, int] = {}
+
+        self._forecast = np.zeros((0, horizon), dtype=np.float32)
+        self._forecast_start = self._head
+        self.generated_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    # Ingest -----------------------------------------------------------------
+
+    def _row(self, tile: Tuple[int, int]) -> int:
+        key = f"{TILE_ZOOM}/{tile[0]}/{tile[1]}"
+        row = self._tiles.get(key)
+        if row is not None:
+            return row
+        row = len(self._tiles)
+        if row == len(self._tile_x):
+            grow = len(self._tile_x)
+            self._tile_x = np.concatenate([self._tile_x, np.zeros(grow, dtype=np.int32)])
+            self._tile_y = np.concatenate([self._tile_y, np.zeros(grow, dtype=np.int32)])
+            self._counts = np.vstack([self._counts, np.zeros((grow, self.history_hours), dtype=np.float32)])
+            self._level = np.concatenate([self._level, np.zeros(grow)])
+            self._season = np.vstack([self._season, np.zeros((grow, SEASON))])
+        self._tiles[key] = row
+        self._tile_x[row], self._tile_y[row] = tile
+        return row
+
+    def _roll_to(self, hour: int) -> None:
+        """Move the ring buffer head forward, clearing reused slots"""
+        if hour <= self._head:
+            return
+        steps = min(hour - self._head, self.history_hours)
+        slots = (np.arange(hour - steps + 1, hour + 1)) % self.history_hours
+        self._counts[:, slots] = 0
+        self._head = hour
+
+    def _add(self, tile: Tuple[int, int], hour: int, count: float) -> None:
+        if hour > self._head or hour <= self._head - self.history_hours:
+            return
+        row = self._row(tile)  # may grow (replace) the arrays
+        self._counts[row, hour % self.history_hours] += count
+
+    def ingest(self, incidents: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """Count incidents not seen before that started at or after ``live_since`` into their tile's start hour"""
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            self._roll_to(int(now // HOUR))
+            for incident in incidents:
+                incident_id = str(incident.get("id") or "")
+                if not incident_id or incident_id in self._counted:
+                    continue
+                started = to_epoch(incident.get("start_time"), strict=False)
+                if started is None or started < self.live_since:
+                    continue
+                hour = int(started // HOUR)
+                self._counted[incident_id] = hour
+                tile = tile_xy(float(incident.get("longitude") or 0), float(incident.get("latitude") or 0), TILE_ZOOM)
+                self._add(tile, hour, 1)
+                added += 1
+        return added
+
+    def seed(self, hourly_counts: Iterable[Tuple[float, str, float]], now: Optional[float] = None) -> None:
+        """
+        Load (hour start epoch, "z/x/y" tile, count) history before
+        ``live_since``, e.g. from the storage rollups; the next refresh
+        refits every model from the whole buffer
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._roll_to(int(now // HOUR))
+            oldest = self._head - self.history_hours
+            live = int(self.live_since // HOUR)
+            parsed: Dict[str, int] = {}
+            rows, slots, values = [], [], []
+            for bucket, tile, count in hourly_counts:
+                hour = int(bucket // HOUR)
+                if hour >= live or hour <= oldest:
+                    continue
+                row = parsed.get(tile)
+                if row is None:
+                    zoom, x, y = (int(part) for part in tile.split("/"))
+                    row = parsed[tile] = self._row((x, y)) if zoom == TILE_ZOOM else -1
+                if row >= 0:
+                    rows.append(row)
+                    slots.append(hour % self.history_hours)
+                    values.append(count)
+            np.add.at(self._counts, (np.array(rows, dtype=np.intp), np.array(slots, dtype=np.intp)),
+                      np.array(values, dtype=np.float32))
+            # The next refresh refits every model from the whole buffer
+            self._refit_at = self._head - self.refit_hours
+
+    # Models -----------------------------------------------------------------
+
+    def _series(self, first_hour: int, last_hour: int) -> np.ndarray:
+        """Copy of the counts for hours first..last (inclusive) as a (tiles, hours) array"""
+        hours = np.arange(first_hour, last_hour + 1) % self.history_hours
+        return np.take(self._counts[:len(self._tiles)], hours, axis=1)
+
+    def _smooth(self, series: np.ndarray, first_hour: int, level: np.ndarray, season: np.ndarray) -> None:
+        """Fold hourly counts starting at ``first_hour`` into level/seasonality for every tile at once"""
+        alpha, gamma = self.alpha, self.gamma
+        for offset in range(series.shape[1]):
+            slot = (first_hour + offset) % SEASON
+            y = series[:, offset]
+            level[:] = alpha * (y - season[:, slot]) + (1 - alpha) * level
+            season[:, slot] = gamma * (y - level) + (1 - gamma) * season[:, slot]
+
+    def _fit(self, series: np.ndarray, first_hour: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fit from scratch: initialize from the oldest week, then smooth through
+        the rest. A one-week buffer holds only 167 closed hours; the missing
+        hour-of-week slot starts with no seasonal offset.
+        """
+        width = min(SEASON, series.shape[1])
+        first_week = series[:, :width]
+        level = first_week.mean(axis=1, dtype=np.float64)
+        season = np.zeros((len(series), SEASON))
+        season[:, np.arange(first_hour, first_hour + width) % SEASON] = first_week - level[:, None]
+        self._smooth(series[:, width:], first_hour + width, level, season)
+        return level, season
+
+    def refresh(self, now: Optional[float] = None) -> None:
+        """
+        Advance the models through every closed hour and precompute all
+        forecasts. The models are fit on copies outside the lock, so ingest()
+        never waits on a refit.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._roll_to(int(now // HOUR))
+            head, n = self._head, len(self._tiles)
+            refit = head - self._refit_at >= self.refit_hours
+            first = head - self.history_hours + 1
+            if not refit:
+                first = max(self._fitted_through + 1, first)
+                level, season = self._level[:n].copy(), self._season[:n].copy()
+            series = self._series(first, head - 1)
+            oldest = head - self.history_hours
+            self._counted = {k: h for k, h in self._counted.items() if h > oldest}
+
+        if refit:
+            level, season = self._fit(series, first)
+        else:
+            self._smooth(series, first, level, season)
+        slots = np.arange(head, head + self.horizon) % SEASON
+        forecast = np.clip(level[:, None] + season[:, slots], 0, None).astype(np.float32)
+
+        # Tiles first seen while fitting keep zero state until the next refresh
+        with self._lock:
+            self._level[:n], self._season[:n] = level, season
+            self._fitted_through = head - 1
+            if refit:
+                self._refit_at = head
+            self._forecast, self._forecast_start = forecast, head
+        self.generated_at = time.time()
+
+    # Queries ----------------------------------------------------------------
+
+    def forecast(self, bbox: Tuple[float, float, float, float], hours: int) -> Dict[str, Any]:
+        """Expected incidents per hour for the next ``hours`` hours, per tile in ``bbox``"""
+        hours = max(1, min(hours, self.horizon))
+        forecast, start = self._forecast, self._forecast_start
+        min_lon, min_lat, max_lon, max_lat = bbox
+        x0, y0 = tile_xy(min_lon, max_lat, TILE_ZOOM)
+        x1, y1 = tile_xy(max_lon, min_lat, TILE_ZOOM)
+        n = len(forecast)
+        xs, ys = self._tile_x[:n], self._tile_y[:n]
+        rows = np.nonzero((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1))[0]
+
+        # The current hour may have closed since the last refresh; skip past hours
+        skip = max(0, int(time.time() // HOUR) - start)
+        window = forecast[rows, skip:skip + hours]
+        scale = 1 << TILE_ZOOM
+        tiles = []
+        for row, expected in zip(rows.tolist(), window):
+            x, y = int(xs[row]), int(ys[row])
+            lon, lat = world_to_lonlat((x + 0.5) / scale, (y + 0.5) / scale)
+            tiles.append({
+                "tile": f"{TILE_ZOOM}/{x}/{y}",
+                "latitude": round(lat, 6),
+                "longitude": round(lon, 6),
+                "expected": [round(float(v), 3) for v in expected],
+                "total": round(float(expected.sum()), 3),
+            })
+        tiles.sort(key=lambda t: t["total"], reverse=True)
+        totals = window.sum(axis=0)
+        return {
+            "start": datetime.fromtimestamp((start + skip) * HOUR, tz=timezone.utc).isoformat(),
+            "hours": int(window.shape[1]),
+            "zoom": TILE_ZOOM,
+            "expected": [round(float(v), 3) for v in totals],
+            "total": round(float(totals.sum()), 3),
+            "tiles": tiles,
+        }
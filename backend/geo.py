@@ -0,0 +1,74 @@
+"""
+Web Mercator and distance helpers shared by clustering, storage tiles,
+spatial queries and forecasting
+
+World coordinates are normalized to [0, 1) on both axes, matching the slippy
+map tiles Leaflet renders: at zoom ``z`` there are ``2**z`` tiles per axis.
+"""
+
+import math
+from typing import Tuple
+
+MAX_LATITUDE = 85.05112878
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """Parse "minLon,minLat,maxLon,maxLat"; raises ValueError on bad input"""
+    parts = bbox.split(",") if bbox else []
+    if len(parts) != 4:
+        raise ValueError("Expected 'minLon,minLat,maxLon,maxLat'")
+    min_lon, min_lat, max_lon, max_lat = (float(p) for p in parts)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def lonlat_to_world(lon: float, lat: float) -> Tuple[float, float]:
+    """Project WGS84 to normalized Web Mercator (x grows east, y grows south)"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def world_to_lonlat(x: float, y: float) -> Tuple[float, float]:
+    """Inverse of lonlat_to_world"""
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lon, lat
+
+
+def tile_xy(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Slippy map tile containing a point"""
+    x, y = lonlat_to_world(lon, lat)
+    scale = 1 << zoom
+    return int(x * scale), int(y * scale)
+
+
+def tile_id(lon: float, lat: float, zoom: int) -> str:
+    """Tile key as "z/x/y" """
+    x, y = tile_xy(lon, lat, zoom)
+    return f"{zoom}/{x}/{y}"
+
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Bounding box (minLon, minLat, maxLon, maxLat) that contains a radius around a point"""
+    angular = radius_m / EARTH_RADIUS_M
+    d_lat = math.degrees(angular)
+    ratio = math.sin(angular) / max(math.cos(math.radians(lat)), 1e-12)
+    d_lon = 180.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+    return (
+        max(-180.0, lon - d_lon), max(-90.0, lat - d_lat),
+        min(180.0, lon + d_lon), min(90.0, lat + d_lat),
+    )
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the multi-worker deployment mode
+
+    gunicorn -c gunicorn.conf.py app:app
+
+One uvicorn worker per CPU core (override with WEB_CONCURRENCY). The app is
+imported once in the master and forked, so workers start without paying the
+import cost again. Shared state between workers (incident cache, HERE fetch
+locks, compaction lease) lives in Redis; set REDIS_URL when running more than
+one worker.
+"""
+
+import os
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or _cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # e.g. "-" for stdout
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
@@ -0,0 +1,182 @@
+"""
+In-memory query engine for incident search, filtering, sorting and pagination
+
+An IncidentIndex is built once per incident list (one per bbox/criticality
+cache entry) and answers every search keystroke from that list:
+
+- a token inverted index over type, description, road and location, matched
+  by token prefix (camelCase types are also split, so "vehicle" finds
+  "disabledVehicle")
+- one presorted position array per sort key, so a page is a bisect plus a
+  short forward walk
+- keyset cursors over (sort key, id), tagged with the sort order they came
+  from and stable while the list is unchanged
+"""
+
+import base64
+import bisect
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from util import get_field, to_epoch
+
+SORT_KEYS = ("severity", "time", "length")
+TEXT_FIELDS = ("type", "description", "road_name", "location_name")
+
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+_CAMEL = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+
+
+def tokenize(text: str) -> Set[str]:
+    """Lowercase alphanumeric tokens plus camelCase parts"""
+    tokens = set()
+    for word in _TOKEN.findall(text):
+        tokens.add(word.lower())
+        for part in _CAMEL.findall(word):
+            tokens.add(part.lower())
+    return tokens
+
+
+def encode_cursor(sort: str, key: Tuple[Any, ...]) -> str:
+    payload = json.dumps([sort, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, ...]:
+    """Raises ValueError on malformed cursors and on cursors from another sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, *key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if cursor_sort != sort:
+        raise ValueError("Invalid cursor for this sort")
+    return tuple(key)
+
+
+def fingerprint(incidents: List[Any]) -> int:
+    """Cheap change detector for reusing an index across cache hits"""
+    return hash(tuple(
+        (
+            get_field(i, "id"), get_field(i, "criticality"), get_field(i, "length"),
+            str(get_field(i, "start_time")), get_field(i, "description"),
+        )
+        for i in incidents
+    ))
+
+
+class IncidentIndex:
+    """Prebuilt search index and sort orders over one incident list"""
+
+    def __init__(self, incidents: List[Any]):
+        self.incidents = incidents
+        self.lengths = [float(get_field(i, "length") or 0) for i in incidents]
+        ids = [str(get_field(i, "id") or "") for i in incidents]
+
+        postings: Dict[str, List[int]] = {}
+        for position, incident in enumerate(incidents):
+            text = " ".join(str(get_field(incident, field) or "") for field in TEXT_FIELDS)
+            for token in tokenize(text):
+                postings.setdefault(token, []).append(position)
+        self._postings = postings
+        self._tokens = sorted(postings)
+
+        # Sort keys ascend; descending orders are stored negated
+        severity = [(-int(get_field(i, "severity") or 0), ids[p]) for p, i in enumerate(incidents)]
+        starts = [to_epoch(get_field(i, "start_time"), strict=False) or 0.0 for i in incidents]
+        start = [(-starts[p], ids[p]) for p in range(len(incidents))]
+        length = [(-self.lengths[p], ids[p]) for p in range(len(incidents))]
+        # name -> (sorted keys, positions in sort order, rank of each position)
+        self._orders: Dict[str, Tuple[List[Tuple[Any, ...]], List[int], List[int]]] = {}
+        for name, keys in (("severity", severity), ("time", start), ("length", length)):
+            order = sorted(range(len(incidents)), key=keys.__getitem__)
+            rank = [0] * len(order)
+            for index, position in enumerate(order):
+                rank[position] = index
+            self._orders[name] = ([keys[p] for p in order], order, rank)
+
+        self.criticality_counts: Dict[str, int] = {}
+        for incident in incidents:
+            label = get_field(incident, "criticality") or "unknown"
+            self.criticality_counts[label] = self.criticality_counts.get(label, 0) + 1
+
+    def _match_text(self, query: str) -> Optional[Set[int]]:
+        """Positions whose tokens prefix-match every query token (None = no text filter)"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        matches: Optional[Set[int]] = None
+        for term in sorted(terms, key=len, reverse=True):
+            positions: Set[int] = set()
+            index = bisect.bisect_left(self._tokens, term)
+            while index < len(self._tokens) and self._tokens[index].startswith(term):
+                positions.update(self._postings[self._tokens[index]])
+                index += 1
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return set()
+        return matches
+
+    def query(
+        self,
+        text: Optional[str] = None,
+        min_length: Optional[float] = None,
+        max_length: Optional[float] = None,
+        sort: str = "severity",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Any], Optional[str], int]:
+        """
+        Return (page, next_cursor, total_matches)
+
+        ``min_length`` is inclusive and ``max_length`` exclusive, matching the
+        frontend's length buckets.
+        """
+        if sort not in self._orders:
+            raise ValueError(f"Invalid sort. Expected one of: {', '.join(SORT_KEYS)}")
+        keys, order, rank = self._orders[sort]
+        candidates = self._match_text(text) if text else None
+
+        def matches(position: int) -> bool:
+            if candidates is not None and position not in candidates:
+                return False
+            length = self.lengths[position]
+            if min_length is not None and length < min_length:
+                return False
+            if max_length is not None and length >= max_length:
+                return False
+            return True
+
+        if candidates is not None:
+            total = sum(1 for p in candidates if matches(p))
+        elif min_length is None and max_length is None:
+            total = len(order)
+        else:
+            total = sum(1 for p in order if matches(p))
+
+        start = 0
+        if cursor:
+            try:
+                start = bisect.bisect_right(keys, decode_cursor(cursor, sort))
+            except TypeError:
+                raise ValueError("Invalid cursor for this sort")
+        # Selective text searches walk only their own hits, in sort order
+        if candidates is not None and len(candidates) * 8 < len(order):
+            walk = sorted(r for r in (rank[p] for p in candidates) if r >= start)
+        else:
+            walk = range(start, len(order))
+
+        page: List[Any] = []
+        next_cursor = None
+        last_key = None
+        for index in walk:
+            position = order[index]
+            if not matches(position):
+                continue
+            if limit is not None and len(page) == limit:
+                next_cursor = encode_cursor(sort, last_key)
+                break
+            page.append(self.incidents[position])
+            last_key = keys[index]
+        return page, next_cursor, total
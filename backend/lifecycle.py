@@ -0,0 +1,284 @@
+"""
+Active-incident lifecycle: expiry at end_time and interval queries
+
+``LifecycleStore`` keeps every incident seen recently, keyed by id:
+
+- a hierarchical ``TimingWheel`` fires once per incident at its ``end_time``
+  or ``stale_ttl`` after it was last seen, whichever comes first, moving it
+  from active to ended (incidents HERE stops reporting are closed where they
+  were last seen); a second timer evicts it ``retention`` later
+- an ``IntervalIndex`` (start-sorted intervals with a max-end segment tree)
+  answers "active at T" and "overlapping [A, B]" in O(log n + matches); it
+  is rebuilt lazily on the first query after an interval changes
+
+Times are epoch seconds. The wheel runs in whole-second ticks and never fires
+early; ``active()`` also checks the exact end time, so answers are exact.
+"""
+
+import bisect
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from util import to_epoch
+
+OPEN = math.inf
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with O(1) schedule/cancel
+
+    Level ``l`` has ``slots`` buckets each ``slots**l`` ticks wide; timers
+    cascade down a level as the wheel turns and fire from level 0 on their
+    exact tick. Deadlines past the top level wait in an overflow map.
+    """
+
+    def __init__(self, now: float, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._levels: List[List[Set[Hashable]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._horizon = 1 << (self._bits * levels)
+        self._overflow: Set[Hashable] = set()
+        self._due: Set[Hashable] = set()
+        self._current = int(now // tick)
+        # key -> (deadline tick, level, slot); level -1 = overflow, -2 = due
+        self._timers: Dict[Hashable, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def _place(self, key: Hashable, deadline: int) -> None:
+        delta = deadline - self._current
+        if delta <= 0:
+            self._due.add(key)
+            self._timers[key] = (deadline, -2, 0)
+            return
+        if delta >= self._horizon:
+            self._overflow.add(key)
+            self._timers[key] = (deadline, -1, 0)
+            return
+        level = 0
+        while delta >= 1 << (self._bits * (level + 1)):
+            level += 1
+        slot = (deadline >> (self._bits * level)) & self._mask
+        self._levels[level][slot].add(key)
+        self._timers[key] = (deadline, level, slot)
+
+    def schedule(self, key: Hashable, when: float) -> None:
+        """Fire ``key`` at epoch time ``when`` (replacing any existing timer)"""
+        self.cancel(key)
+        self._place(key, math.ceil(when / self.tick))
+
+    def cancel(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return
+        _, level, slot = timer
+        if level == -2:
+            self._due.discard(key)
+        elif level == -1:
+            self._overflow.discard(key)
+        else:
+            self._levels[level][slot].discard(key)
+
+    def _cascade(self, level: int, slot: int) -> None:
+        bucket = self._levels[level][slot]
+        self._levels[level][slot] = set()
+        for key in bucket:
+            self._place(key, self._timers[key][0])
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Turn the wheel to ``now`` and return the keys whose deadline passed"""
+        fired = list(self._due)
+        self._due.clear()
+        target = int(now // self.tick)
+        if len(self._timers) == len(fired):
+            # Nothing else pending: jump straight to the target tick
+            self._current = max(self._current, target)
+        while self._current < target:
+            self._current += 1
+            tick = self._current
+            if tick & self._mask == 0:
+                if tick % self._horizon == 0:
+                    overflow, self._overflow = self._overflow, set()
+                    for key in overflow:
+                        self._place(key, self._timers[key][0])
+                for level in range(len(self._levels) - 1, 0, -1):
+                    if tick % (1 << (self._bits * level)) == 0:
+                        self._cascade(level, (tick >> (self._bits * level)) & self._mask)
+            slot = tick & self._mask
+            fired.extend(self._levels[0][slot])
+            self._levels[0][slot] = set()
+            fired.extend(self._due)
+            self._due.clear()
+        for key in fired:
+            self._timers.pop(key, None)
+        return fired
+
+
+class IntervalIndex:
+    """Static interval index: start-sorted arrays plus a max-end segment tree"""
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, str]]):
+        items = sorted(intervals)
+        self.starts = [start for start, _, _ in items]
+        self.ends = [end for _, end, _ in items]
+        self.ids = [key for _, _, key in items]
+        size = 1
+        while size < len(items):
+            size *= 2
+        self._size = size
+        tree = [-OPEN] * (2 * size)
+        tree[size:size + len(items)] = self.ends
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._tree = tree
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def overlapping(self, low: float, high: float) -> List[str]:
+        """Ids of intervals with start <= high and end > low"""
+        limit = bisect.bisect_right(self.starts, high)
+        if not limit:
+            return []
+        results = []
+        tree, size = self._tree, self._size
+        stack = [(1, 0, size)]
+        while stack:
+            node, left, right = stack.pop()
+            if left >= limit or tree[node] <= low:
+                continue
+            if node >= size:
+                results.append(self.ids[left])
+                continue
+            middle = (left + right) // 2
+            stack.append((2 * node + 1, middle, right))
+            stack.append((2 * node, left, middle))
+        return results
+
+
+class LifecycleStore:
+    """Incidents by id with exact end_time expiry and active-at/overlap queries"""
+
+    def __init__(
+        self,
+        retention: float = 86400,
+        stale_ttl: float = 3600,
+        on_expire: Optional[Callable[[Dict[str, Any]], None]] = None,
+        now: Optional[float] = None,
+    ):
+        self.retention = retention
+        self.stale_ttl = stale_ttl
+        self.on_expire = on_expire
+        self._wheel = TimingWheel(time.time() if now is None else now)
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._intervals: Dict[str, Tuple[float, float]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._active: Set[str] = set()
+        self._index: Optional[IntervalIndex] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    # Updates ----------------------------------------------------------------
+
+    def _set_interval(self, incident_id: str, interval: Tuple[float, float]) -> None:
+        if self._intervals.get(incident_id) != interval:
+            self._intervals[incident_id] = interval
+            self._index = None
+
+    def upsert(self, record: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Add or refresh an incident, (re)arming its expiry timer"""
+        incident_id = str(record.get("id") or "")
+        if not incident_id:
+            return
+        now = time.time() if now is None else now
+        start = to_epoch(record.get("start_time"), strict=False)
+        if start is None:
+            start = now
+        end = to_epoch(record.get("end_time"), strict=False)
+        self._records[incident_id] = record
+        self._last_seen[incident_id] = now
+        self._set_interval(incident_id, (start, end if end is not None else OPEN))
+        if end is not None and end <= now:
+            if incident_id in self._active:
+                self._expire(incident_id, now)
+            else:
+                self._wheel.schedule(incident_id, end + self.retention)
+            return
+        self._active.add(incident_id)
+        stale_at = now + self.stale_ttl
+        self._wheel.schedule(incident_id, stale_at if end is None else min(end, stale_at))
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        for record in records:
+            self.upsert(record, now)
+
+    def _expire(self, incident_id: str, now: float) -> None:
+        self._active.discard(incident_id)
+        start, end = self._intervals[incident_id]
+        if end > now:
+            # No longer reported before its end_time (or open-ended): close it where it was last seen
+            end = max(start, self._last_seen[incident_id])
+            self._set_interval(incident_id, (start, end))
+        self._wheel.schedule(incident_id, end + self.retention)
+        if self.on_expire:
+            self.on_expire(self._records[incident_id])
+
+    def _evict(self, incident_id: str) -> None:
+        self._records.pop(incident_id, None)
+        self._intervals.pop(incident_id, None)
+        self._last_seen.pop(incident_id, None)
+        self._index = None
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Fire due timers; returns how many incidents ended"""
+        now = time.time() if now is None else now
+        ended = 0
+        for incident_id in self._wheel.advance(now):
+            if incident_id in self._active:
+                self._expire(incident_id, now)
+                ended += 1
+            else:
+                self._evict(incident_id)
+        return ended
+
+    # Queries ----------------------------------------------------------------
+
+    def has_ended(self, incident_id: str, now: Optional[float] = None) -> bool:
+        """True once a known incident's end_time has passed"""
+        interval = self._intervals.get(incident_id)
+        return interval is not None and interval[1] <= (time.time() if now is None else now)
+
+    def active(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Incidents that have started and not yet ended"""
+        now = time.time() if now is None else now
+        self.advance(now)
+        return [self._records[i] for i in self._active if self._intervals[i][0] <= now < self._intervals[i][1]]
+
+    def _interval_index(self) -> IntervalIndex:
+        if self._index is None:
+            self._index = IntervalIndex((start, end, key) for key, (start, end) in self._intervals.items())
+        return self._index
+
+    def overlapping(self, low: float, high: float) -> List[Dict[str, Any]]:
+        """Incidents active at any point in [low, high] (within the retention window)"""
+        self.advance()
+        return [self._records[i] for i in self._interval_index().overlapping(low, high)]
+
+    def active_at(self, at: float) -> List[Dict[str, Any]]:
+        """Incidents active at ``at``: start <= at < end"""
+        return self.overlapping(at, at)
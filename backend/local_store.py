@@ -0,0 +1,550 @@
+"""
+Embedded SQLite incident store (STORAGE_TYPE=sqlite)
+
+Single-node deployments can keep months of incident history locally with no
+outside service. The database runs in WAL mode so background writes never
+block readers; timestamps are stored as epoch seconds so time range scans and
+aggregations stay on indexes.
+
+STORAGE_URL is the database path (``sqlite:///data/crashlens.db`` or a plain
+path); it defaults to ``crashlens.db`` next to the working directory.
+
+Bbox and radius queries go through an R*Tree index kept in sync by triggers
+(falling back to the (latitude, longitude) btree when SQLite was built
+without R*Tree). Retention is tiered like the Supabase schema: raw rows are rolled up into
+hourly and daily tables (by zoom-10 tile, criticality and type) before
+``cleanup`` deletes them, and ``rollup_summary`` answers long windows from
+the rollups.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from geo import distance_m, parse_bbox, radius_bbox, tile_id
+from util import to_epoch
+
+
+COLUMNS = [
+    "id", "type", "description", "latitude", "longitude", "severity", "criticality",
+    "start_time", "end_time", "road_name", "location_name", "length",
+]
+TIME_COLUMNS = {"start_time": "start_ts", "end_time": "end_ts", "created_at": "created_at", "updated_at": "updated_at"}
+FILTERABLE = {"id", "type", "criticality", "severity", "latitude", "longitude", "road_name", "length"} | set(TIME_COLUMNS)
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+ROLLUP_ZOOM = 10
+HOUR = 3600
+DAY = 86400
+RECENT_DAYS = 2  # rollups for the last two days are refreshed hourly; reads use raw rows there
+WATERMARK_OVERLAP = 300  # re-check rows written this long before the last compaction (in-flight batches)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+  id TEXT PRIMARY KEY,
+  type TEXT NOT NULL,
+  description TEXT,
+  latitude REAL NOT NULL,
+  longitude REAL NOT NULL,
+  severity INTEGER,
+  criticality TEXT,
+  start_ts REAL NOT NULL,
+  end_ts REAL,
+  road_name TEXT,
+  location_name TEXT,
+  length REAL,
+  created_at REAL NOT NULL,
+  updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_time ON incidents (start_ts, id);
+CREATE INDEX IF NOT EXISTS idx_incidents_location ON incidents (latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_incidents_criticality ON incidents (criticality, start_ts);
+CREATE INDEX IF NOT EXISTS idx_incidents_updated ON incidents (updated_at);
+
+CREATE TABLE IF NOT EXISTS incident_rollups_hourly (
+  bucket INTEGER NOT NULL,
+  tile TEXT NOT NULL,
+  criticality TEXT NOT NULL,
+  type TEXT NOT NULL,
+  incident_count INTEGER NOT NULL,
+  severity_sum INTEGER NOT NULL,
+  length_sum REAL NOT NULL,
+  PRIMARY KEY (bucket, tile, criticality, type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incident_rollups_daily (
+  bucket INTEGER NOT NULL,
+  tile TEXT NOT NULL,
+  criticality TEXT NOT NULL,
+  type TEXT NOT NULL,
+  incident_count INTEGER NOT NULL,
+  severity_sum INTEGER NOT NULL,
+  length_sum REAL NOT NULL,
+  PRIMARY KEY (bucket, tile, criticality, type)
+) WITHOUT ROWID;
+
+-- Compaction watermark: rows written after it still have to be rolled up
+CREATE TABLE IF NOT EXISTS rollup_state (
+  name TEXT PRIMARY KEY,
+  value REAL NOT NULL
+);
+"""
+
+ROLLUP_COLUMNS = "bucket, tile, criticality, type, incident_count, severity_sum, length_sum"
+
+# Spatial index on incidents.rowid; R*Tree coordinates are float32 rounded
+# outward, so queries recheck the exact latitude/longitude columns
+SPATIAL_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS incidents_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+CREATE TRIGGER IF NOT EXISTS incidents_rtree_insert AFTER INSERT ON incidents BEGIN
+  INSERT INTO incidents_rtree VALUES (NEW.rowid, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+CREATE TRIGGER IF NOT EXISTS incidents_rtree_update AFTER UPDATE OF latitude, longitude ON incidents
+WHEN NEW.latitude IS NOT OLD.latitude OR NEW.longitude IS NOT OLD.longitude BEGIN
+  UPDATE incidents_rtree
+  SET min_lat = NEW.latitude, max_lat = NEW.latitude, min_lon = NEW.longitude, max_lon = NEW.longitude
+  WHERE id = NEW.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS incidents_rtree_delete AFTER DELETE ON incidents BEGIN
+  DELETE FROM incidents_rtree WHERE id = OLD.rowid;
+END;
+"""
+
+UPSERT = """
+INSERT INTO incidents (
+  id, type, description, latitude, longitude, severity, criticality,
+  start_ts, end_ts, road_name, location_name, length, created_at, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  type = excluded.type,
+  description = excluded.description,
+  latitude = excluded.latitude,
+  longitude = excluded.longitude,
+  severity = excluded.severity,
+  criticality = excluded.criticality,
+  start_ts = excluded.start_ts,
+  end_ts = excluded.end_ts,
+  road_name = excluded.road_name,
+  location_name = excluded.location_name,
+  length = excluded.length,
+  updated_at = excluded.updated_at
+"""
+
+SELECT = """
+SELECT id, type, description, latitude, longitude, severity, criticality,
+       start_ts, end_ts, road_name, location_name, length
+FROM incidents
+"""
+
+
+def from_epoch(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+
+
+def _row_to_incident(row: Sequence[Any]) -> Dict[str, Any]:
+    record = dict(zip(COLUMNS, row))
+    record["start_time"] = from_epoch(record["start_time"])
+    record["end_time"] = from_epoch(record["end_time"])
+    return record
+
+
+class SQLiteIncidentStore:
+    """Incident history in a local SQLite database (one connection per thread)"""
+
+    def __init__(self, path: str):
+        if path.startswith("sqlite:///"):
+            path = path[len("sqlite:///"):]
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            conn = self._connection()
+            conn.executescript(SCHEMA)
+            self.spatial = self._create_spatial_index(conn)
+
+    @staticmethod
+    def _create_spatial_index(conn: sqlite3.Connection) -> bool:
+        """Create (and backfill) the R*Tree index; False when R*Tree is unavailable"""
+        try:
+            conn.executescript(SPATIAL_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        indexed = conn.execute("SELECT COUNT(*) FROM incidents_rtree").fetchone()[0]
+        stored = conn.execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+        if indexed != stored:
+            conn.executescript("""
+                BEGIN;
+                DELETE FROM incidents_rtree;
+                INSERT INTO incidents_rtree SELECT rowid, latitude, latitude, longitude, longitude FROM incidents;
+                COMMIT;
+            """)
+        return True
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.create_function("distance_m", 4, distance_m, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    # Writes -----------------------------------------------------------------
+
+    def save_many(self, incidents: Iterable[Dict[str, Any]]) -> int:
+        """Upsert a batch of incidents in a single transaction"""
+        now = time.time()
+        rows = [
+            (
+                str(i.get("id", "")), i.get("type") or "unknown", i.get("description"),
+                float(i.get("latitude") or 0), float(i.get("longitude") or 0),
+                i.get("severity"), i.get("criticality"),
+                to_epoch(i.get("start_time")) or now, to_epoch(i.get("end_time")),
+                i.get("road_name"), i.get("location_name"), i.get("length"),
+                now, now,
+            )
+            for i in incidents
+        ]
+        if not rows:
+            return 0
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(UPSERT, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    # Retention --------------------------------------------------------------
+
+    def compact(self, since: Any = None, until: Any = None) -> int:
+        """
+        Rebuild hourly and daily rollups from raw rows starting at or after
+        ``since`` (all raw rows when None) and before the day-aligned ``until``
+        (no end when None). Safe to re-run.
+        """
+        conn = self._connection()
+        if since is None:
+            since = conn.execute("SELECT MIN(start_ts) FROM incidents").fetchone()[0]
+            if since is None:
+                return 0
+        first_hour = int(to_epoch(since) // HOUR * HOUR)
+        first_day = first_hour // DAY * DAY
+        # Rollup buckets are rebuilt whole, so the range always ends on a day boundary
+        end = math.inf if until is None else -(-int(to_epoch(until)) // DAY) * DAY
+
+        groups: Dict[Tuple[int, str, str, str], List[float]] = {}
+        rows = conn.execute(
+            "SELECT start_ts, latitude, longitude, criticality, type, severity, length "
+            "FROM incidents WHERE start_ts >= ? AND start_ts < ?",
+            (first_hour, end),
+        )
+        for start_ts, lat, lon, criticality, incident_type, severity, length in rows:
+            key = (int(start_ts // HOUR * HOUR), tile_id(lon, lat, ROLLUP_ZOOM), criticality or "unknown", incident_type or "unknown")
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = [0, 0, 0.0]
+            stats[0] += 1
+            stats[1] += severity or 0
+            stats[2] += length or 0.0
+
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM incident_rollups_hourly WHERE bucket >= ? AND bucket < ?", (first_hour, end))
+                conn.executemany(
+                    f"INSERT INTO incident_rollups_hourly ({ROLLUP_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(*key, *stats) for key, stats in groups.items()],
+                )
+                conn.execute("DELETE FROM incident_rollups_daily WHERE bucket >= ? AND bucket < ?", (first_day, end))
+                conn.execute(
+                    f"INSERT INTO incident_rollups_daily ({ROLLUP_COLUMNS}) "
+                    "SELECT bucket / 86400 * 86400, tile, criticality, type, "
+                    "SUM(incident_count), SUM(severity_sum), SUM(length_sum) "
+                    "FROM incident_rollups_hourly WHERE bucket >= ? AND bucket < ? GROUP BY 1, 2, 3, 4",
+                    (first_day, end),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(groups)
+
+    def compact_recent(self, now: Optional[float] = None) -> int:
+        """
+        Refresh the rollups for the last RECENT_DAYS days, plus every older day
+        with rows written since the previous run (incidents first reported
+        after their start day, e.g. long-running roadworks)
+        """
+        now = time.time() if now is None else now
+        recent = now - RECENT_DAYS * DAY
+        conn = self._connection()
+        watermark = conn.execute("SELECT value FROM rollup_state WHERE name = 'compacted_through'").fetchone()
+        changed_days = conn.execute(
+            "SELECT DISTINCT CAST(start_ts / 86400 AS INTEGER) * 86400 FROM incidents "
+            "WHERE updated_at >= ? AND start_ts < ?",
+            (watermark[0] if watermark else -math.inf, recent // HOUR * HOUR),
+        ).fetchall()
+        groups = sum(self.compact(day, day + DAY) for (day,) in changed_days)
+        groups += self.compact(recent)
+        with self._write_lock:
+            conn.execute(
+                "INSERT INTO rollup_state (name, value) VALUES ('compacted_through', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (now - WATERMARK_OVERLAP,),
+            )
+        return groups
+
+    def cleanup(self, raw_days: int = 30, hourly_days: int = 90, now: Optional[float] = None) -> int:
+        """
+        Delete raw rows and hourly rollups past their retention (day-aligned),
+        rolling up only the days about to be purged first
+        """
+        today = int((now or time.time()) // DAY * DAY)
+        cutoff = today - raw_days * DAY
+        conn = self._connection()
+        oldest = conn.execute("SELECT MIN(start_ts) FROM incidents WHERE start_ts < ?", (cutoff,)).fetchone()[0]
+        if oldest is not None:
+            self.compact(oldest, cutoff)
+        with self._write_lock:
+            deleted = conn.execute("DELETE FROM incidents WHERE start_ts < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM incident_rollups_hourly WHERE bucket < ?", (today - hourly_days * DAY,))
+        return deleted
+
+    # Reads ------------------------------------------------------------------
+
+    def _where(
+        self,
+        since: Any = None,
+        until: Any = None,
+        bbox: Any = None,
+        criticality: Optional[str] = None,
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if since is not None:
+            clauses.append("start_ts >= ?")
+            params.append(to_epoch(since))
+        if until is not None:
+            clauses.append("start_ts < ?")
+            params.append(to_epoch(until))
+        if bbox:
+            box = parse_bbox(bbox) if isinstance(bbox, str) else bbox
+            self._box_clause(box, clauses, params)
+        if criticality:
+            values = criticality.split(",")
+            clauses.append(f"criticality IN ({','.join('?' * len(values))})")
+            params += values
+        return clauses, params
+
+    def _box_clause(self, box: Tuple[float, float, float, float], clauses: List[str], params: List[Any]) -> None:
+        min_lon, min_lat, max_lon, max_lat = box
+        if self.spatial:
+            clauses.append(
+                "rowid IN (SELECT id FROM incidents_rtree "
+                "WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)"
+            )
+            params += [min_lat, max_lat, min_lon, max_lon]
+        clauses.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+        params += [min_lat, max_lat, min_lon, max_lon]
+
+    def in_bbox(
+        self,
+        box: Tuple[float, float, float, float],
+        since: Any = None,
+        until: Any = None,
+        criticality: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Stored incidents inside (minLon, minLat, maxLon, maxLat), newest first"""
+        return self.scan(since, until, box, criticality, limit)
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        since: Any = None,
+        until: Any = None,
+        criticality: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Stored incidents within ``radius_m`` meters of a point, newest first"""
+        clauses, params = self._where(since, until, radius_bbox(latitude, longitude, radius_m), criticality)
+        sql = SELECT + f" WHERE {' AND '.join(clauses)} ORDER BY start_ts DESC"
+        results = []
+        for row in self._connection().execute(sql, params):
+            if distance_m(latitude, longitude, row[3], row[4]) <= radius_m:
+                results.append(_row_to_incident(row))
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def count_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        since: Any = None,
+        until: Any = None,
+    ) -> Dict[str, int]:
+        """Incident counts by criticality within ``radius_m`` meters of a point, grouped inside SQLite"""
+        clauses, params = self._where(since, until, radius_bbox(latitude, longitude, radius_m))
+        clauses.append("distance_m(?, ?, latitude, longitude) <= ?")
+        params += [latitude, longitude, radius_m]
+        return dict(self._connection().execute(
+            f"SELECT COALESCE(criticality, 'unknown'), COUNT(*) FROM incidents WHERE {' AND '.join(clauses)} GROUP BY 1",
+            params,
+        ).fetchall())
+
+    def scan(
+        self,
+        since: Any = None,
+        until: Any = None,
+        bbox: Any = None,
+        criticality: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Time and bbox range scan, newest first"""
+        clauses, params = self._where(since, until, bbox, criticality)
+        sql = SELECT + (f" WHERE {' AND '.join(clauses)}" if clauses else "") + " ORDER BY start_ts DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [_row_to_incident(row) for row in self._connection().execute(sql, params)]
+
+    def scan_after(
+        self,
+        since: Any = None,
+        until: Any = None,
+        bbox: Optional[str] = None,
+        criticality: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Oldest-first page keyed on (start_time, id), for resumable exports"""
+        clauses, params = self._where(since, until, bbox, criticality)
+        if after:
+            after_ts = to_epoch(after[0])
+            clauses.append("(start_ts > ? OR (start_ts = ? AND id > ?))")
+            params += [after_ts, after_ts, after[1]]
+        sql = SELECT + (f" WHERE {' AND '.join(clauses)}" if clauses else "") + " ORDER BY start_ts, id LIMIT ?"
+        params.append(limit)
+        return [_row_to_incident(row) for row in self._connection().execute(sql, params)]
+
+    def select(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Evaluate the PostgREST-style filters StorageAdapter.get_incidents receives"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, expr in filters.items():
+            if column not in FILTERABLE:
+                continue
+            op, _, raw = str(expr).partition(".")
+            target = TIME_COLUMNS.get(column, column)
+            value: Any = to_epoch(raw) if column in TIME_COLUMNS else raw
+            if op == "in":
+                values = raw.strip("()").split(",")
+                clauses.append(f"{target} IN ({','.join('?' * len(values))})")
+                params += values
+            elif op == "is":
+                clauses.append(f"{target} IS {'NULL' if raw == 'null' else 'NOT NULL'}")
+            elif op in OPERATORS:
+                clauses.append(f"{target} {OPERATORS[op]} ?")
+                params.append(value)
+        sql = SELECT + (f" WHERE {' AND '.join(clauses)}" if clauses else "") + " ORDER BY start_ts DESC"
+        if "limit" in filters:
+            sql += " LIMIT ?"
+            params.append(int(filters["limit"]))
+        return [_row_to_incident(row) for row in self._connection().execute(sql, params)]
+
+    def summarize(
+        self,
+        since: Any = None,
+        until: Any = None,
+        bbox: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Counts by criticality and type, computed inside SQLite"""
+        clauses, params = self._where(since, until, bbox)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connection()
+        by_severity = dict(conn.execute(
+            f"SELECT COALESCE(criticality, 'unknown'), COUNT(*) FROM incidents{where} GROUP BY 1", params
+        ).fetchall())
+        by_type = dict(conn.execute(
+            f"SELECT COALESCE(type, 'unknown'), COUNT(*) FROM incidents{where} GROUP BY 1", params
+        ).fetchall())
+        return {
+            "total_incidents": sum(by_severity.values()),
+            "by_severity": by_severity,
+            "by_type": by_type,
+        }
+
+    def rollup_summary(self, since: Any, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Same result as ``summarize`` for long windows, at hour resolution:
+        hourly rollups for the partial first day, daily rollups for whole days
+        and raw rows for the last RECENT_DAYS days only.
+        """
+        since_ts = to_epoch(since)
+        recent = int((now or time.time()) // DAY * DAY) - RECENT_DAYS * DAY
+        first_hour = int(since_ts // HOUR * HOUR)
+        first_day = -int(-since_ts // DAY) * DAY
+        rows = self._connection().execute(
+            """
+            SELECT criticality, type, SUM(n) FROM (
+              SELECT criticality, type, incident_count AS n FROM incident_rollups_hourly
+              WHERE bucket >= ? AND bucket < ?
+              UNION ALL
+              SELECT criticality, type, incident_count FROM incident_rollups_daily
+              WHERE bucket >= ? AND bucket < ?
+              UNION ALL
+              SELECT COALESCE(criticality, 'unknown'), COALESCE(type, 'unknown'), 1 FROM incidents
+              WHERE start_ts >= ?
+            ) GROUP BY 1, 2
+            """,
+            (first_hour, min(first_day, recent), first_day, recent, max(recent, since_ts)),
+        ).fetchall()
+        by_severity: Dict[str, int] = {}
+        by_type: Dict[str, int] = {}
+        for criticality, incident_type, count in rows:
+            by_severity[criticality] = by_severity.get(criticality, 0) + count
+            by_type[incident_type] = by_type.get(incident_type, 0) + count
+        return {
+            "total_incidents": sum(by_severity.values()),
+            "by_severity": by_severity,
+            "by_type": by_type,
+        }
+
+    def hourly_tile_counts(self, since: Any, now: Optional[float] = None) -> List[Tuple[int, str, int]]:
+        """
+        (hour bucket, zoom-10 tile, incident count) since a point in time,
+        from the hourly rollups plus raw rows for the last RECENT_DAYS days
+        """
+        first_hour = int(to_epoch(since) // HOUR * HOUR)
+        recent = max(int((now or time.time()) // DAY * DAY) - RECENT_DAYS * DAY, first_hour)
+        conn = self._connection()
+        counts = {
+            (bucket, tile): count
+            for bucket, tile, count in conn.execute(
+                "SELECT bucket, tile, SUM(incident_count) FROM incident_rollups_hourly "
+                "WHERE bucket >= ? AND bucket < ? GROUP BY 1, 2",
+                (first_hour, recent),
+            )
+        }
+        for start_ts, lat, lon in conn.execute(
+            "SELECT start_ts, latitude, longitude FROM incidents WHERE start_ts >= ?", (recent,)
+        ):
+            key = (int(start_ts // HOUR * HOUR), tile_id(lon, lat, ROLLUP_ZOOM))
+            counts[key] = counts.get(key, 0) + 1
+        return [(bucket, tile, count) for (bucket, tile), count in counts.items()]
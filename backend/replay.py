@@ -0,0 +1,114 @@
+"""
+Replay captured HERE responses through the normalize → cache → persist pipeline
+
+Captures are written by app.py when HERE_CAPTURE_DIR is set (see capture.py).
+Use this to backfill storage after an outage, rebuild historical datasets, or
+feed real data shapes through the pipeline without network access.
+
+Usage (from backend/):
+    python replay.py captures/                       # as fast as possible
+    python replay.py captures/ --speed 60            # 60x real time
+    python replay.py captures/here-20261019-*.jsonl.gz --since 2026-10-19T06:00:00Z --no-persist --cache
+
+Replays only write storage by default. With ``--cache`` a capture is also
+written to the live Redis key, for whatever is left of INCIDENT_CACHE_TTL
+since it was captured; older captures are never cached, so a backfill cannot
+make the live endpoint serve stale data.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import app as crashlens
+from capture import iter_captures
+from util import parse_time
+
+
+async def replay(
+    paths: List[str],
+    speed: float = 0.0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cache: bool = False,
+    persist: bool = True,
+    concurrency: int = 8,
+) -> dict:
+    """Feed captured /incidents responses back through the live pipeline"""
+    if cache:
+        await crashlens.connect_redis()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    stats = {"responses": 0, "incidents": 0}
+    first_capture = None
+    started = time.monotonic()
+
+    async def persist_batch(incidents):
+        async with semaphore:
+            await crashlens.persist_incidents(incidents)
+
+    for record in iter_captures(paths, endpoint="incidents", since=since, until=until):
+        captured_at = record["captured_at"]
+        if speed > 0:
+            first_capture = first_capture or captured_at
+            due = (captured_at - first_capture).total_seconds() / speed
+            delay = due - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        incidents = crashlens.normalize_here_incidents(record["response"])
+        stats["responses"] += 1
+        stats["incidents"] += len(incidents)
+
+        if cache:
+            age = (datetime.now(timezone.utc) - captured_at).total_seconds()
+            ttl = int(crashlens.INCIDENT_CACHE_TTL - age)
+            if ttl > 0:
+                key = crashlens.incident_cache_key(record["bbox"], record["params"].get("criticality"))
+                await crashlens.cache_incidents(key, incidents, ttl)
+        if persist:
+            task = asyncio.create_task(persist_batch(incidents))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+    if crashlens.redis_client:
+        await crashlens.redis_client.close()
+
+    stats["elapsed_s"] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay captured HERE responses")
+    parser.add_argument("paths", nargs="+", help="Capture files or directories")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Replay speed relative to real time (0 = as fast as possible)")
+    parser.add_argument("--since", type=parse_time, help="Only replay captures at or after this time")
+    parser.add_argument("--until", type=parse_time, help="Only replay captures before this time")
+    parser.add_argument("--cache", action="store_true",
+                        help="Also write captures younger than INCIDENT_CACHE_TTL to the live Redis keys")
+    parser.add_argument("--no-persist", action="store_true", help="Skip writing to storage")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent storage writes")
+    args = parser.parse_args()
+
+    stats = asyncio.run(replay(
+        args.paths,
+        speed=args.speed,
+        since=args.since,
+        until=args.until,
+        cache=args.cache,
+        persist=not args.no_persist,
+        concurrency=args.concurrency,
+    ))
+    print(f"✓ Replayed {stats['responses']} responses ({stats['incidents']} incidents) in {stats['elapsed_s']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
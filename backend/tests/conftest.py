@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# app.py reads its configuration at import time: use a throwaway SQLite store
+# and keep .env (Redis, Sentry, captures) out of the tests
+os.environ.update({
+    "STORAGE_TYPE": "sqlite",
+    "STORAGE_URL": os.path.join(tempfile.mkdtemp(prefix="crashlens-tests-"), "incidents.db"),
+    "HERE_API_KEY": "test",
+    "REDIS_URL": "",
+    "SENTRY_DSN": "",
+    "HERE_CAPTURE_DIR": "",
+})
@@ -0,0 +1,125 @@
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from clustering import ClusterIndex
+from geo import lonlat_to_world, world_to_lonlat
+
+WORLD = (-180.0, -85.0, 180.0, 85.0)
+CRITICALITIES = ["critical", "major", "minor", None]
+
+
+def _incident(rng, i):
+    return {
+        "id": f"i{i}",
+        "latitude": 36 + rng.random() * 2,
+        "longitude": -88 + rng.random() * 3,
+        "criticality": rng.choice(CRITICALITIES),
+    }
+
+
+def _brute_clusters(incidents, zoom, bbox=WORLD, wanted=None):
+    """cell -> Counter(criticality), cell -> centroid, straight from the records"""
+    cx0, cy0, cx1, cy1 = ClusterIndex(max_zoom=zoom)._cell_range(bbox, zoom)
+    counts, sums = defaultdict(Counter), defaultdict(lambda: [0.0, 0.0])
+    for incident in incidents.values():
+        criticality = incident["criticality"] or "unknown"
+        if wanted and criticality not in wanted:
+            continue
+        x, y = lonlat_to_world(incident["longitude"], incident["latitude"])
+        cx, cy = ClusterIndex._cell(x, y, zoom)
+        if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+            counts[(cx, cy)][criticality] += 1
+            sums[(cx, cy)][0] += x
+            sums[(cx, cy)][1] += y
+    return counts, sums
+
+
+def _check(index, incidents, bbox=WORLD, wanted=None):
+    for zoom in range(index.max_zoom + 1):
+        counts, sums = _brute_clusters(incidents, zoom, bbox, wanted)
+        clusters = {c["id"]: c for c in index.clusters(bbox, zoom, wanted)}
+        assert set(clusters) == {f"{zoom}/{cx}/{cy}" for cx, cy in counts}
+        for (cx, cy), breakdown in counts.items():
+            cluster = clusters[f"{zoom}/{cx}/{cy}"]
+            assert cluster["by_criticality"] == dict(breakdown)
+            assert cluster["count"] == sum(breakdown.values())
+            total = sum(breakdown.values())
+            lon, lat = world_to_lonlat(sums[(cx, cy)][0] / total, sums[(cx, cy)][1] / total)
+            assert cluster["longitude"] == pytest.approx(lon, abs=1e-5)
+            assert cluster["latitude"] == pytest.approx(lat, abs=1e-5)
+        assert sum(c["count"] for c in clusters.values()) == sum(sum(b.values()) for b in counts.values())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_clusters_match_brute_force_through_updates(seed):
+    rng = random.Random(seed)
+    index = ClusterIndex(max_zoom=10)
+    incidents = {}
+    for i in range(400):
+        incident = _incident(rng, i)
+        incidents[incident["id"]] = incident
+        index.upsert(incident, now=100)
+    _check(index, incidents)
+
+    # Moves, criticality changes, removals and unchanged re-reports
+    for incident_id in rng.sample(sorted(incidents), 150):
+        action = rng.random()
+        if action < 0.3:
+            index.remove(incident_id)
+            del incidents[incident_id]
+        elif action < 0.8:
+            moved = {**_incident(rng, 0), "id": incident_id}
+            incidents[incident_id] = moved
+            index.upsert(moved, now=200)
+        else:
+            index.upsert(dict(incidents[incident_id]), now=200)
+    assert len(index) == len(incidents)
+    _check(index, incidents)
+    _check(index, incidents, bbox=(-87.5, 36.5, -86.2, 37.4))
+    _check(index, incidents, wanted={"critical", "unknown"})
+
+
+def test_prune_drops_incidents_not_seen_since():
+    rng = random.Random(7)
+    index = ClusterIndex(max_zoom=6)
+    incidents = {}
+    for i in range(100):
+        incident = _incident(rng, i)
+        incidents[incident["id"]] = incident
+        index.upsert(incident, now=100 if i % 2 else 300)
+    assert index.prune(older_than=200) == 50
+    fresh = {k: v for k, v in incidents.items() if int(k[1:]) % 2 == 0}
+    assert len(index) == 50
+    _check(index, fresh)
+    assert index.prune(older_than=200) == 0
+
+
+def test_removing_everything_leaves_no_cells():
+    rng = random.Random(3)
+    index = ClusterIndex(max_zoom=8)
+    for i in range(50):
+        index.upsert(_incident(rng, i), now=1)
+    for i in range(50):
+        index.remove(f"i{i}")
+    index.remove("missing")
+    assert len(index) == 0
+    assert all(not cells for cells in index._levels)
+    assert index.incidents(WORLD) == []
+
+
+@pytest.mark.parametrize("bbox", [(-87.5, 36.5, -86.2, 37.4), (-86.0, 37.0, -85.0, 38.0), WORLD, (0.0, 0.0, 1.0, 1.0)])
+def test_incidents_in_bbox(bbox):
+    rng = random.Random(11)
+    index = ClusterIndex(max_zoom=12)
+    incidents = [_incident(rng, i) for i in range(300)]
+    index.upsert_many(incidents)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    inside = {
+        i["id"] for i in incidents
+        if min_lon <= i["longitude"] <= max_lon and min_lat <= i["latitude"] <= max_lat
+    }
+    assert {i["id"] for i in index.incidents(bbox)} == inside
+    majors = {i["id"] for i in incidents if i["id"] in inside and i["criticality"] == "major"}
+    assert {i["id"] for i in index.incidents(bbox, ["major"])} == majors
@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+import app as crashlens
+from compact import COLUMNAR_JSON, JSON, MSGPACK, encode_columnar, negotiate, pack_msgpack
+
+INCIDENTS = [
+    {
+        "id": "a", "type": "accident", "description": "crash", "latitude": 36.1, "longitude": -86.7,
+        "severity": 3, "criticality": "critical", "start_time": "2026-03-01T12:00:00Z",
+        "end_time": None, "road_name": "I-65", "location_name": None, "length": 120.0,
+    },
+    {
+        "id": "b", "type": "construction", "description": None, "latitude": 36.2, "longitude": -86.8,
+        "severity": 1, "criticality": None, "start_time": "2026-03-01T12:05:00+00:00",
+        "end_time": "2026-03-02T00:00:00", "road_name": "I-65", "location_name": "Nashville", "length": 3400.0,
+    },
+    {
+        "id": "c", "type": "accident", "description": "bad time", "latitude": 36.3, "longitude": -86.9,
+        "severity": 2, "criticality": "minor", "start_time": "yesterday",
+        "end_time": datetime(2026, 3, 1, 13, tzinfo=timezone.utc), "road_name": None,
+        "location_name": "Nashville", "length": None,
+    },
+]
+
+
+def _decode(payload):
+    """Rebuild incident dicts from the columnar layout, as a client would"""
+    rows = []
+    for p in range(payload["n"]):
+        row = {
+            "id": payload["id"][p], "latitude": payload["lat"][p], "longitude": payload["lon"][p],
+            "severity": payload["severity"][p], "start": payload["start"][p], "end": payload["end"][p],
+            "length": payload["length"][p], "description": payload["description"][p],
+        }
+        for field in ("type", "criticality", "road_name", "location_name"):
+            code = payload[field]["codes"][p]
+            row[field] = None if code is None else payload[field]["values"][code]
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("accept,expected", [
+    (None, JSON),
+    ("", JSON),
+    ("*/*", JSON),
+    ("application/json", JSON),
+    (COLUMNAR_JSON, COLUMNAR_JSON),
+    ("application/msgpack", MSGPACK),
+    ("application/vnd.msgpack", MSGPACK),
+    # Highest q wins regardless of position; ties keep header order
+    ("application/json;q=0.5, application/x-msgpack", MSGPACK),
+    ("application/x-msgpack;q=0.4, application/vnd.crashlens.columnar+json;q=0.9", COLUMNAR_JSON),
+    ("application/x-msgpack, application/json", MSGPACK),
+    ("application/json, application/x-msgpack", JSON),
+    ("application/x-msgpack ; q=0.8, */*;q=0.9", JSON),
+    # q=0 means "not acceptable"
+    ("application/x-msgpack;q=0, application/vnd.crashlens.columnar+json;q=0.1", COLUMNAR_JSON),
+    ("application/x-msgpack;q=0", JSON),
+    ("application/x-msgpack;q=bogus, application/vnd.crashlens.columnar+json;q=0.2", COLUMNAR_JSON),
+    ("text/html, image/png", JSON),
+    ("APPLICATION/X-MSGPACK", MSGPACK),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_negotiate_without_msgpack_falls_back_to_columnar_json(monkeypatch):
+    monkeypatch.setattr("compact._msgpack", lambda: None)
+    assert negotiate("application/x-msgpack") == COLUMNAR_JSON
+
+
+def test_columnar_round_trip():
+    payload = encode_columnar(INCIDENTS)
+    assert payload["v"] == 1 and payload["n"] == 3
+    assert payload["type"] == {"values": ["accident", "construction"], "codes": [0, 1, 0]}
+    assert payload["criticality"] == {"values": ["critical", "minor"], "codes": [0, None, 1]}
+    assert payload["road_name"]["codes"] == [0, 0, None]
+    assert payload["start"] == [1772366400, 1772366700, None]  # malformed time -> null
+    assert payload["end"] == [None, 1772409600, 1772370000]  # naive ISO is UTC
+
+    for original, decoded in zip(INCIDENTS, _decode(payload)):
+        for field in ("id", "latitude", "longitude", "severity", "length", "description",
+                      "type", "criticality", "road_name", "location_name"):
+            assert decoded[field] == original[field]
+
+    unpacked = msgpack.unpackb(pack_msgpack(payload), raw=False)
+    assert unpacked == payload
+
+
+def test_columnar_accepts_models():
+    models = [crashlens.Incident(**{**INCIDENTS[0], "start_time": "2026-03-01T12:00:00Z"})]
+    payload = encode_columnar(models)
+    assert payload["start"] == [1772366400]
+    assert _decode(payload)[0]["type"] == "accident"
+
+
+def test_empty_list():
+    payload = encode_columnar([])
+    assert payload["n"] == 0 and payload["id"] == [] and payload["type"] == {"values": [], "codes": []}
+
+
+@pytest.mark.parametrize("accept,media_type", [
+    (None, JSON),
+    (COLUMNAR_JSON, COLUMNAR_JSON),
+    ("application/x-msgpack", MSGPACK),
+])
+def test_incidents_endpoint_encodings(monkeypatch, accept, media_type):
+    async def load(bbox, criticality, background_tasks):
+        return INCIDENTS[:2]
+
+    monkeypatch.setattr(crashlens, "_load_incidents", load)
+    headers = {"Accept": accept} if accept else {}
+    response = TestClient(crashlens.app).get("/api/incidents", params={"bbox": "-87,36,-86,37"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    if media_type == JSON:
+        assert [i["id"] for i in response.json()] == ["a", "b"]
+    else:
+        body = response.json() if media_type == COLUMNAR_JSON else msgpack.unpackb(response.content, raw=False)
+        assert body == encode_columnar(INCIDENTS[:2])
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as crashlens
+from local_store import SQLiteIncidentStore
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+BBOX = "-87,36,-86,37"
+
+
+def _incidents(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"i{i:04d}",
+            "type": rng.choice(["accident", "construction"]),
+            "description": f"incident {i}",
+            "latitude": 36 + rng.random() * (1.2 if i % 10 else 0.5),
+            "longitude": -87 + rng.random(),
+            "severity": rng.randint(0, 4),
+            "criticality": rng.choice(["critical", "major", "minor"]),
+            # Several incidents share a start time so paging has to break ties on id
+            "start_time": (START + timedelta(minutes=rng.randrange(200))).isoformat(),
+            "length": rng.random(),
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = SQLiteIncidentStore(str(tmp_path / "export.db"))
+    store.save_many(_incidents(500))
+    monkeypatch.setattr(crashlens.storage, "_local_store", store)
+    monkeypatch.setattr(crashlens, "EXPORT_CHUNK_SIZE", 37)
+    return TestClient(crashlens.app)
+
+
+def _expected_ids(**filters):
+    box = [float(v) for v in BBOX.split(",")]
+    rows = [
+        i for i in _incidents(500)
+        if box[0] <= i["longitude"] <= box[2] and box[1] <= i["latitude"] <= box[3]
+        and (not filters.get("criticality") or i["criticality"] == filters["criticality"])
+    ]
+    return [i["id"] for i in sorted(rows, key=lambda i: (i["start_time"], i["id"]))]
+
+
+def _page_through(client, format, limit, parse, **params):
+    seen, cursor = [], None
+    while True:
+        query = {"bbox": BBOX, "format": format, "limit": limit, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/incidents/export", params=query)
+        assert response.status_code == 200
+        rows = parse(response.text)
+        assert len(rows) <= limit
+        if not rows:
+            return seen
+        seen += [row["id"] for row in rows]
+        cursor = f"{rows[-1]['start_time']},{rows[-1]['id']}"
+
+
+def _ndjson(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def _csv(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+@pytest.mark.parametrize("format,parse", [("ndjson", _ndjson), ("csv", _csv)])
+@pytest.mark.parametrize("limit", [1, 50, 137, 1000])
+def test_paging_returns_every_row_once(client, format, parse, limit):
+    assert _page_through(client, format, limit, parse) == _expected_ids()
+
+
+def test_paging_with_filters(client):
+    ids = _page_through(client, "ndjson", 20, _ndjson, criticality="major")
+    assert ids == _expected_ids(criticality="major")
+
+
+def test_unencoded_cursor_offset(client):
+    first = _ndjson(client.get("/api/incidents/export", params={"bbox": BBOX, "limit": 1}).text)[0]
+    # "+00:00" sent without URL encoding arrives as " 00:00"
+    url = f"/api/incidents/export?bbox={BBOX}&limit=1&cursor={first['start_time']},{first['id']}"
+    rows = _ndjson(client.get(url).text)
+    assert [row["id"] for row in rows] == _expected_ids()[1:2]
+
+
+@pytest.mark.parametrize("params,status", [
+    ({"bbox": "-87,36,-86"}, 400),
+    ({"bbox": "a,b,c,d"}, 400),
+    ({"cursor": "not-a-time,i0001"}, 400),
+    ({"cursor": "2026-01-01T00:00:00+00:00"}, 400),
+    ({"format": "xml"}, 400),
+    ({"limit": 0}, 422),
+])
+def test_bad_requests(client, params, status):
+    assert client.get("/api/incidents/export", params=params).status_code == status
+
+
+def test_parquet_export(client):
+    pq = pytest.importorskip("pyarrow.parquet", exc_type=ImportError)
+    response = client.get(
+        "/api/incidents/export",
+        params={"bbox": BBOX, "format": "parquet"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    # Already zstd-compressed; the gzip middleware leaves it alone
+    assert "content-encoding" not in response.headers
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("id").to_pylist() == _expected_ids()
+    assert str(table.schema.field("start_time").type) == "timestamp[us, tz=UTC]"
+
+
+def test_csv_export_is_gzipped(client):
+    response = client.get(
+        "/api/incidents/export",
+        params={"bbox": BBOX, "format": "csv"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
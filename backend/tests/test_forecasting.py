@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from forecasting import HOUR, SEASON, IncidentForecaster
+from geo import tile_id
+
+NOW = 1_750_000_000.0 // HOUR * HOUR + 600
+LIVE = int(NOW // HOUR)
+NASHVILLE = (-86.78, 36.16)
+TILE = tile_id(*NASHVILLE, 10)
+
+
+def _incident(incident_id, started):
+    lon, lat = NASHVILLE
+    return {
+        "id": incident_id,
+        "start_time": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+        "longitude": lon,
+        "latitude": lat,
+    }
+
+
+def _daily_pattern(hour):
+    return 5.0 if hour % 24 < 12 else 1.0
+
+
+@pytest.fixture
+def forecaster():
+    forecaster = IncidentForecaster(horizon=48, now=NOW)
+    forecaster.seed([(h * HOUR, TILE, _daily_pattern(h)) for h in range(LIVE - 4 * SEASON + 1, LIVE)], NOW)
+    forecaster.refresh(NOW)
+    return forecaster
+
+
+def test_forecast_follows_seasonality(forecaster):
+    expected = [_daily_pattern(h) for h in range(LIVE, LIVE + 48)]
+    np.testing.assert_allclose(forecaster._forecast[0], expected, atol=1e-3)
+
+
+def test_forecast_shape(forecaster, monkeypatch):
+    monkeypatch.setattr("forecasting.time.time", lambda: NOW)
+    result = forecaster.forecast((-87.0, 36.0, -86.5, 36.3), 6)
+    assert result["hours"] == 6
+    assert len(result["expected"]) == 6
+    assert [tile["tile"] for tile in result["tiles"]] == [TILE]
+    assert result["total"] == pytest.approx(sum(result["expected"]), abs=1e-2)
+    assert forecaster.forecast((0.0, 0.0, 1.0, 1.0), 6)["tiles"] == []
+
+
+def test_one_week_history_refits():
+    forecaster = IncidentForecaster(history_hours=SEASON, horizon=24, refit_hours=1, now=NOW)
+    forecaster.seed([(h * HOUR, TILE, _daily_pattern(h)) for h in range(LIVE - SEASON + 1, LIVE)], NOW)
+    for hour in range(3):
+        forecaster.refresh(NOW + hour * HOUR)
+    assert forecaster._forecast.shape == (1, 24)
+    assert np.isfinite(forecaster._forecast).all()
+
+
+def test_ingest_counts_each_incident_once():
+    forecaster = IncidentForecaster(now=NOW)
+    incidents = [_incident("a", NOW - 60), _incident("b", NOW - 30)]
+    assert forecaster.ingest(incidents, NOW) == 2
+    assert forecaster.ingest(incidents, NOW) == 0
+    assert forecaster._counts.sum() == 2
+
+
+def test_seed_and_live_ingest_never_overlap():
+    forecaster = IncidentForecaster(now=NOW)
+    # "old" was stored before a restart and is still reported; "new" started after it
+    live = [_incident("old", NOW - 3 * HOUR), _incident("new", NOW - 60)]
+    assert forecaster.ingest(live, NOW) == 1
+    stored = [((LIVE - 3) * HOUR, TILE, 1.0), (LIVE * HOUR, TILE, 1.0)]
+    forecaster.seed(stored, NOW)
+    assert forecaster._counts.sum() == 2
@@ -0,0 +1,177 @@
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as crashlens
+from incident_query import IncidentIndex, decode_cursor, encode_cursor, tokenize
+
+TYPES = ["accident", "disabledVehicle", "roadClosure", "laneRestriction", "construction"]
+ROADS = ["I-65", "I-40", "Broadway", "Charlotte Pike", "West End Ave"]
+WORDS = ["north", "south", "ramp", "shoulder", "bridge"]
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _incidents(count, seed=0):
+    rng = random.Random(seed)
+    incidents = []
+    for i in range(count):
+        incident_type = rng.choice(TYPES)
+        road = rng.choice(ROADS)
+        # A handful of rare descriptions so selective searches take the rank walk
+        extra = "sinkhole" if i % 40 == 0 else rng.choice(WORDS)
+        incidents.append({
+            "id": f"i{rng.randrange(10**6):06d}-{i}",
+            "type": incident_type,
+            "description": f"{incident_type} on {road} {extra}",
+            "road_name": road,
+            "location_name": "Nashville",
+            "severity": rng.randint(0, 4),
+            "criticality": rng.choice(["critical", "major", "minor"]),
+            # Few distinct values, so sort keys tie and paging relies on the id
+            "length": rng.choice([0.0, 100.0, 250.0, 500.0, 999.5, 1000.0, 5000.0]),
+            "start_time": (START - timedelta(hours=rng.randrange(30))).isoformat(),
+        })
+    return incidents
+
+
+def _text(incident):
+    return " ".join(str(incident.get(f) or "") for f in ("type", "description", "road_name", "location_name"))
+
+
+def _brute(incidents, text=None, min_length=None, max_length=None, sort="severity"):
+    terms = tokenize(text or "")
+    rows = []
+    for incident in incidents:
+        tokens = tokenize(_text(incident))
+        if any(not any(token.startswith(term) for token in tokens) for term in terms):
+            continue
+        if min_length is not None and incident["length"] < min_length:
+            continue
+        if max_length is not None and incident["length"] >= max_length:
+            continue
+        rows.append(incident)
+    keys = {
+        "severity": lambda i: (-i["severity"], i["id"]),
+        "time": lambda i: (-datetime.fromisoformat(i["start_time"]).timestamp(), i["id"]),
+        "length": lambda i: (-i["length"], i["id"]),
+    }
+    return [i["id"] for i in sorted(rows, key=keys[sort])]
+
+
+def _page_all(index, limit, **params):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor, total = index.query(cursor=cursor, limit=limit, **params)
+        assert len(page) <= limit
+        ids += [i["id"] for i in page]
+        pages += 1
+        if cursor is None:
+            return ids, total, pages
+
+
+INCIDENTS = _incidents(400)
+INDEX = IncidentIndex(INCIDENTS)
+
+
+@pytest.mark.parametrize("sort", ["severity", "time", "length"])
+@pytest.mark.parametrize("text", [None, "acc", "vehicle", "sinkhole", "i-65 north", "charl pike", "zzz"])
+@pytest.mark.parametrize("limit", [1, 7, 50, 1000])
+def test_paging_matches_brute_force(sort, text, limit):
+    expected = _brute(INCIDENTS, text=text, sort=sort)
+    ids, total, pages = _page_all(INDEX, limit, text=text, sort=sort)
+    assert ids == expected
+    assert total == len(expected)
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("sort", ["severity", "time", "length"])
+@pytest.mark.parametrize("min_length,max_length", [
+    (None, 1000.0), (1000.0, None), (250.0, 1000.0), (999.5, 1000.0),
+    (0.0, 0.0), (1000.0, 250.0), (0.0, None), (5000.0, None), (5000.01, None),
+])
+def test_length_bounds(sort, min_length, max_length):
+    for text in (None, "sinkhole", "road"):
+        expected = _brute(INCIDENTS, text=text, min_length=min_length, max_length=max_length, sort=sort)
+        ids, total, _ = _page_all(INDEX, 9, text=text, min_length=min_length, max_length=max_length, sort=sort)
+        assert ids == expected
+        assert total == len(expected)
+
+
+def test_min_length_inclusive_max_length_exclusive():
+    index = IncidentIndex([{"id": "a", "length": 100.0}, {"id": "b", "length": 200.0}])
+    assert [i["id"] for i in index.query(min_length=100, max_length=200)[0]] == ["a"]
+    assert [i["id"] for i in index.query(min_length=200)[0]] == ["b"]
+
+
+def test_camel_case_and_prefix_tokens():
+    assert {"disabledvehicle", "disabled", "vehicle"} <= tokenize("disabledVehicle")
+    index = IncidentIndex([{"id": "a", "type": "disabledVehicle"}, {"id": "b", "type": "accident"}])
+    assert [i["id"] for i in index.query(text="Veh")[0]] == ["a"]
+    assert index.query(text="   ")[2] == 2  # no tokens: no text filter
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("time", (-1.5, "abc"))
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "time") == (-1.5, "abc")
+
+
+def _b64(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _b64({"sort": "severity"}),
+    _b64(5),
+    _b64(["severity", "text-where-a-number-goes", "id"]),
+    encode_cursor("time", (-1.0, "i1")),
+    encode_cursor("length", (-1.0, "i1")),
+])
+def test_malformed_and_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        INDEX.query(sort="severity", cursor=cursor, limit=5)
+
+
+def test_unknown_sort_is_rejected():
+    with pytest.raises(ValueError):
+        INDEX.query(sort="name")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def load(bbox, criticality, background_tasks):
+        return INCIDENTS
+
+    monkeypatch.setattr(crashlens, "_load_incidents", load)
+    crashlens._query_indexes.clear()
+    return TestClient(crashlens.app)
+
+
+def test_api_pages_with_cursor_header(client):
+    params = {"bbox": "-87,36,-86,37", "q": "road", "sort": "length", "limit": 25}
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/incidents", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [i["id"] for i in response.json()]
+        assert int(response.headers["x-total-count"]) == len(_brute(INCIDENTS, text="road", sort="length"))
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert ids == _brute(INCIDENTS, text="road", sort="length")
+
+
+@pytest.mark.parametrize("params", [
+    {"sort": "time", "cursor": encode_cursor("severity", (-4, "i1"))},
+    {"cursor": "garbage"},
+    {"sort": "name"},
+    {"limit": 0},
+])
+def test_api_rejects_bad_cursor_and_sort(client, params):
+    response = client.get("/api/incidents", params={"bbox": "-87,36,-86,37", **params})
+    assert response.status_code == 400
@@ -0,0 +1,118 @@
+import math
+import random
+import time
+
+import pytest
+
+from lifecycle import OPEN, IntervalIndex, LifecycleStore, TimingWheel
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_timing_wheel_matches_brute_force(seed):
+    rng = random.Random(seed)
+    # Small wheel (horizon 4**3 = 64 ticks) so cascades and overflow both run
+    wheel = TimingWheel(now=0, tick=1.0, slots=4, levels=3)
+    deadlines = {}
+    now = 0.0
+    for step in range(400):
+        for _ in range(rng.randint(0, 5)):
+            key = rng.randrange(60)
+            when = now + rng.uniform(-2, 200)
+            wheel.schedule(key, when)
+            deadlines[key] = math.ceil(when)
+        if deadlines and rng.random() < 0.2:
+            key = rng.choice(list(deadlines))
+            wheel.cancel(key)
+            del deadlines[key]
+        now += rng.choice([0.5, 1, 3, 17, 70])
+
+        fired = wheel.advance(now)
+        expected = {key for key, deadline in deadlines.items() if deadline <= int(now)}
+        assert sorted(fired) == sorted(expected)
+        for key in expected:
+            del deadlines[key]
+        assert len(wheel) == len(deadlines)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_interval_index_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = []
+    for i in range(300):
+        start = rng.uniform(0, 1000)
+        end = OPEN if rng.random() < 0.1 else start + rng.expovariate(1 / 50)
+        intervals.append((start, end, f"i{i}"))
+    index = IntervalIndex(intervals)
+    for _ in range(200):
+        low = rng.uniform(-50, 1100)
+        high = low + rng.choice([0, rng.uniform(0, 200)])
+        expected = {key for start, end, key in intervals if start <= high and end > low}
+        assert set(index.overlapping(low, high)) == expected
+
+
+def test_interval_index_empty():
+    assert IntervalIndex([]).overlapping(0, 10) == []
+
+
+def test_lifecycle_store_expires_and_evicts():
+    # Start in the future: overlapping() advances the wheel to the real clock
+    t = float(int(time.time()) + 10_000)
+    ended = []
+    store = LifecycleStore(retention=100, stale_ttl=50, on_expire=ended.append, now=t)
+    store.upsert_many([
+        {"id": "a", "start_time": t, "end_time": t + 30},
+        {"id": "b", "start_time": t},  # open-ended, closed after stale_ttl without updates
+    ], now=t)
+    assert {r["id"] for r in store.active(t + 10)} == {"a", "b"}
+    store.upsert({"id": "b", "start_time": t}, now=t + 20)
+
+    assert not store.has_ended("a", t + 29)
+    assert store.has_ended("a", t + 30)
+    assert {r["id"] for r in store.active(t + 31)} == {"b"}
+    assert [r["id"] for r in ended] == ["a"]
+
+    # b closes where it was last seen once it goes stale_ttl without updates
+    store.advance(t + 70)
+    assert store.active_count == 0
+    assert [r["id"] for r in ended] == ["a", "b"]
+    assert {r["id"] for r in store.overlapping(t + 15, t + 40)} == {"a", "b"}
+    assert {r["id"] for r in store.active_at(t + 15)} == {"a", "b"}
+    assert {r["id"] for r in store.active_at(t + 25)} == {"a"}
+    assert store.active_at(t + 30) == []
+
+    # Kept for the retention window after ending, then dropped
+    store.advance(t + 121)
+    assert len(store) == 1
+    store.advance(t + 130)
+    assert len(store) == 0
+
+
+def test_incident_no_longer_reported_ends_before_its_end_time():
+    t = float(int(time.time()) + 10_000)
+    ended = []
+    store = LifecycleStore(retention=100, stale_ttl=50, on_expire=ended.append, now=t)
+    roadworks = {"id": "r", "start_time": t - 3600, "end_time": t + 7 * 86400}
+    store.upsert(roadworks, now=t)
+    store.upsert(roadworks, now=t + 30)  # still reported: stale timer moves out
+    store.advance(t + 79)
+    assert store.active_count == 1 and not ended
+
+    # Not reported for stale_ttl: closed where it was last seen, like open-ended incidents
+    store.advance(t + 80)
+    assert store.active_count == 0
+    assert [r["id"] for r in ended] == ["r"]
+    assert store.has_ended("r", t + 31)
+    assert store.active(t + 81) == []
+    assert [r["id"] for r in store.active_at(t + 29)] == ["r"]
+    assert store.active_at(t + 31) == []
+    store.advance(t + 130)
+    assert len(store) == 0
+
+
+def test_end_time_before_stale_ttl_still_ends_exactly():
+    t = float(int(time.time()) + 10_000)
+    store = LifecycleStore(retention=100, stale_ttl=3600, now=t)
+    store.upsert({"id": "a", "start_time": t, "end_time": t + 10}, now=t)
+    store.advance(t + 10)
+    assert store.has_ended("a", t + 10) and not store.has_ended("a", t + 9)
+    assert [r["id"] for r in store.active_at(t + 9)] == ["a"]
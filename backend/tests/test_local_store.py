@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from geo import distance_m
+from local_store import DAY, HOUR, SQLiteIncidentStore
+
+NOW = 1_750_000_000.0
+
+
+def _incidents(count, days, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"i{i}",
+            "type": rng.choice(["accident", "construction", "congestion"]),
+            "criticality": rng.choice(["critical", "major", "minor", None]),
+            "latitude": 36 + rng.random(),
+            "longitude": -87 + rng.random(),
+            "start_time": datetime.fromtimestamp(NOW - rng.random() * days * DAY, timezone.utc).isoformat(),
+            "severity": rng.randint(0, 4),
+            "length": rng.random(),
+        }
+        for i in range(count)
+    ]
+
+
+def _rollups(store, table):
+    return store._connection().execute(
+        f"SELECT bucket, tile, criticality, type, incident_count FROM incident_rollups_{table} ORDER BY 1, 2, 3, 4"
+    ).fetchall()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    store.save_many(_incidents(3000, days=20))
+    store.compact()
+    return store
+
+
+@pytest.mark.parametrize("days_back", [1.5, 3, 7.25, 19])
+def test_rollup_summary_matches_raw_counts(store, days_back):
+    # rollup_summary works at hour resolution
+    since = (NOW - days_back * DAY) // HOUR * HOUR
+    assert store.rollup_summary(since, now=NOW) == store.summarize(since)
+
+
+def test_hourly_tile_counts_match_raw_rows(store):
+    since = NOW - 10 * DAY
+    counts = store.hourly_tile_counts(since, now=NOW)
+    assert sum(count for _, _, count in counts) == store.summarize(since // HOUR * HOUR)["total_incidents"]
+
+
+def test_cleanup_rolls_up_purged_days_only(tmp_path, store):
+    full = SQLiteIncidentStore(str(tmp_path / "full.db"))
+    full.save_many(_incidents(3000, days=20))
+    full.compact()
+
+    cutoff = NOW // DAY * DAY - 10 * DAY
+    expired = store.summarize(until=cutoff)["total_incidents"]
+    assert expired > 0
+    assert store.cleanup(raw_days=10, hourly_days=90, now=NOW) == expired
+    assert store.summarize(until=cutoff)["total_incidents"] == 0
+    assert _rollups(store, "hourly") == _rollups(full, "hourly")
+    assert _rollups(store, "daily") == _rollups(full, "daily")
+    assert store.cleanup(raw_days=10, hourly_days=90, now=NOW) == 0
+
+
+def test_compact_recent_rolls_up_late_reported_rows(tmp_path):
+    store = SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    store.save_many(_incidents(500, days=20))
+    store.compact_recent(now=NOW)
+    since = (NOW - 7 * DAY) // HOUR * HOUR
+    assert store.rollup_summary(since, now=NOW) == store.summarize(since)
+
+    # Roadworks first reported days after they started
+    late = _incidents(1, days=1, seed=1)[0]
+    late.update(id="late", type="construction", start_time=datetime.fromtimestamp(NOW - 5 * DAY, timezone.utc).isoformat())
+    store.save_many([late])
+    store.compact_recent(now=NOW + HOUR)
+    assert store.rollup_summary(since, now=NOW + HOUR) == store.summarize(since)
+
+
+@pytest.fixture(params=[True, False], ids=["rtree", "btree"])
+def spatial_store(request, store):
+    store.spatial = store.spatial and request.param
+    return store
+
+
+@pytest.mark.parametrize("box", [(-86.8, 36.1, -86.5, 36.4), (-87.5, 35.5, -86.9, 36.05), (-86.1, 36.9, -85, 38)])
+def test_in_bbox_matches_brute_force(spatial_store, box):
+    since = NOW - 10 * DAY
+    expected = [
+        i for i in _incidents(3000, days=20)
+        if box[0] <= i["longitude"] <= box[2] and box[1] <= i["latitude"] <= box[3]
+        and datetime.fromisoformat(i["start_time"]).timestamp() >= since
+    ]
+    rows = spatial_store.in_bbox(box, since=since)
+    assert sorted(r["id"] for r in rows) == sorted(i["id"] for i in expected)
+    starts = [r["start_time"] for r in rows]
+    assert starts == sorted(starts, reverse=True)
+    assert [r["id"] for r in spatial_store.in_bbox(box, since=since, limit=5)] == [r["id"] for r in rows[:5]]
+
+
+@pytest.mark.parametrize("center,radius", [((36.5, -86.5), 10_000), ((36.02, -86.98), 25_000), ((36.5, -86.5), 1)])
+def test_within_radius_matches_brute_force(spatial_store, center, radius):
+    expected = [i for i in _incidents(3000, days=20) if distance_m(*center, i["latitude"], i["longitude"]) <= radius]
+    rows = spatial_store.within_radius(*center, radius)
+    assert sorted(r["id"] for r in rows) == sorted(i["id"] for i in expected)
+    assert [r["id"] for r in spatial_store.within_radius(*center, radius, limit=3)] == [r["id"] for r in rows[:3]]
+
+    counts = {}
+    for incident in expected:
+        label = incident["criticality"] or "unknown"
+        counts[label] = counts.get(label, 0) + 1
+    assert spatial_store.count_within_radius(*center, radius) == counts
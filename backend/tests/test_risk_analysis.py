@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as crashlens
+from local_store import SQLiteIncidentStore
+
+CENTER = {"latitude": 36.1627, "longitude": -86.7816}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    now = datetime.now(timezone.utc)
+    store = SQLiteIncidentStore(str(tmp_path / "risk.db"))
+    store.save_many([
+        {
+            "id": f"i{i}",
+            "type": "accident",
+            "criticality": ["critical", "major", None][i % 3],
+            # ~1.1 km apart going north: i0-i4 fall inside a 5 km radius
+            "latitude": CENTER["latitude"] + i * 0.01,
+            "longitude": CENTER["longitude"],
+            "start_time": (now - timedelta(days=i * 2)).isoformat(),
+        }
+        for i in range(10)
+    ])
+    monkeypatch.setattr(crashlens.storage, "_local_store", store)
+
+    async def load_incidents(bbox, criticality=None, background_tasks=None):
+        return []
+
+    monkeypatch.setattr(crashlens, "_load_incidents", load_incidents)
+    return TestClient(crashlens.app)
+
+
+def test_history_counts_stored_incidents_in_radius(client):
+    response = client.post("/api/risk-analysis", json={**CENTER, "radius": 5000, "history_days": 5})
+    assert response.status_code == 200
+    # Inside the radius and started within 5 days: i0, i1, i2
+    assert response.json()["history"] == {
+        "days": 5,
+        "incident_count": 3,
+        "daily_average": 0.6,
+        "by_severity": {"critical": 1, "major": 1, "unknown": 1},
+    }
+
+
+def test_history_is_optional(client):
+    response = client.post("/api/risk-analysis", json=CENTER)
+    assert response.status_code == 200
+    assert "history" not in response.json()
+
+
+@pytest.mark.parametrize("days", [0, 367])
+def test_history_days_is_bounded(client, days):
+    response = client.post("/api/risk-analysis", json={**CENTER, "history_days": days})
+    assert response.status_code == 422
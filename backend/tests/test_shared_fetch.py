@@ -0,0 +1,160 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+import redis.asyncio as redis
+
+import app as crashlens
+from bench.stubs import RedisStub, StubConfig, synthetic_incidents
+
+BBOX = "-87,36,-86,37"
+
+
+@asynccontextmanager
+async def stub_redis(monkeypatch):
+    """Point app.py at an in-process Redis stub for the duration of one test"""
+    server = await asyncio.start_server(RedisStub(StubConfig()).handle, "127.0.0.1", 0)
+    client = redis.from_url(f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+    monkeypatch.setattr(crashlens, "redis_client", client)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+def test_release_lock_keeps_a_lock_that_changed_hands(monkeypatch):
+    async def scenario():
+        async with stub_redis(monkeypatch) as client:
+            first = await crashlens.acquire_lock("lock:k", 50)
+            assert first
+            assert await crashlens.acquire_lock("lock:k", 50) is None
+
+            await asyncio.sleep(0.1)  # expired; another worker takes it
+            second = await crashlens.acquire_lock("lock:k", 10_000)
+            assert second
+            await crashlens.release_lock("lock:k", first)
+            assert await client.get("lock:k") == second.encode()
+
+            await crashlens.release_lock("lock:k", second)
+            assert not await client.exists("lock:k")
+
+    asyncio.run(scenario())
+
+
+def test_lock_without_redis_is_always_granted(monkeypatch):
+    monkeypatch.setattr(crashlens, "redis_client", None)
+    assert asyncio.run(crashlens.acquire_lock("lock:k", 1000))
+
+
+def test_wait_for_cache_returns_the_other_workers_payload(monkeypatch):
+    async def scenario():
+        async with stub_redis(monkeypatch) as client:
+            await client.set("lock:k", "other", px=10_000)
+
+            async def other_worker():
+                await asyncio.sleep(0.2)
+                await client.setex("k", 60, b"payload")
+
+            cached, _ = await asyncio.gather(crashlens._wait_for_cache("k", "lock:k"), other_worker())
+            assert cached == b"payload"
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_cache_gives_up_when_the_lock_is_dropped_or_expires(monkeypatch):
+    async def scenario():
+        async with stub_redis(monkeypatch) as client:
+            # The other worker failed: no lock, nothing cached
+            assert await crashlens._wait_for_cache("k", "lock:k") is None
+
+            # The other worker hangs: give up after the lock TTL
+            monkeypatch.setattr(crashlens, "FETCH_LOCK_TTL_MS", 200)
+            await client.set("lock:k", "other", px=10_000)
+            started = asyncio.get_running_loop().time()
+            assert await crashlens._wait_for_cache("k", "lock:k") is None
+            assert asyncio.get_running_loop().time() - started < 1
+
+    asyncio.run(scenario())
+
+
+class FakeHere:
+    """Slow stand-in for the HERE round trip that records its calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = False
+
+    async def fetch(self, bbox, criticality_filter, cache_key, background_tasks):
+        self.calls.append(cache_key)
+        await asyncio.sleep(0.05)
+        if self.failing:
+            raise crashlens.HTTPException(status_code=502, detail="HERE API error")
+        return [cache_key]
+
+
+@pytest.fixture
+def here(monkeypatch):
+    here = FakeHere()
+    monkeypatch.setattr(crashlens, "redis_client", None)
+    monkeypatch.setattr(crashlens, "_fetch_here_incidents", here.fetch)
+    return here
+
+
+def test_concurrent_loads_share_one_fetch(here):
+    async def scenario():
+        results = await asyncio.gather(*(crashlens._load_incidents(BBOX) for _ in range(5)))
+        assert len(here.calls) == 1
+        assert all(result == results[0] for result in results)
+        assert crashlens._inflight_fetches == {}
+
+        # Finished fetches are not reused, and other keys fetch on their own
+        await crashlens._load_incidents(BBOX)
+        await crashlens._load_incidents(BBOX, "critical")
+        assert len(here.calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_kept(here):
+    async def scenario():
+        here.failing = True
+        results = await asyncio.gather(*(crashlens._load_incidents(BBOX) for _ in range(3)), return_exceptions=True)
+        assert len(here.calls) == 1
+        assert all(isinstance(result, crashlens.HTTPException) for result in results)
+        assert crashlens._inflight_fetches == {}
+
+        here.failing = False
+        assert await crashlens._load_incidents(BBOX) == [crashlens.incident_cache_key(BBOX, None)]
+        assert len(here.calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch(here):
+    async def scenario():
+        first = asyncio.create_task(crashlens._load_incidents(BBOX))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(crashlens._load_incidents(BBOX))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        assert await first == [crashlens.incident_cache_key(BBOX, None)]
+        assert second.cancelled()
+        assert len(here.calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_large_payloads_parse_in_a_forkserver_pool(monkeypatch):
+    body = json.dumps(synthetic_incidents(BBOX, 20, 1)).encode()
+    monkeypatch.setattr(crashlens, "CPU_POOL_MIN_BYTES", 0)
+    monkeypatch.setattr(crashlens, "cpu_pool", None)
+    try:
+        parsed = asyncio.run(crashlens.parse_here_incidents(body))
+        assert crashlens.cpu_pool._mp_context.get_start_method() != "fork"
+    finally:
+        if crashlens.cpu_pool:
+            crashlens.cpu_pool.shutdown()
+    assert parsed and parsed == crashlens._parse_here_incidents(body)
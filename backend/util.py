@@ -0,0 +1,44 @@
+"""
+Timestamp and record helpers shared by the capture, storage, index and API
+modules
+
+Timestamps arrive as ISO 8601 strings (HERE, Supabase, captures), datetimes
+(Pydantic models) or epoch seconds (SQLite); naive values are UTC.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+
+def parse_time(value: Any) -> Optional[datetime]:
+    """Timezone-aware datetime, None when empty; raises ValueError on malformed strings"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def to_epoch(value: Any, strict: bool = True) -> Optional[float]:
+    """
+    Epoch seconds, None when empty. Malformed strings raise ValueError, or
+    give None when ``strict`` is False (for untrusted incident feeds).
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = parse_time(value)
+    except ValueError:
+        if strict:
+            raise
+        return None
+    return None if parsed is None else parsed.timestamp()
+
+
+def get_field(record: Any, field: str) -> Any:
+    """Read a field from an incident dict or model alike"""
+    if isinstance(record, dict):
+        return record.get(field)
+    return getattr(record, field, None)
@@ -1,6 +1,9 @@
 -- CrashLens Supabase Database Schema
 -- Run this in your Supabase SQL editor
 
+-- PostGIS for spatial indexing (Database > Extensions in the Supabase dashboard)
+CREATE EXTENSION IF NOT EXISTS postgis;
+
 -- Create incidents table
 CREATE TABLE IF NOT EXISTS incidents (
   id TEXT PRIMARY KEY,
@@ -13,16 +16,26 @@ CREATE TABLE IF NOT EXISTS incidents (
   start_time TIMESTAMP NOT NULL,
   end_time TIMESTAMP,
   road_name TEXT,
+  location_name TEXT,
   length DOUBLE PRECISION,
   created_at TIMESTAMP DEFAULT NOW(),
   updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Existing deployments: add columns introduced after the initial schema
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS location_name TEXT;
+
+-- Point geography derived from latitude/longitude, for GiST-indexed bbox/radius queries
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS geog GEOGRAPHY(Point, 4326)
+  GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED;
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_incidents_location ON incidents (latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_incidents_geog ON incidents USING GIST (geog);
 CREATE INDEX IF NOT EXISTS idx_incidents_time ON incidents (start_time DESC);
 CREATE INDEX IF NOT EXISTS idx_incidents_criticality ON incidents (criticality);
 CREATE INDEX IF NOT EXISTS idx_incidents_created ON incidents (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_incidents_updated ON incidents (updated_at);
 
 -- Create updated_at trigger
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -61,14 +74,246 @@ CREATE POLICY "Enable read access for all users" ON incidents
 CREATE POLICY "Enable insert for authenticated users only" ON incidents
     FOR INSERT WITH CHECK (auth.role() = 'authenticated');
 
--- Function to cleanup old incidents (run periodically)
+-- Historical spatial queries (called via PostgREST /rpc/...; the GiST index picks the rows,
+-- time and criticality filters apply on top). Newest first, at most max_rows rows.
+CREATE OR REPLACE FUNCTION incidents_in_bbox(
+  min_lon DOUBLE PRECISION,
+  min_lat DOUBLE PRECISION,
+  max_lon DOUBLE PRECISION,
+  max_lat DOUBLE PRECISION,
+  since TIMESTAMP DEFAULT NULL,
+  until TIMESTAMP DEFAULT NULL,
+  criticalities TEXT[] DEFAULT NULL,
+  max_rows INTEGER DEFAULT 5000
+)
+RETURNS SETOF incidents AS $$
+  SELECT * FROM incidents
+  WHERE geog && ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)::geography
+    AND latitude BETWEEN min_lat AND max_lat
+    AND longitude BETWEEN min_lon AND max_lon
+    AND (since IS NULL OR start_time >= since)
+    AND (until IS NULL OR start_time < until)
+    AND (criticalities IS NULL OR criticality = ANY(criticalities))
+  ORDER BY start_time DESC
+  LIMIT max_rows;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION incidents_within_radius(
+  lat DOUBLE PRECISION,
+  lon DOUBLE PRECISION,
+  radius_m DOUBLE PRECISION,
+  since TIMESTAMP DEFAULT NULL,
+  until TIMESTAMP DEFAULT NULL,
+  criticalities TEXT[] DEFAULT NULL,
+  max_rows INTEGER DEFAULT 5000
+)
+RETURNS SETOF incidents AS $$
+  SELECT * FROM incidents
+  WHERE ST_DWithin(geog, ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography, radius_m)
+    AND (since IS NULL OR start_time >= since)
+    AND (until IS NULL OR start_time < until)
+    AND (criticalities IS NULL OR criticality = ANY(criticalities))
+  ORDER BY start_time DESC
+  LIMIT max_rows;
+$$ LANGUAGE sql STABLE;
+
+-- Incident counts by criticality in the same circle (risk-analysis history)
+CREATE OR REPLACE FUNCTION incident_counts_within_radius(
+  lat DOUBLE PRECISION,
+  lon DOUBLE PRECISION,
+  radius_m DOUBLE PRECISION,
+  since TIMESTAMP DEFAULT NULL,
+  until TIMESTAMP DEFAULT NULL
+)
+RETURNS TABLE (criticality TEXT, incident_count BIGINT) AS $$
+  SELECT COALESCE(i.criticality, 'unknown'), COUNT(*)
+  FROM incidents i
+  WHERE ST_DWithin(i.geog, ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography, radius_m)
+    AND (since IS NULL OR i.start_time >= since)
+    AND (until IS NULL OR i.start_time < until)
+  GROUP BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Tiered retention: raw rows for 30 days, hourly rollups for 90 days, daily rollups kept forever.
+-- Rollups are keyed by slippy map tile (zoom 10, "z/x/y", same as backend/geo.py tile_id),
+-- criticality and type, so long-window analytics never scan the raw table.
+CREATE TABLE IF NOT EXISTS incident_rollups_hourly (
+  bucket TIMESTAMP NOT NULL,
+  tile TEXT NOT NULL,
+  criticality TEXT NOT NULL,
+  type TEXT NOT NULL,
+  incident_count INTEGER NOT NULL,
+  severity_sum BIGINT NOT NULL,
+  length_sum DOUBLE PRECISION NOT NULL,
+  PRIMARY KEY (bucket, tile, criticality, type)
+);
+
+CREATE TABLE IF NOT EXISTS incident_rollups_daily (
+  bucket DATE NOT NULL,
+  tile TEXT NOT NULL,
+  criticality TEXT NOT NULL,
+  type TEXT NOT NULL,
+  incident_count INTEGER NOT NULL,
+  severity_sum BIGINT NOT NULL,
+  length_sum DOUBLE PRECISION NOT NULL,
+  PRIMARY KEY (bucket, tile, criticality, type)
+);
+
+ALTER TABLE incident_rollups_hourly ENABLE ROW LEVEL SECURITY;
+ALTER TABLE incident_rollups_daily ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable read access for all users" ON incident_rollups_hourly
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable read access for all users" ON incident_rollups_daily
+    FOR SELECT USING (true);
+
+-- Web Mercator tile of a point as "z/x/y"
+CREATE OR REPLACE FUNCTION incident_tile(lat DOUBLE PRECISION, lon DOUBLE PRECISION, zoom INTEGER DEFAULT 10)
+RETURNS TEXT AS $$
+  SELECT zoom || '/' ||
+    LEAST(GREATEST(FLOOR((lon + 180.0) / 360.0 * (1 << zoom)), 0), (1 << zoom) - 1)::INTEGER || '/' ||
+    LEAST(GREATEST(FLOOR((0.5 - LN((1 + SIN(RADIANS(c.clamped))) / (1 - SIN(RADIANS(c.clamped)))) / (4 * PI())) * (1 << zoom)), 0), (1 << zoom) - 1)::INTEGER
+  FROM (SELECT GREATEST(-85.05112878, LEAST(85.05112878, lat)) AS clamped) c;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recompute rollups from raw rows starting at or after `since` (all raw rows when NULL)
+-- and before the day containing `until` ends (no end when NULL).
+-- Safe to re-run: affected hours/days are rebuilt, not incremented.
+DROP FUNCTION IF EXISTS compact_incidents(TIMESTAMP);
+CREATE OR REPLACE FUNCTION compact_incidents(since TIMESTAMP DEFAULT NULL, until TIMESTAMP DEFAULT NULL)
+RETURNS void AS $$
+DECLARE
+    first_hour TIMESTAMP;
+    last_day TIMESTAMP;
+BEGIN
+    first_hour := DATE_TRUNC('hour', COALESCE(since, (SELECT MIN(start_time) FROM incidents)));
+    IF first_hour IS NULL THEN
+        RETURN;
+    END IF;
+    last_day := COALESCE(DATE_TRUNC('day', until - INTERVAL '1 microsecond') + INTERVAL '1 day', 'infinity');
+
+    DELETE FROM incident_rollups_hourly WHERE bucket >= first_hour AND bucket < last_day;
+    INSERT INTO incident_rollups_hourly (bucket, tile, criticality, type, incident_count, severity_sum, length_sum)
+    SELECT DATE_TRUNC('hour', start_time),
+           incident_tile(latitude, longitude),
+           COALESCE(criticality, 'unknown'),
+           COALESCE(type, 'unknown'),
+           COUNT(*),
+           COALESCE(SUM(severity), 0),
+           COALESCE(SUM(length), 0)
+    FROM incidents
+    WHERE start_time >= first_hour AND start_time < last_day
+    GROUP BY 1, 2, 3, 4;
+
+    DELETE FROM incident_rollups_daily
+    WHERE bucket >= DATE_TRUNC('day', first_hour)::DATE AND bucket < last_day;
+    INSERT INTO incident_rollups_daily (bucket, tile, criticality, type, incident_count, severity_sum, length_sum)
+    SELECT DATE_TRUNC('day', bucket)::DATE, tile, criticality, type,
+           SUM(incident_count), SUM(severity_sum), SUM(length_sum)
+    FROM incident_rollups_hourly
+    WHERE bucket >= DATE_TRUNC('day', first_hour) AND bucket < last_day
+    GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Compaction watermark: rows written after it still have to be rolled up
+CREATE TABLE IF NOT EXISTS rollup_state (
+  name TEXT PRIMARY KEY,
+  value TIMESTAMP NOT NULL
+);
+
+ALTER TABLE rollup_state ENABLE ROW LEVEL SECURITY;
+
+-- Hourly job: refresh the last two days, plus every older day with rows written
+-- since the previous run (incidents first reported after their start day).
+-- The watermark trails the run by 5 minutes to catch batches still in flight.
+CREATE OR REPLACE FUNCTION compact_recent_incidents()
+RETURNS void AS $$
+DECLARE
+    started TIMESTAMP := NOW() AT TIME ZONE 'UTC';
+    recent TIMESTAMP := (NOW() AT TIME ZONE 'UTC') - INTERVAL '2 days';
+    watermark TIMESTAMP := (SELECT value FROM rollup_state WHERE name = 'compacted_through');
+    changed_day TIMESTAMP;
+BEGIN
+    FOR changed_day IN
+        SELECT DISTINCT DATE_TRUNC('day', start_time) FROM incidents
+        WHERE updated_at >= COALESCE(watermark, '-infinity') AND start_time < DATE_TRUNC('hour', recent)
+    LOOP
+        PERFORM compact_incidents(changed_day, changed_day + INTERVAL '1 day');
+    END LOOP;
+    PERFORM compact_incidents(recent);
+
+    INSERT INTO rollup_state (name, value) VALUES ('compacted_through', started - INTERVAL '5 minutes')
+    ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Counts by criticality and type since a point in time, at the cost of a rollup read:
+-- hourly rollups for the partial first day, daily rollups for whole days, and raw rows
+-- for the last two days (the window the hourly compact-incidents job keeps refreshing)
+CREATE OR REPLACE FUNCTION incident_rollup_summary(since TIMESTAMP)
+RETURNS TABLE (criticality TEXT, type TEXT, incident_count BIGINT) AS $$
+  WITH bounds AS (
+    SELECT DATE_TRUNC('hour', since) AS first_hour,
+           DATE_TRUNC('day', since + INTERVAL '1 day' - INTERVAL '1 microsecond') AS first_day,
+           DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC') - INTERVAL '2 days' AS recent
+  )
+  SELECT criticality, type, SUM(n)::BIGINT FROM (
+    SELECT h.criticality, h.type, h.incident_count AS n
+    FROM incident_rollups_hourly h, bounds b
+    WHERE h.bucket >= b.first_hour AND h.bucket < LEAST(b.first_day, b.recent)
+    UNION ALL
+    SELECT d.criticality, d.type, d.incident_count
+    FROM incident_rollups_daily d, bounds b
+    WHERE d.bucket >= b.first_day AND d.bucket < b.recent
+    UNION ALL
+    SELECT COALESCE(i.criticality, 'unknown'), COALESCE(i.type, 'unknown'), 1
+    FROM incidents i, bounds b
+    WHERE i.start_time >= GREATEST(b.recent, since)
+  ) parts
+  GROUP BY criticality, type;
+$$ LANGUAGE sql STABLE;
+
+-- Hourly incident counts per zoom-10 tile since a point in time (seeds the
+-- forecasting models): hourly rollups, then raw rows for the last two days
+CREATE OR REPLACE FUNCTION incident_hourly_tile_counts(since TIMESTAMP)
+RETURNS TABLE (bucket TIMESTAMP, tile TEXT, incident_count BIGINT) AS $$
+  WITH bounds AS (
+    SELECT GREATEST(DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC') - INTERVAL '2 days',
+                    DATE_TRUNC('hour', since)) AS recent
+  )
+  SELECT bucket, tile, SUM(n)::BIGINT FROM (
+    SELECT h.bucket, h.tile, h.incident_count AS n
+    FROM incident_rollups_hourly h, bounds b
+    WHERE h.bucket >= DATE_TRUNC('hour', since) AND h.bucket < b.recent
+    UNION ALL
+    SELECT DATE_TRUNC('hour', i.start_time), incident_tile(i.latitude, i.longitude), 1
+    FROM incidents i, bounds b
+    WHERE i.start_time >= b.recent
+  ) parts
+  GROUP BY bucket, tile
+  ORDER BY bucket, tile;
+$$ LANGUAGE sql STABLE;
+
+-- Function to cleanup old incidents (run daily).
+-- Only the days about to be purged are rolled up before their raw rows are deleted;
+-- cutoffs are day-aligned so no rollup bucket is ever left half-deleted.
 CREATE OR REPLACE FUNCTION cleanup_old_incidents()
 RETURNS void AS $$
+DECLARE
+    cutoff TIMESTAMP := DATE_TRUNC('day', NOW() - INTERVAL '30 days');
 BEGIN
-    DELETE FROM incidents 
-    WHERE start_time < NOW() - INTERVAL '30 days';
+    PERFORM compact_incidents((SELECT MIN(start_time) FROM incidents WHERE start_time < cutoff), cutoff);
+
+    DELETE FROM incidents
+    WHERE start_time < cutoff;
+
+    DELETE FROM incident_rollups_hourly
+    WHERE bucket < DATE_TRUNC('day', NOW() - INTERVAL '90 days');
 END;
 $$ LANGUAGE plpgsql;
 
--- Optional: Create a scheduled job to cleanup (requires pg_cron extension)
+-- Optional: Create scheduled jobs (requires pg_cron extension)
+-- SELECT cron.schedule('compact-incidents', '5 * * * *', 'SELECT compact_recent_incidents()');
 -- SELECT cron.schedule('cleanup-incidents', '0 2 * * *', 'SELECT cleanup_old_incidents()');
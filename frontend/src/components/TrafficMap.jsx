@@ -1,5 +1,5 @@
 import React from 'react';
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
+import { MapContainer, TileLayer, Marker, Popup, CircleMarker, Tooltip, useMap } from 'react-leaflet';
 import { Icon } from 'leaflet';
 import { SEVERITY_CONFIG } from '../lib/config';
 import { formatDateTime } from '../lib/utils';
@@ -17,6 +17,33 @@ const createMarkerIcon = (color) => new Icon({
   popupAnchor: [0, -41],
 });
 
+// Color a cluster by the worst criticality it contains
+const CRITICALITY_ORDER = ['critical', 'major', 'minor', 'low'];
+const clusterColor = (byCriticality = {}) => {
+  const worst = CRITICALITY_ORDER.find((level) => byCriticality[level] > 0);
+  return (SEVERITY_CONFIG[worst] || SEVERITY_CONFIG.minor).color;
+};
+
+const clusterRadius = (count) => Math.min(12 + Math.log2(count) * 4, 40);
+
+function ClusterMarker({ cluster }) {
+  const map = useMap();
+  return (
+    <CircleMarker
+      center={[cluster.latitude, cluster.longitude]}
+      radius={clusterRadius(cluster.count)}
+      pathOptions={{ color: 'white', weight: 2, fillColor: clusterColor(cluster.by_criticality), fillOpacity: 0.85 }}
+      eventHandlers={{
+        click: () => map.setView([cluster.latitude, cluster.longitude], map.getZoom() + 2),
+      }}
+    >
+      <Tooltip direction="center" permanent className="cluster-label">
+        {cluster.count}
+      </Tooltip>
+    </CircleMarker>
+  );
+}
+
 function MapUpdater({ center, zoom }) {
   const map = useMap();
   React.useEffect(() => {
@@ -31,6 +58,7 @@ const TrafficMap = React.forwardRef(({
   center, 
   zoom, 
   incidents = [], 
+  clusters = null,
   onBoundsChange,
   className = '' 
 }, ref) => {
@@ -41,7 +69,7 @@ const TrafficMap = React.forwardRef(({
   const handleMapMove = (e) => {
     if (onBoundsChange) {
       const bounds = e.target.getBounds();
-      onBoundsChange(bounds);
+      onBoundsChange(bounds, e.target.getZoom());
     }
   };
 
@@ -57,7 +85,7 @@ const TrafficMap = React.forwardRef(({
           // Load initial bounds on map ready
           if (onBoundsChange) {
             const bounds = map.target.getBounds();
-            onBoundsChange(bounds);
+            onBoundsChange(bounds, map.target.getZoom());
           }
         }}
       >
@@ -68,7 +96,11 @@ const TrafficMap = React.forwardRef(({
         
         <MapUpdater center={center} zoom={zoom} />
 
-        {incidents.map((incident) => {
+        {clusters && clusters.map((cluster) => (
+          <ClusterMarker key={cluster.id} cluster={cluster} />
+        ))}
+
+        {!clusters && incidents.map((incident) => {
           const severity = incident.criticality || 'minor';
           const config = SEVERITY_CONFIG[severity] || SEVERITY_CONFIG.minor;
           
@@ -1,19 +1,55 @@
-import { useQuery } from '@tanstack/react-query';
+import { keepPreviousData, useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { apiService } from '../lib/api';
-import { INCIDENT_REFRESH_INTERVAL } from '../lib/config';
+import { CLUSTER_MAX_ZOOM, INCIDENT_REFRESH_INTERVAL } from '../lib/config';
 
-export function useIncidents(bbox, criticality = null) {
+export function useIncidents(bbox, criticality = null, enabled = true) {
   return useQuery({
     queryKey: ['incidents', bbox, criticality],
     queryFn: async () => {
       const response = await apiService.getIncidents(bbox, criticality);
       return response.data;
     },
+    enabled: !!bbox && enabled,
+    refetchInterval: INCIDENT_REFRESH_INTERVAL,
+  });
+}
+
+// Server-side search/filter/sort with cursor pagination
+export function useIncidentSearch(bbox, criticality = null, query = {}, pageSize = 60) {
+  return useInfiniteQuery({
+    queryKey: ['incident-search', bbox, criticality, query, pageSize],
+    queryFn: async ({ pageParam }) => {
+      const params = { ...query, limit: pageSize };
+      if (pageParam) params.cursor = pageParam;
+      const response = await apiService.getIncidents(bbox, criticality, params);
+      const counts = response.headers['x-criticality-counts'];
+      return {
+        items: response.data,
+        total: Number(response.headers['x-total-count'] || response.data.length),
+        counts: counts ? JSON.parse(counts) : {},
+        nextCursor: response.headers['x-next-cursor'] || null,
+      };
+    },
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
+    placeholderData: keepPreviousData,
     enabled: !!bbox,
     refetchInterval: INCIDENT_REFRESH_INTERVAL,
   });
 }
 
+export function useIncidentClusters(bbox, zoom, criticality = null) {
+  return useQuery({
+    queryKey: ['incident-clusters', bbox, zoom, criticality],
+    queryFn: async () => {
+      const response = await apiService.getIncidentClusters(bbox, zoom, criticality);
+      return response.data;
+    },
+    enabled: !!bbox && zoom != null && zoom <= CLUSTER_MAX_ZOOM,
+    refetchInterval: INCIDENT_REFRESH_INTERVAL,
+  });
+}
+
 export function useTrafficFlow(bbox) {
   return useQuery({
     queryKey: ['traffic-flow', bbox],
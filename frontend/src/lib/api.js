@@ -37,12 +37,18 @@ export const apiService = {
   getHealth: () => api.get('/health'),
 
   // Incidents
-  getIncidents: (bbox, criticality = null) => {
-    const params = { bbox };
+  getIncidents: (bbox, criticality = null, query = {}) => {
+    const params = { bbox, ...query };
     if (criticality) params.criticality = criticality;
     return api.get('/api/incidents', { params });
   },
 
+  getIncidentClusters: (bbox, zoom, criticality = null) => {
+    const params = { bbox, zoom };
+    if (criticality) params.criticality = criticality;
+    return api.get('/api/incidents/clusters', { params });
+  },
+
   // Traffic Flow
   getTrafficFlow: (bbox, maxPoints = 100) => {
     return api.get('/api/traffic-flow', {
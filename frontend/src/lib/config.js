@@ -4,6 +4,8 @@ export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:80
 // Map Configuration
 export const DEFAULT_MAP_CENTER = [36.1627, -86.7816]; // Nashville, TN
 export const DEFAULT_MAP_ZOOM = 12;
+// Above this zoom the map shows individual incidents instead of server-side clusters
+export const CLUSTER_MAX_ZOOM = 14;
 
 // Update intervals (milliseconds)
 export const INCIDENT_REFRESH_INTERVAL = 60000; // 1 minute
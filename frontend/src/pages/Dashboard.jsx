@@ -2,8 +2,8 @@ import React, { useState } from 'react';
 import TrafficMap from '../components/TrafficMap';
 import IncidentList from '../components/IncidentList';
 import { LoadingSpinner } from '../components/LoadingSpinner';
-import { useIncidents } from '../hooks/useTraffic';
-import { DEFAULT_MAP_CENTER, DEFAULT_MAP_ZOOM } from '../lib/config';
+import { useIncidents, useIncidentClusters } from '../hooks/useTraffic';
+import { CLUSTER_MAX_ZOOM, DEFAULT_MAP_CENTER, DEFAULT_MAP_ZOOM } from '../lib/config';
 import { getBboxFromBounds } from '../lib/utils';
 import { RefreshCw, Filter, AlertCircle } from 'lucide-react';
 
@@ -11,12 +11,20 @@ export default function Dashboard() {
   const [mapCenter] = useState(DEFAULT_MAP_CENTER);
   const [mapZoom] = useState(DEFAULT_MAP_ZOOM);
   const [bbox, setBbox] = useState(null);
+  const [viewZoom, setViewZoom] = useState(DEFAULT_MAP_ZOOM);
   const [selectedCriticality, setSelectedCriticality] = useState(null);
   const [searchText, setSearchText] = useState('');
   const [selectedIncident, setSelectedIncident] = useState(null);
   const mapRef = React.useRef(null);
 
-  const { data: incidents = [], isLoading, error, refetch } = useIncidents(bbox, selectedCriticality);
+  // Zoomed out, the map and stats come from server-side clusters; full
+  // records are only fetched once zoomed in past CLUSTER_MAX_ZOOM
+  const showClusters = viewZoom <= CLUSTER_MAX_ZOOM;
+  const incidentQuery = useIncidents(bbox, selectedCriticality, !showClusters);
+  const clusterQuery = useIncidentClusters(bbox, viewZoom, selectedCriticality);
+  const { isLoading, error, refetch } = showClusters ? clusterQuery : incidentQuery;
+  const incidents = showClusters ? [] : incidentQuery.data || [];
+  const clusters = showClusters ? clusterQuery.data?.clusters || [] : null;
 
   React.useEffect(() => {
     if (mapRef.current && !bbox) {
@@ -26,9 +34,10 @@ export default function Dashboard() {
     }
   }, [bbox]);
 
-  const handleBoundsChange = (bounds) => {
+  const handleBoundsChange = (bounds, zoom) => {
     const newBbox = getBboxFromBounds(bounds);
     setBbox(newBbox);
+    if (zoom != null) setViewZoom(zoom);
   };
 
   const criticalityOptions = [
@@ -38,18 +47,18 @@ export default function Dashboard() {
     { value: 'minor', label: 'Minor' },
   ];
 
+  const countBy = (criticality) => (clusters
+    ? clusters.reduce((sum, c) => sum + (c.by_criticality[criticality] || 0), 0)
+    : incidents.filter(i => i.criticality === criticality).length);
+
   const stats = [
-    { label: 'Total', value: incidents.length, color: 'text-neutral-700' },
-    { 
-      label: 'Critical', 
-      value: incidents.filter(i => i.criticality === 'critical').length,
-      color: 'text-red-700' 
-    },
-    { 
-      label: 'Major', 
-      value: incidents.filter(i => i.criticality === 'major').length,
-      color: 'text-orange-700' 
+    {
+      label: 'Total',
+      value: clusters ? clusters.reduce((sum, c) => sum + c.count, 0) : incidents.length,
+      color: 'text-neutral-700'
     },
+    { label: 'Critical', value: countBy('critical'), color: 'text-red-700' },
+    { label: 'Major', value: countBy('major'), color: 'text-orange-700' },
   ];
 
   const filteredIncidents = incidents.filter(i => {
@@ -118,6 +127,7 @@ export default function Dashboard() {
             center={mapCenter}
             zoom={mapZoom}
             incidents={incidents}
+            clusters={clusters}
             onBoundsChange={handleBoundsChange}
             className="h-full"
           />
@@ -142,15 +152,21 @@ export default function Dashboard() {
           <div className="p-4 border-b">
             <h3 className="font-semibold text-neutral-900">Incidents</h3>
             <p className="text-sm text-neutral-600 mt-1">
-              {filteredIncidents.length} in view
+              {clusters ? `${stats[0].value} in view` : `${filteredIncidents.length} in view`}
             </p>
           </div>
 
           <div className="flex-1 overflow-y-auto">
-            <IncidentList
-              incidents={filteredIncidents}
-              onIncidentClick={setSelectedIncident}
-            />
+            {clusters ? (
+              <p className="p-4 text-sm text-neutral-600">
+                Zoom in to list individual incidents.
+              </p>
+            ) : (
+              <IncidentList
+                incidents={filteredIncidents}
+                onIncidentClick={setSelectedIncident}
+              />
+            )}
           </div>
         </div>
       </div>
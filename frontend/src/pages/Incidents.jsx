@@ -1,5 +1,5 @@
 import React from 'react';
-import { useIncidents } from '../hooks/useTraffic';
+import { useIncidentSearch } from '../hooks/useTraffic';
 import { DEFAULT_MAP_CENTER } from '../lib/config';
 import { LoadingSpinner } from '../components/LoadingSpinner';
 import {
@@ -20,6 +20,13 @@ const buildDefaultBbox = () => {
   return `${lon - DEFAULT_SPAN_LON},${lat - DEFAULT_SPAN_LAT},${lon + DEFAULT_SPAN_LON},${lat + DEFAULT_SPAN_LAT}`;
 };
 
+const LENGTH_RANGES = {
+  all: {},
+  short: { max_length: 1000 },
+  medium: { min_length: 1000, max_length: 5000 },
+  long: { min_length: 5000 },
+};
+
 const severityConfig = {
   critical: { bg: 'bg-red-100', text: 'text-red-700', badge: 'bg-red-600', label: 'Critical' },
   major: { bg: 'bg-orange-100', text: 'text-orange-700', badge: 'bg-orange-500', label: 'Major' },
@@ -38,50 +45,41 @@ export default function Incidents() {
     setBbox(buildDefaultBbox());
   }, []);
 
-  const { data: incidents = [], isLoading, error, refetch } = useIncidents(bbox, selectedCriticality === 'all' ? null : selectedCriticality);
-
-  const filteredIncidents = React.useMemo(() => {
-    let filtered = [...incidents];
-
-    // Search filter
-    if (searchText) {
-      const query = searchText.toLowerCase();
-      filtered = filtered.filter(inc => 
-        inc.type?.toLowerCase().includes(query) ||
-        inc.description?.toLowerCase().includes(query) ||
-        inc.road_name?.toLowerCase().includes(query) ||
-        inc.location_name?.toLowerCase().includes(query)
-      );
-    }
-
-    // Length filter
-    if (lengthFilter !== 'all') {
-      if (lengthFilter === 'short') filtered = filtered.filter(i => (i.length || 0) < 1000);
-      else if (lengthFilter === 'medium') filtered = filtered.filter(i => (i.length || 0) >= 1000 && (i.length || 0) < 5000);
-      else if (lengthFilter === 'long') filtered = filtered.filter(i => (i.length || 0) >= 5000);
-    }
-
-    // Sort
-    filtered.sort((a, b) => {
-      if (sortKey === 'severity') {
-        const order = { critical: 0, major: 1, minor: 2, low: 3 };
-        return (order[a.criticality] || 99) - (order[b.criticality] || 99);
-      } else if (sortKey === 'time') {
-        return new Date(b.start_time) - new Date(a.start_time);
-      } else if (sortKey === 'length') {
-        return (b.length || 0) - (a.length || 0);
-      }
-      return 0;
-    });
-
-    return filtered;
-  }, [incidents, searchText, lengthFilter, sortKey]);
+  // Debounce typing so each pause, not each keystroke, hits the server
+  const [debouncedSearch, setDebouncedSearch] = React.useState('');
+  React.useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchText.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchText]);
+
+  const query = React.useMemo(() => {
+    const params = { sort: sortKey, ...LENGTH_RANGES[lengthFilter] };
+    if (debouncedSearch) params.q = debouncedSearch;
+    return params;
+  }, [debouncedSearch, lengthFilter, sortKey]);
+
+  const {
+    data,
+    isLoading,
+    error,
+    refetch,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useIncidentSearch(bbox, selectedCriticality === 'all' ? null : selectedCriticality, query);
+
+  const filteredIncidents = React.useMemo(
+    () => (data ? data.pages.flatMap((page) => page.items) : []),
+    [data]
+  );
+  const firstPage = data?.pages[0];
+  const counts = firstPage?.counts || {};
 
   const stats = {
-    total: incidents.length,
-    critical: incidents.filter(i => i.criticality === 'critical').length,
-    major: incidents.filter(i => i.criticality === 'major').length,
-    minor: incidents.filter(i => i.criticality === 'minor').length,
+    total: Object.values(counts).reduce((sum, n) => sum + n, 0),
+    critical: counts.critical || 0,
+    major: counts.major || 0,
+    minor: counts.minor || 0,
   };
 
   if (isLoading) {
@@ -107,7 +105,7 @@ export default function Incidents() {
         <div className="flex items-center justify-between mb-6">
           <div>
             <h1 className="text-2xl font-semibold text-neutral-900">Incidents</h1>
-            <p className="text-sm text-neutral-600 mt-1">{filteredIncidents.length} incidents</p>
+            <p className="text-sm text-neutral-600 mt-1">{firstPage?.total ?? 0} incidents</p>
           </div>
           <button
             onClick={() => refetch()}
@@ -229,6 +227,19 @@ export default function Incidents() {
           })}
         </div>
 
+        {hasNextPage && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+              className="bg-white border border-neutral-300 px-4 py-2 rounded text-sm hover:bg-neutral-100 flex items-center gap-2"
+            >
+              {isFetchingNextPage && <LoadingSpinner size={14} />}
+              Load more
+            </button>
+          </div>
+        )}
+
         {filteredIncidents.length === 0 && (
           <div className="text-center py-12 text-neutral-600">
             <AlertTriangle size={48} className="mx-auto mb-2 opacity-50" />